@@ -0,0 +1,351 @@
+"""Gera carga no fluxo de agendamento e mede latencia, vazao e consultas por rota.
+
+Uso (com a aplicacao rodando e o banco populado por bench/seed.py):
+    python bench/load.py --base-url http://localhost:8080 --concurrency 50 --duration 60 \
+        --output bench/results/latest.json [--baseline bench/results/baseline.json]
+
+Cada usuario virtual faz login e repete um mix de requisicoes (listar
+agendamentos, consultar horarios livres, agendar e cancelar). Depois da carga,
+uma etapa de calibracao executa cada rota em sequencia e mede as consultas ao
+MySQL pela variavel de status Questions; por isso nenhum outro cliente deve
+usar o banco durante o benchmark.
+
+Login, agendar e cancelar respondem com redirecionamento tanto no sucesso quanto
+na falha; durante a janela medida, a mensagem flash e lida em seguida (fora do
+tempo medido) para separar sucessos, conflitos de horario e erros.
+
+O resultado e gravado em JSON. Com --baseline, termina com codigo 1 se o p95 de
+alguma rota piorar mais que --max-regression em relacao ao resultado anterior.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pymysql
+import pymysql.cursors
+import requests
+
+from seed import DB_CONFIG, SALON_NAME_PREFIX, USER_EMAIL_DOMAIN, salon_slots
+
+ROUTES = ['login', 'appointments', 'available_times', 'create_appointment', 'cancel_appointment']
+
+DEFAULT_MIX = 'login=1,appointments=3,available_times=10,create_appointment=2,cancel_appointment=1'
+
+# Trecho da mensagem flash de horario ja ocupado (src/main.py)
+CONFLICT_MESSAGE = 'já está reservado'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark do fluxo de agendamento')
+    parser.add_argument('--base-url', default=os.getenv('BENCH_BASE_URL', 'http://localhost:8080'))
+    parser.add_argument('--concurrency', type=int, default=20, help='usuarios virtuais simultaneos')
+    parser.add_argument('--duration', type=float, default=60, help='segundos de carga medida')
+    parser.add_argument('--warmup', type=float, default=10, help='segundos de carga antes da medicao')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='peso de cada rota no loop dos usuarios')
+    parser.add_argument('--password', default='bench123')
+    parser.add_argument('--calibration-requests', type=int, default=20, help='requisicoes por rota na calibracao (0 desativa)')
+    parser.add_argument('--output', default=None, help='arquivo JSON de resultado (padrao: stdout)')
+    parser.add_argument('--baseline', default=None, help='resultado anterior para comparar')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='piora maxima aceita no p95 (0.2 = 20%%)')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        route, weight = item.split('=')
+        if route.strip() not in ROUTES:
+            raise SystemExit(f'Rota desconhecida no --mix: {route}')
+        weights[route.strip()] = float(weight)
+    return weights
+
+
+class Recorder:
+    """Acumula as latencias, os erros e os conflitos de cada rota (somente durante a janela medida)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.measuring = False
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.conflicts = {route: 0 for route in ROUTES}
+
+    def record(self, route, seconds, outcome):
+        if not self.measuring:
+            return
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if outcome == 'error':
+                self.errors[route] += 1
+            elif outcome == 'conflict':
+                self.conflicts[route] += 1
+
+
+class Workload:
+    """Dados do seed usados para montar requisicoes realistas"""
+
+    def __init__(self, args):
+        connection = pymysql.connect(**DB_CONFIG)
+        try:
+            cur = connection.cursor()
+            cur.execute("""
+                SELECT h.id, h.salon_id, s.opening_day, s.closing_day, s.opening_time, s.closing_time
+                FROM hairdressers h
+                INNER JOIN salons s ON h.salon_id = s.id
+                WHERE s.name LIKE %s
+            """, (SALON_NAME_PREFIX + '%',))
+            self.hairdressers = cur.fetchall()
+            cur.execute("SELECT id, email FROM users_data WHERE email LIKE %s", (f'%@{USER_EMAIL_DOMAIN}',))
+            self.users = cur.fetchall()
+        finally:
+            connection.close()
+        if not self.hairdressers or not self.users:
+            raise SystemExit('Banco sem dados do benchmark: rode bench/seed.py antes')
+        self.slots = {h['id']: salon_slots(h) for h in self.hairdressers}
+
+    def cancellable(self, user_id):
+        """Agendamentos futuros ainda ativos do usuario"""
+        connection = pymysql.connect(**DB_CONFIG)
+        try:
+            cur = connection.cursor()
+            cur.execute("""
+                SELECT id
+                FROM appointments
+                WHERE user_id = %s
+                AND appointment_date >= CURDATE()
+                AND status != 'cancelled'
+            """, (user_id,))
+            return [row['id'] for row in cur.fetchall()]
+        finally:
+            connection.close()
+
+    def random_slot(self, rng):
+        """Cabeleireiro, dia de funcionamento nos proximos 30 dias e horario"""
+        hairdresser = rng.choice(self.hairdressers)
+        weekdays, times = self.slots[hairdresser['id']]
+        day = date.today() + timedelta(days=rng.randint(1, 30))
+        while day.weekday() not in weekdays:
+            day += timedelta(days=1)
+        return hairdresser, day.isoformat(), rng.choice(times)[:5]
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, args, workload, recorder, user, weights, stop, rng):
+        super().__init__(daemon=True)
+        self.args = args
+        self.workload = workload
+        self.recorder = recorder
+        self.user = user
+        self.weights = weights
+        self.stop = stop
+        self.rng = rng
+        self.http = requests.Session()
+        self.to_cancel = workload.cancellable(user['id'])
+        self.rng.shuffle(self.to_cancel)
+
+    def request(self, route, method, path, form=False, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.args.base_url + path, allow_redirects=False, timeout=30, **kwargs)
+            outcome = 'ok' if response.status_code < 400 else 'error'
+        except requests.RequestException:
+            response, outcome = None, 'error'
+        elapsed = time.perf_counter() - started
+        # Formularios respondem 200/302 tambem na falha: o resultado real esta na mensagem flash
+        if form and outcome == 'ok' and self.recorder.measuring:
+            outcome = self.flash_outcome(response)
+        self.recorder.record(route, elapsed, outcome)
+        return outcome == 'ok'
+
+    def flash_outcome(self, response):
+        """Classifica a resposta pela mensagem flash: 'ok', 'conflict' ou 'error'
+
+        No redirecionamento a mensagem fica na sessao; a pagina de login a exibe
+        sem consultar o banco, entao e usada para le-la.
+        """
+        try:
+            if response.is_redirect:
+                response = self.http.get(self.args.base_url + '/login', allow_redirects=False, timeout=30)
+            page = response.text
+        except requests.RequestException:
+            return 'error'
+        if 'alert-error' not in page:
+            return 'ok'
+        return 'conflict' if CONFLICT_MESSAGE in page else 'error'
+
+    def login(self):
+        return self.request('login', 'POST', '/login', form=True, data={'email': self.user['email'], 'password': self.args.password})
+
+    def step(self, route):
+        if route == 'login':
+            self.login()
+        elif route == 'appointments':
+            self.request(route, 'GET', '/appointments')
+        elif route == 'available_times':
+            hairdresser, day, _ = self.workload.random_slot(self.rng)
+            self.request(route, 'GET', f"/api/available_times/{hairdresser['id']}/{day}")
+        elif route == 'create_appointment':
+            hairdresser, day, slot = self.workload.random_slot(self.rng)
+            self.request(route, 'POST', '/create_appointment', form=True, data={
+                'salon_id': hairdresser['salon_id'],
+                'hairdresser_id': hairdresser['id'],
+                'appointment_date': day,
+                'appointment_time': slot,
+                'service_type': 'Corte Feminino'
+            })
+        elif route == 'cancel_appointment' and self.to_cancel:
+            self.request(route, 'POST', f'/cancel_appointment/{self.to_cancel.pop()}', form=True)
+
+    def run(self):
+        self.login()
+        routes = list(self.weights)
+        weights = [self.weights[r] for r in routes]
+        while not self.stop.is_set():
+            self.step(self.rng.choices(routes, weights)[0])
+
+
+def percentile(values, p):
+    """Percentil pelo metodo nearest-rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def questions(cur):
+    cur.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    return int(cur.fetchone()['Value'])
+
+
+def calibrate(args, workload, rng):
+    """Mede as consultas por requisicao de cada rota, executando uma de cada vez"""
+    monitor = pymysql.connect(**DB_CONFIG)
+    recorder = Recorder()
+    result = {}
+    try:
+        cur = monitor.cursor()
+        user = rng.choice(workload.users)
+        vu = VirtualUser(args, workload, recorder, user, {}, threading.Event(), rng)
+        for route in ROUTES:
+            before = questions(cur)
+            done = 0
+            for _ in range(args.calibration_requests):
+                if route == 'cancel_appointment' and not vu.to_cancel:
+                    break
+                else:
+                    vu.step(route)
+                done += 1
+            # O proprio SHOW STATUS conta como uma pergunta
+            total = questions(cur) - before - 1
+            result[route] = round(total / done, 2) if done else None
+    finally:
+        monitor.close()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(result, baseline, max_regression):
+    """Lista as rotas cujo p95 piorou alem do limite"""
+    regressions = []
+    for route, stats in result['routes'].items():
+        before = baseline.get('routes', {}).get(route, {}).get('p95_ms')
+        after = stats.get('p95_ms')
+        if before and after and after > before * (1 + max_regression):
+            regressions.append({'route': route, 'baseline_p95_ms': before, 'p95_ms': after})
+    return regressions
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    workload = Workload(args)
+    recorder = Recorder()
+    stop = threading.Event()
+
+    users = rng.sample(workload.users, min(args.concurrency, len(workload.users)))
+    threads = [VirtualUser(args, workload, recorder, user, weights, stop, random.Random(rng.random())) for user in users]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.warmup)
+    recorder.measuring = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.measuring = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    queries = calibrate(args, workload, rng) if args.calibration_requests else {}
+
+    routes = {}
+    for route in ROUTES:
+        latencies = recorder.latencies[route]
+        if not latencies:
+            continue
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': recorder.errors[route],
+            'conflicts': recorder.conflicts[route],
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+            'db_queries_per_request': queries.get(route)
+        }
+    total = sum(r['requests'] for r in routes.values())
+    result = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'base_url': args.base_url,
+            'concurrency': len(threads),
+            'duration_s': round(elapsed, 2),
+            'warmup_s': args.warmup,
+            'mix': weights
+        },
+        'totals': {
+            'requests': total,
+            'errors': sum(r['errors'] for r in routes.values()),
+            'conflicts': sum(r['conflicts'] for r in routes.values()),
+            'throughput_rps': round(total / elapsed, 2)
+        },
+        'routes': routes
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            result['regressions'] = compare(result, json.load(f), args.max_regression)
+        status = 1 if result['regressions'] else 0
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Popula o MySQL com dados sinteticos para o benchmark (bench/load.py).
+
+Uso (com o MySQL do docker-compose rodando):
+    python bench/seed.py --appointments 2000000
+
+Cria saloes, cabeleireiros, usuarios e agendamentos respeitando o schema de
+db/all_tables.sql, inclusive o indice unico de horarios ativos. Todos os
+registros criados sao identificados pelo prefixo "Bench Salao" (saloes) e pelo
+dominio bench.local (usuarios), e --reset apaga apenas esses registros antes
+de popular de novo. Todos os usuarios usam a senha de --password.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import bcrypt
+import pymysql
+import pymysql.cursors
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'user': os.getenv('DB_USER', 'vivian_user'),
+    'password': os.getenv('DB_PASSWORD', 'vivian_password'),
+    'db': os.getenv('DB_NAME', 'users'),
+    'port': int(os.getenv('DB_PORT', '3306')),
+    'cursorclass': pymysql.cursors.DictCursor
+}
+
+WEEKDAYS = ['segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo']
+
+SPECIALTIES = [
+    'Corte Masculino', 'Corte Feminino', 'Coloracao', 'Hidratacao', 'Escova', 'Alisamento',
+    'Penteado', 'Manicure', 'Pedicure', 'Barba', 'Design de Sobrancelha', 'Maquiagem'
+]
+
+SLOT_MINUTES = 30
+
+SALON_NAME_PREFIX = 'Bench Salao '
+USER_EMAIL_DOMAIN = 'bench.local'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Popula o banco com dados sinteticos para o benchmark')
+    parser.add_argument('--salons', type=int, default=50)
+    parser.add_argument('--hairdressers-per-salon', type=int, default=8)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--appointments', type=int, default=2000000)
+    parser.add_argument('--days-back', type=int, default=365, help='dias de historico antes de hoje')
+    parser.add_argument('--days-ahead', type=int, default=60, help='dias de agenda depois de hoje')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--password', default='bench123')
+    parser.add_argument('--bcrypt-rounds', type=int, default=int(os.getenv('BCRYPT_ROUNDS', '12')))
+    parser.add_argument('--seed', type=int, default=42, help='semente do gerador aleatorio')
+    parser.add_argument('--reset', action='store_true', help='apaga os dados de um seed anterior antes de popular')
+    return parser.parse_args()
+
+
+def insert_batches(connection, sql, rows, batch_size):
+    """Insere as linhas em lotes (o executemany do PyMySQL gera INSERTs com varias linhas)"""
+    cur = connection.cursor()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cur.executemany(sql, batch)
+            connection.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        cur.executemany(sql, batch)
+        connection.commit()
+        total += len(batch)
+    return total
+
+
+def reset(connection):
+    """Apaga os registros criados por um seed anterior (agendamentos saem em cascata)"""
+    cur = connection.cursor()
+    cur.execute("DELETE FROM salons WHERE name LIKE %s", (SALON_NAME_PREFIX + '%',))
+    cur.execute("DELETE FROM users_data WHERE email LIKE %s", (f'%@{USER_EMAIL_DOMAIN}',))
+    connection.commit()
+
+
+def seed_salons(connection, args, rng):
+    rows = []
+    for n in range(1, args.salons + 1):
+        opening_day = rng.choice([0, 0, 1])
+        closing_day = rng.choice([4, 5, 5, 6])
+        opening_hour = rng.choice([8, 9, 9, 10])
+        closing_hour = rng.choice([17, 18, 19, 20])
+        rows.append((
+            f'{SALON_NAME_PREFIX}{n:05d}', f'Salao sintetico {n}', f'Rua do Benchmark, {n}', f'(11)9{n:04d}-0000',
+            'https://example.com/salao.jpg', WEEKDAYS[opening_day], WEEKDAYS[closing_day],
+            f'{opening_hour:02d}:00:00', f'{closing_hour:02d}:00:00'
+        ))
+    insert_batches(connection, """
+        INSERT INTO salons (name, description, address, phone, image_url, opening_day, closing_day, opening_time, closing_time)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows, args.batch_size)
+
+    cur = connection.cursor()
+    cur.execute("""
+        SELECT id, opening_day, closing_day, opening_time, closing_time
+        FROM salons
+        WHERE name LIKE %s
+        ORDER BY id
+    """, (SALON_NAME_PREFIX + '%',))
+    return cur.fetchall()
+
+
+def seed_hairdressers(connection, args, rng, salons):
+    rows = []
+    for salon in salons:
+        for n in range(1, args.hairdressers_per_salon + 1):
+            specialties = ','.join(rng.sample(SPECIALTIES, rng.randint(1, 4)))
+            rows.append((
+                f'Bench Cabeleireiro {salon["id"]}-{n}', salon['id'], specialties,
+                f'(11)9{n:04d}-1111', f'cabeleireiro{salon["id"]}.{n}@{USER_EMAIL_DOMAIN}'
+            ))
+    insert_batches(connection, """
+        INSERT INTO hairdressers (name, salon_id, specialties, phone, email)
+        VALUES (%s, %s, %s, %s, %s)
+    """, rows, args.batch_size)
+
+    cur = connection.cursor()
+    cur.execute("""
+        SELECT h.id, h.salon_id
+        FROM hairdressers h
+        INNER JOIN salons s ON h.salon_id = s.id
+        WHERE s.name LIKE %s
+        ORDER BY h.id
+    """, (SALON_NAME_PREFIX + '%',))
+    return cur.fetchall()
+
+
+def seed_users(connection, args, rng):
+    # Um unico hash para todos: o custo do bcrypt nao deve dominar o tempo do seed
+    hashed = bcrypt.hashpw(args.password.encode('utf-8'), bcrypt.gensalt(args.bcrypt_rounds)).decode('utf-8')
+    rows = (
+        (f'Bench Usuario {n}', f'{90000000000 + n}', f'usuario{n}@{USER_EMAIL_DOMAIN}', hashed,
+         rng.choice('MFI'), f'(11)9{n % 10000:04d}-2222')
+        for n in range(1, args.users + 1)
+    )
+    insert_batches(connection, """
+        INSERT INTO users_data (name, cpf, email, password, gender, phone)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows, args.batch_size)
+
+    cur = connection.cursor()
+    cur.execute("SELECT id FROM users_data WHERE email LIKE %s ORDER BY id", (f'%@{USER_EMAIL_DOMAIN}',))
+    return [row['id'] for row in cur.fetchall()]
+
+
+def salon_slots(salon):
+    """Dias da semana em que o salao abre e horarios possiveis de cada dia"""
+    opening_day = WEEKDAYS.index(salon['opening_day'])
+    closing_day = WEEKDAYS.index(salon['closing_day'])
+    if opening_day <= closing_day:
+        weekdays = set(range(opening_day, closing_day + 1))
+    else:
+        weekdays = set(range(opening_day, 7)) | set(range(0, closing_day + 1))
+    opening = int(salon['opening_time'].total_seconds() // 60)
+    closing = int(salon['closing_time'].total_seconds() // 60)
+    times = [f'{m // 60:02d}:{m % 60:02d}:00' for m in range(opening, closing, SLOT_MINUTES)]
+    return weekdays, times
+
+
+def appointment_rows(args, rng, salons, hairdressers, user_ids, probability):
+    """Gera agendamentos ocupando cada horario livre com a probabilidade informada"""
+    today = date.today()
+    days = [today + timedelta(days=n) for n in range(-args.days_back, args.days_ahead + 1)]
+    schedules = {salon['id']: salon_slots(salon) for salon in salons}
+    for hairdresser in hairdressers:
+        weekdays, times = schedules[hairdresser['salon_id']]
+        for day in days:
+            if day.weekday() not in weekdays:
+                continue
+            for slot in times:
+                if rng.random() >= probability:
+                    continue
+                if day < today:
+                    status = 'cancelled' if rng.random() < 0.1 else 'confirmed'
+                else:
+                    status = rng.choice(['pending', 'confirmed', 'confirmed'])
+                yield (
+                    rng.choice(user_ids), hairdresser['salon_id'], hairdresser['id'], day, slot,
+                    rng.choice(SPECIALTIES), status
+                )
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        if args.reset:
+            reset(connection)
+
+        salons = seed_salons(connection, args, rng)
+        hairdressers = seed_hairdressers(connection, args, rng, salons)
+        user_ids = seed_users(connection, args, rng)
+
+        # Quantidade de horarios que existem no periodo, para acertar o total pedido
+        capacity = 0
+        salon_by_id = {salon['id']: salon for salon in salons}
+        total_days = args.days_back + args.days_ahead + 1
+        for hairdresser in hairdressers:
+            weekdays, times = salon_slots(salon_by_id[hairdresser['salon_id']])
+            capacity += round(total_days * len(weekdays) / 7) * len(times)
+        probability = min(args.appointments / capacity, 0.95) if capacity else 0
+        if args.appointments > capacity * 0.95:
+            print(f'Aviso: o periodo comporta cerca de {int(capacity * 0.95)} agendamentos; '
+                  f'aumente --days-back ou --hairdressers-per-salon para chegar a {args.appointments}', file=sys.stderr)
+
+        cur = connection.cursor()
+        # Os ids de salao, cabeleireiro e usuario acabaram de ser lidos do banco
+        cur.execute("SET SESSION foreign_key_checks = 0")
+        appointments = insert_batches(connection, """
+            INSERT INTO appointments (user_id, salon_id, hairdresser_id, appointment_date, appointment_time, service_type, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, appointment_rows(args, rng, salons, hairdressers, user_ids, probability), args.batch_size)
+        cur.execute("SET SESSION foreign_key_checks = 1")
+        cur.execute("ANALYZE TABLE salons, hairdressers, users_data, appointments")
+        cur.fetchall()
+    finally:
+        connection.close()
+
+    print(json.dumps({
+        'salons': len(salons),
+        'hairdressers': len(hairdressers),
+        'users': len(user_ids),
+        'appointments': appointments,
+        'seconds': round(time.monotonic() - started, 1)
+    }))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,7 +27,8 @@ CREATE TABLE `salons` (
   `closing_time` TIME NOT NULL DEFAULT '18:00:00',
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `idx_salons_name` (`name`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
 CREATE TABLE `hairdressers` (
@@ -55,6 +56,7 @@ CREATE TABLE `hairdressers` (
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
+  KEY `idx_hairdressers_salon_name` (`salon_id`, `name`, `id`),
   FOREIGN KEY (`salon_id`) REFERENCES `salons`(`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
@@ -65,13 +67,67 @@ CREATE TABLE `appointments` (
   `hairdresser_id` INT(11) NOT NULL,
   `appointment_date` DATE NOT NULL,
   `appointment_time` TIME NOT NULL,
+  `duration_minutes` SMALLINT UNSIGNED NOT NULL DEFAULT 30,
   `service_type` VARCHAR(255) NOT NULL,
-  `status` ENUM('pending', 'confirmed', 'cancelled') NOT NULL DEFAULT 'pending',
+  `status` ENUM('pending', 'confirmed', 'cancelled', 'completed') NOT NULL DEFAULT 'pending',
+  `active_slot` TINYINT AS (IF(`status` = 'cancelled', NULL, 1)) STORED,
   `notes` TEXT NULL,
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
+  KEY `idx_appointments_user_date` (`user_id`, `appointment_date`, `appointment_time`),
+  KEY `idx_appointments_status_date` (`status`, `appointment_date`),
+  UNIQUE KEY `uq_appointments_active_slot` (`hairdresser_id`, `appointment_date`, `appointment_time`, `active_slot`),
+  FOREIGN KEY (`user_id`) REFERENCES `users_data`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`salon_id`) REFERENCES `salons`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`hairdresser_id`) REFERENCES `hairdressers`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+CREATE TABLE `appointments_archive` (
+  `id` INT(11) NOT NULL,
+  `user_id` INT(11) NOT NULL,
+  `salon_id` INT(11) NOT NULL,
+  `hairdresser_id` INT(11) NOT NULL,
+  `appointment_date` DATE NOT NULL,
+  `appointment_time` TIME NOT NULL,
+  `duration_minutes` SMALLINT UNSIGNED NOT NULL DEFAULT 30,
+  `service_type` VARCHAR(255) NOT NULL,
+  `status` ENUM('pending', 'confirmed', 'cancelled', 'completed') NOT NULL,
+  `notes` TEXT NULL,
+  `created_at` TIMESTAMP NULL,
+  `updated_at` TIMESTAMP NULL,
+  `archived_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_appointments_archive_user_date` (`user_id`, `appointment_date`, `appointment_time`),
   FOREIGN KEY (`user_id`) REFERENCES `users_data`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`salon_id`) REFERENCES `salons`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`hairdresser_id`) REFERENCES `hairdressers`(`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+CREATE TABLE `jobs` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `name` VARCHAR(100) NOT NULL,
+  `payload` JSON NOT NULL,
+  `status` ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `max_attempts` INT NOT NULL DEFAULT 5,
+  `run_at` DATETIME NOT NULL,
+  `locked_by` VARCHAR(100) NULL,
+  `locked_at` DATETIME NULL,
+  `last_error` TEXT NULL,
+  `unique_key` VARCHAR(191) NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_jobs_status_run_at` (`status`, `run_at`),
+  KEY `idx_jobs_status_locked_at` (`status`, `locked_at`),
+  UNIQUE KEY `uq_jobs_unique_key` (`unique_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE `flask_sessions` (
+  `session_id` VARCHAR(255) NOT NULL,
+  `data` BLOB NOT NULL,
+  `expiry` DATETIME NOT NULL,
+  PRIMARY KEY (`session_id`),
+  KEY `idx_flask_sessions_expiry` (`expiry`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
@@ -0,0 +1,142 @@
+"""Verifica o plano de execucao (EXPLAIN) de todas as consultas SQL de src/main.py.
+
+Uso (com o MySQL do docker-compose rodando e populado):
+    python db/check_query_plans.py
+
+Le as mesmas variaveis de ambiente da aplicacao (DB_HOST, DB_USER, ...).
+Termina com codigo 1 se alguma consulta fizer varredura completa
+(type ALL ou index) em uma das tabelas quentes, exceto as marcadas com o
+comentario /* full-scan */.
+"""
+import ast
+import os
+import re
+import sys
+
+import pymysql
+import pymysql.cursors
+
+MAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'main.py')
+
+# Tabelas que crescem com o uso e nunca podem ser lidas por inteiro
+HOT_TABLES = {'appointments', 'appointments_archive'}
+
+# Tipos de acesso do EXPLAIN que indicam leitura da tabela ou do indice inteiro
+FULL_SCAN_TYPES = {'ALL', 'index'}
+
+# Consultas que leem a tabela inteira de proposito (ex: exportacao) levam este comentario
+FULL_SCAN_MARKER = '/* full-scan */'
+
+SQL_KEYWORDS = {'AND', 'OR', 'BETWEEN', 'IN', 'SET', 'WHERE', 'VALUES', 'LIMIT', 'OFFSET', 'NOT', 'IS', 'LIKE', 'ON'}
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'user': os.getenv('DB_USER', 'vivian_user'),
+    'password': os.getenv('DB_PASSWORD', 'vivian_password'),
+    'db': os.getenv('DB_NAME', 'users'),
+    'port': int(os.getenv('DB_PORT', '3306')),
+    'cursorclass': pymysql.cursors.DictCursor
+}
+
+
+def extract_statements(path):
+    """Retorna (linha, sql) de cada literal SQL do arquivo, incluindo f-strings"""
+    tree = ast.parse(open(path, encoding='utf-8').read())
+    # Os pedacos constantes das f-strings ja sao tratados junto com a f-string inteira
+    fragments = {id(v) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for v in node.values}
+    statements = []
+    for node in ast.walk(tree):
+        if id(node) in fragments:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            sql = node.value
+        elif isinstance(node, ast.JoinedStr):
+            # A lista de placeholders do IN vira um unico %s; outros trechos dinamicos
+            # (ex: filtro opcional do cursor de paginacao) sao omitidos
+            sql = ''
+            for v in node.values:
+                if isinstance(v, ast.Constant):
+                    sql += v.value
+                elif re.search(r'IN\s*\($', sql, re.IGNORECASE):
+                    sql += '%s'
+        else:
+            continue
+        sql = ' '.join(sql.split())
+        if re.match(r'^(SELECT|UPDATE|DELETE)\s', sql, re.IGNORECASE):
+            statements.append((node.lineno, sql))
+    return sorted(set(statements))
+
+
+def sample_value(column):
+    """Gera um valor de exemplo compativel com o tipo da coluna"""
+    column = column.lower()
+    if 'date' in column:
+        return '2030-01-07'
+    if 'time' in column:
+        return '10:00:00'
+    if column == 'status':
+        return 'confirmed'
+    if column.endswith('id') or column in ('limit', 'offset'):
+        return 1
+    return 'exemplo'
+
+
+def sample_args(sql):
+    """Monta um argumento de exemplo para cada %s, olhando a coluna que o precede"""
+    args = []
+    for match in re.finditer(r'%s', sql):
+        preceding = sql[:match.start()].replace('%s', '')
+        words = [w for w in re.findall(r'[A-Za-z_][\w.]*', preceding) if w.upper() not in SQL_KEYWORDS]
+        column = words[-1].split('.')[-1] if words else 'id'
+        args.append(sample_value(column))
+    return args
+
+
+def table_aliases(sql):
+    """Mapeia apelidos (ex: appointments a) para o nome real da tabela"""
+    aliases = {}
+    for table, alias in re.findall(r'(?:FROM|JOIN|UPDATE)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS | {'INNER', 'LEFT', 'RIGHT', 'JOIN', 'ORDER', 'GROUP'}:
+            aliases[alias] = table
+    return aliases
+
+
+def main():
+    statements = extract_statements(MAIN_PY)
+    connection = pymysql.connect(**DB_CONFIG)
+    failures = []
+    try:
+        cur = connection.cursor()
+        for lineno, sql in statements:
+            try:
+                cur.execute('EXPLAIN ' + sql, sample_args(sql))
+            except pymysql.MySQLError as e:
+                failures.append((lineno, sql, f'erro no EXPLAIN: {e}'))
+                continue
+            aliases = table_aliases(sql)
+            for row in cur.fetchall():
+                table = aliases.get(row.get('table'), row.get('table'))
+                status = 'ok'
+                if table in HOT_TABLES and row.get('type') in FULL_SCAN_TYPES:
+                    if FULL_SCAN_MARKER in sql:
+                        status = 'full scan (intencional)'
+                    else:
+                        status = 'FULL SCAN'
+                        failures.append((lineno, sql, f"varredura completa em {table} (type={row['type']})"))
+                print(f"main.py:{lineno:<5} {str(table):<14} type={str(row.get('type')):<7} key={str(row.get('key')):<36} {status}")
+    finally:
+        connection.rollback()
+        connection.close()
+
+    if failures:
+        print(f'\n{len(failures)} consulta(s) com plano ruim:')
+        for lineno, sql, reason in failures:
+            print(f'  main.py:{lineno}: {reason}\n    {sql}')
+        return 1
+    print(f'\n{len(statements)} consultas verificadas, nenhuma varredura completa em {", ".join(sorted(HOT_TABLES))}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,20 @@
+-- Indices compostos para as consultas mais frequentes
+-- Aplicar em bancos criados antes desta versao do all_tables.sql:
+--   mysql -u vivian_user -p users < db/migrations/001_appointments_indexes.sql
+
+-- Horarios ocupados de um cabeleireiro em um dia ou periodo
+-- (get_available_times, consultas por periodo, create_appointment, update_appointment)
+ALTER TABLE `appointments`
+  ADD INDEX `idx_appointments_hairdresser_slot` (`hairdresser_id`, `appointment_date`, `appointment_time`, `status`);
+
+-- Historico do usuario ordenado por data e hora (appointments)
+ALTER TABLE `appointments`
+  ADD INDEX `idx_appointments_user_date` (`user_id`, `appointment_date`, `appointment_time`);
+
+-- Cabeleireiros de um salao ordenados por nome (hairdressers_by_salon)
+ALTER TABLE `hairdressers`
+  ADD INDEX `idx_hairdressers_salon_name` (`salon_id`, `name`);
+
+-- Busca e ordenacao de saloes por nome
+ALTER TABLE `salons`
+  ADD INDEX `idx_salons_name` (`name`);
@@ -0,0 +1,12 @@
+-- Garante no banco que um cabeleireiro nao tenha dois agendamentos ativos no mesmo horario.
+-- O MySQL nao tem indice parcial: a coluna gerada vale 1 para agendamentos ativos e NULL
+-- para cancelados, e o indice UNIQUE ignora linhas com NULL.
+--
+-- Antes de aplicar, confira se ja existem horarios duplicados (a criacao do indice falha se houver):
+--   SELECT hairdresser_id, appointment_date, appointment_time, COUNT(*)
+--   FROM appointments WHERE status != 'cancelled'
+--   GROUP BY hairdresser_id, appointment_date, appointment_time HAVING COUNT(*) > 1;
+
+ALTER TABLE `appointments`
+  ADD COLUMN `active_slot` TINYINT AS (IF(`status` = 'cancelled', NULL, 1)) STORED AFTER `status`,
+  ADD UNIQUE KEY `uq_appointments_active_slot` (`hairdresser_id`, `appointment_date`, `appointment_time`, `active_slot`);
@@ -0,0 +1,9 @@
+-- Tabela de sessoes usada com SESSION_BACKEND=mysql
+-- A data de expiracao e gravada em UTC; o indice permite apagar as expiradas em lotes.
+CREATE TABLE IF NOT EXISTS `flask_sessions` (
+  `session_id` VARCHAR(255) NOT NULL,
+  `data` BLOB NOT NULL,
+  `expiry` DATETIME NOT NULL,
+  PRIMARY KEY (`session_id`),
+  KEY `idx_flask_sessions_expiry` (`expiry`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
@@ -0,0 +1,7 @@
+-- Duracao de cada agendamento, em minutos. O agendamento ocupa o intervalo
+-- [appointment_time, appointment_time + duration_minutes) e a aplicacao recusa
+-- intervalos que se sobreponham a outro agendamento ativo do mesmo cabeleireiro.
+-- Agendamentos existentes ficam com 30 minutos (um horario da agenda antiga).
+
+ALTER TABLE `appointments`
+  ADD COLUMN `duration_minutes` SMALLINT UNSIGNED NOT NULL DEFAULT 30 AFTER `appointment_time`;
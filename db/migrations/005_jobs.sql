@@ -0,0 +1,24 @@
+-- Fila de tarefas em segundo plano (flask --app main jobs worker).
+-- As rotas de agendamento gravam a tarefa na mesma transacao do agendamento;
+-- unique_key evita que as tarefas periodicas sejam agendadas mais de uma vez
+-- por intervalo quando ha varios workers.
+
+CREATE TABLE `jobs` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `name` VARCHAR(100) NOT NULL,
+  `payload` JSON NOT NULL,
+  `status` ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `max_attempts` INT NOT NULL DEFAULT 5,
+  `run_at` DATETIME NOT NULL,
+  `locked_by` VARCHAR(100) NULL,
+  `locked_at` DATETIME NULL,
+  `last_error` TEXT NULL,
+  `unique_key` VARCHAR(191) NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_jobs_status_run_at` (`status`, `run_at`),
+  KEY `idx_jobs_status_locked_at` (`status`, `locked_at`),
+  UNIQUE KEY `uq_jobs_unique_key` (`unique_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
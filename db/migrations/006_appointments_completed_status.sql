@@ -0,0 +1,7 @@
+-- Status 'completed' para agendamentos que ja passaram, marcado pela tarefa
+-- periodica complete_past_appointments. O indice permite que ela encontre os
+-- agendamentos ativos anteriores a hoje sem ler a tabela inteira.
+
+ALTER TABLE `appointments`
+  MODIFY COLUMN `status` ENUM('pending', 'confirmed', 'cancelled', 'completed') NOT NULL DEFAULT 'pending',
+  ADD KEY `idx_appointments_status_date` (`status`, `appointment_date`);
@@ -0,0 +1,29 @@
+-- Arquivo de agendamentos antigos. A tarefa periodica archive_appointments move
+-- para esta tabela, em lotes, os agendamentos concluidos ou cancelados com mais de
+-- ARCHIVE_APPOINTMENTS_AFTER_DAYS dias, mantendo o id original. Assim a tabela
+-- appointments, lida pelas consultas de horarios livres, guarda so o periodo recente.
+--
+-- Particionar appointments por data nao e possivel no MySQL enquanto a tabela
+-- tiver chaves estrangeiras, por isso o historico fica em uma tabela separada.
+-- A tela de agendamentos so le o arquivo com ?history=1.
+
+CREATE TABLE `appointments_archive` (
+  `id` INT(11) NOT NULL,
+  `user_id` INT(11) NOT NULL,
+  `salon_id` INT(11) NOT NULL,
+  `hairdresser_id` INT(11) NOT NULL,
+  `appointment_date` DATE NOT NULL,
+  `appointment_time` TIME NOT NULL,
+  `duration_minutes` SMALLINT UNSIGNED NOT NULL DEFAULT 30,
+  `service_type` VARCHAR(255) NOT NULL,
+  `status` ENUM('pending', 'confirmed', 'cancelled', 'completed') NOT NULL,
+  `notes` TEXT NULL,
+  `created_at` TIMESTAMP NULL,
+  `updated_at` TIMESTAMP NULL,
+  `archived_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_appointments_archive_user_date` (`user_id`, `appointment_date`, `appointment_time`),
+  FOREIGN KEY (`user_id`) REFERENCES `users_data`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`salon_id`) REFERENCES `salons`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`hairdresser_id`) REFERENCES `hairdressers`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
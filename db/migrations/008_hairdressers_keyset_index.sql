@@ -0,0 +1,8 @@
+-- A listagem de cabeleireiros e paginada pela chave (nome do salao, id do salao, nome, id).
+-- Para cada salao lido em ordem por idx_salons_name, os cabeleireiros vem deste indice ja
+-- em ordem de nome; o id passa a fazer parte explicita do indice.
+--   mysql -u vivian_user -p users < db/migrations/008_hairdressers_keyset_index.sql
+
+ALTER TABLE `hairdressers`
+  DROP INDEX `idx_hairdressers_salon_name`,
+  ADD INDEX `idx_hairdressers_salon_name` (`salon_id`, `name`, `id`);
@@ -0,0 +1,8 @@
+-- O indice unico uq_appointments_active_slot (002) comeca pelas mesmas colunas
+-- (hairdresser_id, appointment_date, appointment_time) e atende as consultas de
+-- horarios ocupados e a chave estrangeira de hairdresser_id. O indice de 001 so
+-- custava escrita a mais em cada agendamento.
+--   mysql -u vivian_user -p users < db/migrations/009_drop_appointments_hairdresser_slot.sql
+
+ALTER TABLE `appointments`
+  DROP INDEX `idx_appointments_hairdresser_slot`;
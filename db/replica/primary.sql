@@ -0,0 +1,5 @@
+-- Executado no primario do docker-compose depois de all_tables.sql.
+-- O usuario da aplicacao precisa de REPLICATION CLIENT para ler o atraso da
+-- replica (SHOW REPLICA STATUS); o GRANT chega a replica pela propria replicacao.
+
+GRANT REPLICATION CLIENT ON *.* TO 'vivian_user'@'%';
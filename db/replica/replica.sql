@@ -0,0 +1,13 @@
+-- Executado na primeira inicializacao do servico mysql-replica (profile "replica").
+-- A replica copia todo o binlog do primario desde o inicio (GTID com
+-- SOURCE_AUTO_POSITION), inclusive o banco, as tabelas e o usuario da aplicacao.
+
+CHANGE REPLICATION SOURCE TO
+  SOURCE_HOST = 'mysql-db',
+  SOURCE_PORT = 3306,
+  SOURCE_USER = 'root',
+  SOURCE_PASSWORD = 'rootpassword',
+  SOURCE_AUTO_POSITION = 1,
+  GET_SOURCE_PUBLIC_KEY = 1;
+
+START REPLICA;
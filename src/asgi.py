@@ -0,0 +1,217 @@
+"""Modo ASGI da aplicação.
+
+Atende de forma assíncrona as consultas chamadas em sequência pela tela de
+agendamentos (/api/hairdressers_by_salon, /api/salon_schedule e
+/api/available_times), com um pool aiomysql próprio. Todas as outras rotas
+são repassadas para a aplicação Flask de main.py, executada em threads.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080 --workers 2
+"""
+import asyncio
+import io
+import os
+import re
+from datetime import datetime
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.utils import redirect
+from werkzeug.wrappers import Request
+
+from main import (
+    app as flask_app, session, availability_index, reference_cache, DB_CONFIG, DB_POOL_CONFIG,
+    HAIRDRESSER_SCHEDULE_SQL, BOOKED_TIMES_SQL, SALON_SCHEDULE_SQL, HAIRDRESSERS_BY_SALON_SQL,
+    build_schedule, booked_bitmap, available_slots, salon_is_open, service_duration,
+    hairdressers_by_salon_response, salon_schedule_response, AvailableTimes
+)
+
+# Configuração do pool assíncrono (um por processo do servidor ASGI)
+ASYNC_DB_POOL_CONFIG = {
+    'minsize': int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '1')),
+    'maxsize': int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '20')),
+    'recycle': int(DB_POOL_CONFIG['recycle'])
+}
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def get_pool():
+    """Cria o pool aiomysql na primeira chamada"""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=DB_CONFIG['host'],
+                port=DB_CONFIG['port'],
+                user=DB_CONFIG['user'],
+                password=DB_CONFIG['password'],
+                db=DB_CONFIG['db'],
+                cursorclass=aiomysql.DictCursor,
+                autocommit=True,
+                minsize=ASYNC_DB_POOL_CONFIG['minsize'],
+                maxsize=ASYNC_DB_POOL_CONFIG['maxsize'],
+                pool_recycle=ASYNC_DB_POOL_CONFIG['recycle']
+            )
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+async def fetch_all(sql, args=None):
+    """Executa uma consulta em uma conexão do pool assíncrono e retorna todas as linhas"""
+    pool = await get_pool()
+    async with pool.acquire() as connection:
+        async with connection.cursor() as cur:
+            await cur.execute(sql, args)
+            return await cur.fetchall()
+
+def build_environ(scope, body=b''):
+    """Monta o environ WSGI equivalente ao scope ASGI (para Request e sessão do Flask)"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+def session_user_id(environ):
+    """Le o usuario da sessao do Flask (pode consultar o banco, por isso roda em thread)"""
+    with flask_app.request_context(environ):
+        return session.get('user_id')
+
+async def send_response(send, response, head=False):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': b'' if head else response.get_data()})
+
+def json_response(data, status=200):
+    response = flask_app.json.response(data)
+    response.status_code = status
+    return response
+
+async def hairdressers_by_salon(req, salon_id):
+    hairdressers = await reference_cache.get_or_load_async(
+        f'hairdressers:{salon_id}',
+        lambda: fetch_all(HAIRDRESSERS_BY_SALON_SQL, (salon_id,))
+    )
+    return hairdressers_by_salon_response(req, salon_id, hairdressers)
+
+async def salon_schedule(req, salon_id):
+    async def load():
+        rows = await fetch_all(SALON_SCHEDULE_SQL, (salon_id,))
+        return rows[0] if rows else None
+    salon = await reference_cache.get_or_load_async(f'salon_schedule:{salon_id}', load)
+
+    if not salon:
+        return json_response({'error': 'Salao nao encontrado'}, 404)
+
+    return salon_schedule_response(req, salon_id, salon)
+
+async def available_times(req, hairdresser_id, appointment_date):
+    # Usa o mesmo indice em memoria da aplicacao Flask, carregando do banco so o que faltar
+    found, schedule = availability_index.cached_schedule(hairdresser_id)
+    if not found:
+        rows = await fetch_all(HAIRDRESSER_SCHEDULE_SQL, (hairdresser_id,))
+        schedule = build_schedule(rows[0]) if rows else None
+        availability_index.put_schedule(hairdresser_id, schedule)
+
+    if not schedule:
+        return json_response({'error': 'Cabeleireiro nao encontrado'}, 404)
+
+    try:
+        date_obj = datetime.strptime(appointment_date, '%Y-%m-%d').date()
+    except ValueError:
+        return json_response({'error': 'Data invalida'}, 400)
+
+    if not salon_is_open(schedule['opening_day_num'], schedule['closing_day_num'], date_obj.weekday()):
+        return json_response(AvailableTimes(available_times=[], message='Salao fechado neste dia'))
+
+    booked = availability_index.cached_booked(hairdresser_id, date_obj)
+    if booked is None:
+        generation = availability_index.generation(hairdresser_id, date_obj)
+        booked = booked_bitmap(await fetch_all(BOOKED_TIMES_SQL, (hairdresser_id, date_obj)))
+        availability_index.put_booked(hairdresser_id, date_obj, booked, generation)
+
+    duration = service_duration(req.args.get('service_type'))
+    return json_response(AvailableTimes(available_times=available_slots(schedule, date_obj, booked, duration=duration)))
+
+# Rotas atendidas de forma assincrona; o restante vai para o Flask
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/hairdressers_by_salon/(\d+)$'), hairdressers_by_salon, (int,)),
+    (re.compile(r'^/api/salon_schedule/(\d+)$'), salon_schedule, (int,)),
+    (re.compile(r'^/api/available_times/(\d+)/([^/]+)$'), available_times, (int, str))
+]
+
+class AsyncApp:
+    """Aplicação ASGI: endpoints de consulta assíncronos e fallback para o Flask"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for pattern, handler, converters in ASYNC_ROUTES:
+                match = pattern.match(scope['path'])
+                if match:
+                    args = [convert(value) for convert, value in zip(converters, match.groups())]
+                    return await self.handle(scope, send, handler, args)
+
+        return await self.wsgi(scope, receive, send)
+
+    async def handle(self, scope, send, handler, args):
+        environ = build_environ(scope)
+        req = Request(environ)
+        try:
+            # Mesma regra do login_required
+            if await asyncio.to_thread(session_user_id, environ) is None:
+                response = redirect('/login')
+            else:
+                response = await handler(req, *args)
+        except Exception as e:
+            response = json_response({'error': str(e)}, 500)
+        await send_response(send, response, head=scope['method'] == 'HEAD')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await get_pool()
+                except Exception as e:
+                    # O banco pode subir depois; o pool sera criado na primeira requisicao
+                    flask_app.logger.warning('Pool assincrono nao criado na inicializacao: %s', e)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_pool()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+app = AsyncApp(flask_app)
@@ -0,0 +1,18 @@
+"""Configuração do gunicorn, carregada automaticamente a partir do diretório da aplicação."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Descarta as métricas de execuções anteriores antes de subir os workers
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Remove o worker encerrado dos gauges somados entre processos (requisições em andamento, pool)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
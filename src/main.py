@@ -1,1061 +1,3726 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, flash
-from flask_session import Session
-import bcrypt
-import secrets
-import pymysql.cursors
-import pymysql
-import os
-from functools import wraps
-from datetime import datetime, date, timedelta
-
-# Lista fixa de especialidades disponiveis para cabeleireiros
-SPECIALTIES_LIST = [
-    'Corte Masculino',
-    'Corte Feminino',
-    'Coloracao',
-    'Hidratacao',
-    'Escova',
-    'Alisamento',
-    'Penteado',
-    'Manicure',
-    'Pedicure',
-    'Barba',
-    'Design de Sobrancelha',
-    'Maquiagem'
-]
-
-# Lista de dias da semana para horario de funcionamento
-WEEKDAYS = [
-    ('segunda', 'Segunda-feira'),
-    ('terca', 'Terca-feira'),
-    ('quarta', 'Quarta-feira'),
-    ('quinta', 'Quinta-feira'),
-    ('sexta', 'Sexta-feira'),
-    ('sabado', 'Sabado'),
-    ('domingo', 'Domingo')
-]
-
-# Mapeamento de dia da semana para numero (0=segunda, 6=domingo)
-WEEKDAY_TO_NUM = {
-    'segunda': 0,
-    'terca': 1,
-    'quarta': 2,
-    'quinta': 3,
-    'sexta': 4,
-    'sabado': 5,
-    'domingo': 6
-}
-
-# Mapeamento inverso (numero para dia da semana)
-NUM_TO_WEEKDAY = {v: k for k, v in WEEKDAY_TO_NUM.items()}
-
-# Configuração da aplicação Flask
-app = Flask(__name__)
-app.config['SECRET_KEY'] = secrets.token_hex(16)
-app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
-
-# Filtro Jinja2 para formatar timedelta como hora
-@app.template_filter('format_time')
-def format_time(td):
-    """Converte timedelta para string de hora HH:MM"""
-    if isinstance(td, timedelta):
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        return f"{hours:02d}:{minutes:02d}"
-    return str(td)
-
-# Configuração do banco de dados
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'user': os.getenv('DB_USER', 'vivian_user'),
-    'password': os.getenv('DB_PASSWORD', 'vivian_password'),
-    'db': os.getenv('DB_NAME', 'users'),
-    'port': int(os.getenv('DB_PORT', '3306')),
-    'cursorclass': pymysql.cursors.DictCursor
-}
-
-def get_db_connection():
-    """Cria uma nova conexão com o banco de dados"""
-    return pymysql.connect(**DB_CONFIG)
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        if session['user_id'] != 1:
-            flash('Acesso negado! Apenas administradores podem acessar esta página.', 'error')
-            return redirect(url_for('profile'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def check_password(password, hashed):
-    """Verifica senha com compatibilidade para texto plano e bcrypt"""
-    try:
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-    except ValueError:
-        return password == hashed
-
-# ROTAS WEB FRONTEND
-@app.route('/')
-def index():
-    if 'user_id' in session:
-        return redirect(url_for('profile'))
-    return redirect(url_for('login'))
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        email = request.form['email']
-        password = request.form['password']
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Busca usuário por email
-            cur.execute("SELECT id, name, email, password FROM users_data WHERE email = %s", (email,))
-            user = cur.fetchone()
-            
-            if user and check_password(password, user['password']):
-                session['user_id'] = user['id']
-                session['user_name'] = user['name']
-                session['user_email'] = user['email']
-                flash('Login realizado com sucesso!', 'success')
-                return redirect(url_for('profile'))
-            else:
-                flash('Email ou senha incorretos!', 'error')
-                
-        except Exception as e:
-            flash(f'Erro no sistema: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    return render_template('login.html')
-
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    if request.method == 'POST':
-        name = request.form['name']
-        email = request.form['email']
-        cpf = request.form['cpf']
-        password = request.form['password']
-        gender = request.form['gender']
-        phone = request.form['phone']
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Verifica se email já existe
-            cur.execute("SELECT id FROM users_data WHERE email = %s", (email,))
-            if cur.fetchone():
-                flash('Este email já está cadastrado!', 'error')
-                return render_template('register.html')
-            
-            # Verifica se CPF já existe
-            cur.execute("SELECT id FROM users_data WHERE cpf = %s", (cpf,))
-            if cur.fetchone():
-                flash('Este CPF já está cadastrado!', 'error')
-                return render_template('register.html')
-            
-            # Hash da senha e inserção no banco
-            hashed_password = hash_password(password)
-            cur.execute(
-                "INSERT INTO users_data (name, email, cpf, password, gender, phone) VALUES (%s, %s, %s, %s, %s, %s)",
-                (name, email, cpf, hashed_password, gender, phone)
-            )
-            connection.commit()
-            
-            flash('Cadastro realizado com sucesso! Faça login para continuar.', 'success')
-            return redirect(url_for('login'))
-            
-        except Exception as e:
-            flash(f'Erro ao cadastrar: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    return render_template('register.html')
-
-@app.route('/profile')
-@login_required
-def profile():
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca dados completos do usuário
-        cur.execute("SELECT * FROM users_data WHERE id = %s", (session['user_id'],))
-        user = cur.fetchone()
-        
-        return render_template('profile.html', user=user)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar perfil: {str(e)}', 'error')
-        return redirect(url_for('login'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/update_profile', methods=['POST'])
-@login_required
-def update_profile():
-    name = request.form['name']
-    email = request.form['email']
-    phone = request.form['phone']
-    
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o email já existe para outro usuário
-        cur.execute("SELECT id FROM users_data WHERE email = %s AND id != %s", (email, session['user_id']))
-        if cur.fetchone():
-            flash('Este email já está em uso por outro usuário!', 'error')
-            return redirect(url_for('profile'))
-        
-        # Atualiza os dados
-        cur.execute(
-            "UPDATE users_data SET name = %s, email = %s, phone = %s WHERE id = %s",
-            (name, email, phone, session['user_id'])
-        )
-        connection.commit()
-        
-        # Atualiza a sessão
-        session['user_name'] = name
-        session['user_email'] = email
-        
-        flash('Perfil atualizado com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao atualizar perfil: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('profile'))
-
-@app.route('/register_salon', methods=['GET', 'POST'])
-@admin_required
-def register_salon():
-    if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        description = request.form.get('description', '').strip()
-        address = request.form.get('address', '').strip()
-        phone = request.form.get('phone', '').strip()
-        image_url = request.form.get('image_url', '').strip()
-        opening_day = request.form.get('opening_day', 'segunda').strip()
-        closing_day = request.form.get('closing_day', 'sexta').strip()
-        opening_time = request.form.get('opening_time', '09:00').strip()
-        closing_time = request.form.get('closing_time', '18:00').strip()
-        
-        # Valida os dias da semana
-        valid_days = [d[0] for d in WEEKDAYS]
-        if opening_day not in valid_days:
-            opening_day = 'segunda'
-        if closing_day not in valid_days:
-            closing_day = 'sexta'
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Verifica se ja existe um salao com o mesmo nome
-            cur.execute("SELECT id FROM salons WHERE name = %s", (name,))
-            if cur.fetchone():
-                flash('Ja existe um salao cadastrado com este nome!', 'error')
-                return render_template('register_salon.html', weekdays=WEEKDAYS)
-            
-            # Insere o novo salao
-            cur.execute(
-                "INSERT INTO salons (name, description, address, phone, image_url, opening_day, closing_day, opening_time, closing_time) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-                (name, description if description else None, address, phone, image_url, opening_day, closing_day, opening_time, closing_time)
-            )
-            connection.commit()
-            
-            flash('Salao cadastrado com sucesso!', 'success')
-            return redirect(url_for('register_salon'))
-            
-        except Exception as e:
-            flash(f'Erro ao cadastrar salao: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    return render_template('register_salon.html', weekdays=WEEKDAYS)
-
-@app.route('/list_salons')
-@admin_required
-def list_salons():
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca todos os salões ordenados por nome
-        cur.execute("SELECT * FROM salons ORDER BY name ASC")
-        salons = cur.fetchall()
-        
-        return render_template('list_salons.html', salons=salons)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar salões: {str(e)}', 'error')
-        return redirect(url_for('profile'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/edit_salon/<int:salon_id>', methods=['GET', 'POST'])
-@admin_required
-def edit_salon(salon_id):
-    if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        description = request.form.get('description', '').strip()
-        address = request.form.get('address', '').strip()
-        phone = request.form.get('phone', '').strip()
-        image_url = request.form.get('image_url', '').strip()
-        opening_day = request.form.get('opening_day', 'segunda').strip()
-        closing_day = request.form.get('closing_day', 'sexta').strip()
-        opening_time = request.form.get('opening_time', '09:00').strip()
-        closing_time = request.form.get('closing_time', '18:00').strip()
-        
-        # Valida os dias da semana
-        valid_days = [d[0] for d in WEEKDAYS]
-        if opening_day not in valid_days:
-            opening_day = 'segunda'
-        if closing_day not in valid_days:
-            closing_day = 'sexta'
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Verifica se ja existe outro salao com o mesmo nome
-            cur.execute("SELECT id FROM salons WHERE name = %s AND id != %s", (name, salon_id))
-            if cur.fetchone():
-                flash('Ja existe outro salao cadastrado com este nome!', 'error')
-                return redirect(url_for('edit_salon', salon_id=salon_id))
-            
-            # Atualiza os dados do salao
-            cur.execute(
-                "UPDATE salons SET name = %s, description = %s, address = %s, phone = %s, image_url = %s, opening_day = %s, closing_day = %s, opening_time = %s, closing_time = %s WHERE id = %s",
-                (name, description if description else None, address, phone, image_url, opening_day, closing_day, opening_time, closing_time, salon_id)
-            )
-            connection.commit()
-            
-            flash('Salao atualizado com sucesso!', 'success')
-            return redirect(url_for('list_salons'))
-            
-        except Exception as e:
-            flash(f'Erro ao atualizar salao: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    # GET - Busca os dados do salao para edicao
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        cur.execute("SELECT * FROM salons WHERE id = %s", (salon_id,))
-        salon = cur.fetchone()
-        
-        if not salon:
-            flash('Salao nao encontrado!', 'error')
-            return redirect(url_for('list_salons'))
-        
-        return render_template('edit_salon.html', salon=salon, weekdays=WEEKDAYS)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar dados do salao: {str(e)}', 'error')
-        return redirect(url_for('list_salons'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/delete_salon/<int:salon_id>', methods=['POST'])
-@admin_required
-def delete_salon(salon_id):
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o salão existe
-        cur.execute("SELECT name FROM salons WHERE id = %s", (salon_id,))
-        salon = cur.fetchone()
-        
-        if not salon:
-            flash('Salão não encontrado!', 'error')
-            return redirect(url_for('list_salons'))
-        
-        # Deleta o salão
-        cur.execute("DELETE FROM salons WHERE id = %s", (salon_id,))
-        connection.commit()
-        
-        flash(f'Salão "{salon["name"]}" excluído com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao excluir salão: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('list_salons'))
-
-@app.route('/register_hairdresser', methods=['GET', 'POST'])
-@admin_required
-def register_hairdresser():
-    if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        salon_id = request.form.get('salon_id', '').strip()
-        # Pega as especialidades selecionadas como lista
-        specialties_list = request.form.getlist('specialties')
-        # Filtra apenas valores validos e junta com virgula para o SET do MySQL
-        specialties = ','.join([s for s in specialties_list if s in SPECIALTIES_LIST]) if specialties_list else None
-        phone = request.form.get('phone', '').strip()
-        email = request.form.get('email', '').strip()
-        image_url = request.form.get('image_url', '').strip()
-        bio = request.form.get('bio', '').strip()
-        
-        # Validacao de campos obrigatorios
-        if not salon_id:
-            flash('E obrigatorio selecionar um salao!', 'error')
-            try:
-                connection = get_db_connection()
-                cur = connection.cursor()
-                cur.execute("SELECT id, name FROM salons ORDER BY name ASC")
-                salons = cur.fetchall()
-                return render_template('register_hairdresser.html', salons=salons, specialties_list=SPECIALTIES_LIST)
-            except Exception as e:
-                flash(f'Erro ao carregar saloes: {str(e)}', 'error')
-                return redirect(url_for('list_salons'))
-            finally:
-                if 'connection' in locals():
-                    connection.close()
-                if 'cur' in locals():
-                    cur.close()
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Insere o novo cabeleireiro
-            cur.execute(
-                "INSERT INTO hairdressers (name, salon_id, specialties, phone, email, image_url, bio) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                (name, salon_id, specialties, phone, email, image_url if image_url else None, bio if bio else None)
-            )
-            connection.commit()
-            
-            flash('Cabeleireiro cadastrado com sucesso!', 'success')
-            return redirect(url_for('register_hairdresser'))
-            
-        except Exception as e:
-            flash(f'Erro ao cadastrar cabeleireiro: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    # GET - Busca os saloes para o formulario
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        cur.execute("SELECT id, name FROM salons ORDER BY name ASC")
-        salons = cur.fetchall()
-        
-        if not salons:
-            flash('E necessario cadastrar pelo menos um salao antes de cadastrar cabeleireiros!', 'error')
-            return redirect(url_for('register_salon'))
-        
-        return render_template('register_hairdresser.html', salons=salons, specialties_list=SPECIALTIES_LIST)
-    except Exception as e:
-        flash(f'Erro ao carregar saloes: {str(e)}', 'error')
-        return redirect(url_for('list_salons'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/list_hairdressers')
-@admin_required
-def list_hairdressers():
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca todos os cabeleireiros com informações do salão
-        cur.execute("""
-            SELECT h.*, s.name as salon_name 
-            FROM hairdressers h 
-            INNER JOIN salons s ON h.salon_id = s.id 
-            ORDER BY s.name ASC, h.name ASC
-        """)
-        hairdressers = cur.fetchall()
-        
-        return render_template('list_hairdressers.html', hairdressers=hairdressers)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar cabeleireiros: {str(e)}', 'error')
-        return redirect(url_for('profile'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/edit_hairdresser/<int:hairdresser_id>', methods=['GET', 'POST'])
-@admin_required
-def edit_hairdresser(hairdresser_id):
-    if request.method == 'POST':
-        name = request.form.get('name', '').strip()
-        salon_id = request.form.get('salon_id', '').strip()
-        # Pega as especialidades selecionadas como lista
-        specialties_list = request.form.getlist('specialties')
-        # Filtra apenas valores validos e junta com virgula para o SET do MySQL
-        specialties = ','.join([s for s in specialties_list if s in SPECIALTIES_LIST]) if specialties_list else None
-        phone = request.form.get('phone', '').strip()
-        email = request.form.get('email', '').strip()
-        image_url = request.form.get('image_url', '').strip()
-        bio = request.form.get('bio', '').strip()
-        
-        # Validacao de campos obrigatorios
-        if not salon_id:
-            flash('E obrigatorio selecionar um salao!', 'error')
-            return redirect(url_for('edit_hairdresser', hairdresser_id=hairdresser_id))
-        
-        try:
-            connection = get_db_connection()
-            cur = connection.cursor()
-            
-            # Atualiza os dados do cabeleireiro
-            cur.execute(
-                "UPDATE hairdressers SET name = %s, salon_id = %s, specialties = %s, phone = %s, email = %s, image_url = %s, bio = %s WHERE id = %s",
-                (name, salon_id, specialties, phone, email, image_url if image_url else None, bio if bio else None, hairdresser_id)
-            )
-            connection.commit()
-            
-            flash('Cabeleireiro atualizado com sucesso!', 'success')
-            return redirect(url_for('list_hairdressers'))
-            
-        except Exception as e:
-            flash(f'Erro ao atualizar cabeleireiro: {str(e)}', 'error')
-        finally:
-            if 'connection' in locals():
-                connection.close()
-            if 'cur' in locals():
-                cur.close()
-    
-    # GET - Busca os dados do cabeleireiro e os saloes para edicao
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        cur.execute("SELECT * FROM hairdressers WHERE id = %s", (hairdresser_id,))
-        hairdresser = cur.fetchone()
-        
-        if not hairdresser:
-            flash('Cabeleireiro nao encontrado!', 'error')
-            return redirect(url_for('list_hairdressers'))
-        
-        # Converte as especialidades do cabeleireiro para lista para marcar os checkboxes
-        hairdresser_specialties = hairdresser['specialties'].split(',') if hairdresser['specialties'] else []
-        
-        cur.execute("SELECT id, name FROM salons ORDER BY name ASC")
-        salons = cur.fetchall()
-        
-        return render_template('edit_hairdresser.html', hairdresser=hairdresser, salons=salons, specialties_list=SPECIALTIES_LIST, hairdresser_specialties=hairdresser_specialties)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar dados do cabeleireiro: {str(e)}', 'error')
-        return redirect(url_for('list_hairdressers'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/delete_hairdresser/<int:hairdresser_id>', methods=['POST'])
-@admin_required
-def delete_hairdresser(hairdresser_id):
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o cabeleireiro existe
-        cur.execute("SELECT name FROM hairdressers WHERE id = %s", (hairdresser_id,))
-        hairdresser = cur.fetchone()
-        
-        if not hairdresser:
-            flash('Cabeleireiro não encontrado!', 'error')
-            return redirect(url_for('list_hairdressers'))
-        
-        # Deleta o cabeleireiro
-        cur.execute("DELETE FROM hairdressers WHERE id = %s", (hairdresser_id,))
-        connection.commit()
-        
-        flash(f'Cabeleireiro "{hairdresser["name"]}" excluído com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao excluir cabeleireiro: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('list_hairdressers'))
-
-@app.route('/appointments')
-@login_required
-def appointments():
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca todos os agendamentos do usuário com informações do salão e cabeleireiro
-        cur.execute("""
-            SELECT a.*, 
-                   s.name as salon_name, 
-                   h.name as hairdresser_name
-            FROM appointments a
-            INNER JOIN salons s ON a.salon_id = s.id
-            INNER JOIN hairdressers h ON a.hairdresser_id = h.id
-            WHERE a.user_id = %s
-            ORDER BY a.appointment_date DESC, a.appointment_time DESC
-        """, (session['user_id'],))
-        user_appointments = cur.fetchall()
-        
-        # Busca todos os salões para o formulário
-        cur.execute("SELECT id, name, address FROM salons ORDER BY name ASC")
-        salons = cur.fetchall()
-        
-        # Obtém a data atual para validação no frontend
-        today = date.today().isoformat()
-        
-        return render_template('appointments.html', appointments=user_appointments, salons=salons, today=today)
-        
-    except Exception as e:
-        flash(f'Erro ao carregar agendamentos: {str(e)}', 'error')
-        return redirect(url_for('profile'))
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/api/hairdressers_by_salon/<int:salon_id>')
-@login_required
-def get_hairdressers_by_salon(salon_id):
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca cabeleireiros do salao
-        cur.execute("""
-            SELECT id, name, specialties 
-            FROM hairdressers 
-            WHERE salon_id = %s 
-            ORDER BY name ASC
-        """, (salon_id,))
-        hairdressers = cur.fetchall()
-        
-        return jsonify(hairdressers)
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/api/salon_schedule/<int:salon_id>')
-@login_required
-def get_salon_schedule(salon_id):
-    """Retorna informacoes de horario de funcionamento do salao"""
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        cur.execute("""
-            SELECT opening_day, closing_day, opening_time, closing_time 
-            FROM salons 
-            WHERE id = %s
-        """, (salon_id,))
-        salon = cur.fetchone()
-        
-        if not salon:
-            return jsonify({'error': 'Salao nao encontrado'}), 404
-        
-        # Converte timedelta para string de hora
-        opening_time = salon['opening_time']
-        closing_time = salon['closing_time']
-        
-        if isinstance(opening_time, timedelta):
-            total_seconds = int(opening_time.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            opening_time = f"{hours:02d}:{minutes:02d}"
-        else:
-            opening_time = str(opening_time)[:5]
-            
-        if isinstance(closing_time, timedelta):
-            total_seconds = int(closing_time.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            closing_time = f"{hours:02d}:{minutes:02d}"
-        else:
-            closing_time = str(closing_time)[:5]
-        
-        return jsonify({
-            'opening_day': salon['opening_day'],
-            'closing_day': salon['closing_day'],
-            'opening_time': opening_time,
-            'closing_time': closing_time,
-            'opening_day_num': WEEKDAY_TO_NUM.get(salon['opening_day'], 0),
-            'closing_day_num': WEEKDAY_TO_NUM.get(salon['closing_day'], 4)
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/api/available_times/<int:hairdresser_id>/<appointment_date>')
-@login_required
-def get_available_times(hairdresser_id, appointment_date):
-    """Retorna horarios disponiveis para um cabeleireiro em uma data especifica"""
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Busca o salao do cabeleireiro e horarios de funcionamento
-        cur.execute("""
-            SELECT s.opening_day, s.closing_day, s.opening_time, s.closing_time 
-            FROM hairdressers h
-            INNER JOIN salons s ON h.salon_id = s.id
-            WHERE h.id = %s
-        """, (hairdresser_id,))
-        salon = cur.fetchone()
-        
-        if not salon:
-            return jsonify({'error': 'Cabeleireiro nao encontrado'}), 404
-        
-        # Converte a data para verificar o dia da semana
-        try:
-            date_obj = datetime.strptime(appointment_date, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Data invalida'}), 400
-        
-        # Pega o dia da semana (0=segunda, 6=domingo)
-        weekday_num = date_obj.weekday()
-        
-        # Verifica se o dia esta dentro do intervalo de funcionamento
-        opening_day_num = WEEKDAY_TO_NUM.get(salon['opening_day'], 0)
-        closing_day_num = WEEKDAY_TO_NUM.get(salon['closing_day'], 4)
-        
-        # Verifica se o salao funciona neste dia
-        if closing_day_num >= opening_day_num:
-            # Intervalo normal (ex: segunda a sexta)
-            if weekday_num < opening_day_num or weekday_num > closing_day_num:
-                return jsonify({'available_times': [], 'message': 'Salao fechado neste dia'})
-        else:
-            # Intervalo que atravessa o fim de semana (ex: quinta a terca)
-            if weekday_num > closing_day_num and weekday_num < opening_day_num:
-                return jsonify({'available_times': [], 'message': 'Salao fechado neste dia'})
-        
-        # Converte horarios de funcionamento
-        opening_time = salon['opening_time']
-        closing_time = salon['closing_time']
-        
-        if isinstance(opening_time, timedelta):
-            opening_minutes = int(opening_time.total_seconds() // 60)
-        else:
-            parts = str(opening_time).split(':')
-            opening_minutes = int(parts[0]) * 60 + int(parts[1])
-            
-        if isinstance(closing_time, timedelta):
-            closing_minutes = int(closing_time.total_seconds() // 60)
-        else:
-            parts = str(closing_time).split(':')
-            closing_minutes = int(parts[0]) * 60 + int(parts[1])
-        
-        # Gera todos os horarios possiveis em intervalos de 30 minutos
-        all_times = []
-        current_minutes = opening_minutes
-        while current_minutes < closing_minutes:
-            hours = current_minutes // 60
-            mins = current_minutes % 60
-            all_times.append(f"{hours:02d}:{mins:02d}")
-            current_minutes += 30
-        
-        # Busca agendamentos existentes para este cabeleireiro nesta data
-        cur.execute("""
-            SELECT appointment_time 
-            FROM appointments 
-            WHERE hairdresser_id = %s 
-            AND appointment_date = %s 
-            AND status != 'cancelled'
-        """, (hairdresser_id, appointment_date))
-        booked_appointments = cur.fetchall()
-        
-        # Converte horarios agendados para set de strings
-        booked_times = set()
-        for apt in booked_appointments:
-            apt_time = apt['appointment_time']
-            if isinstance(apt_time, timedelta):
-                total_seconds = int(apt_time.total_seconds())
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                booked_times.add(f"{hours:02d}:{minutes:02d}")
-            else:
-                booked_times.add(str(apt_time)[:5])
-        
-        # Filtra horarios disponiveis
-        available_times = [t for t in all_times if t not in booked_times]
-        
-        # Se for hoje, remove horarios que ja passaram
-        today = date.today()
-        if date_obj == today:
-            now = datetime.now()
-            current_time_str = f"{now.hour:02d}:{now.minute:02d}"
-            available_times = [t for t in available_times if t > current_time_str]
-        
-        return jsonify({'available_times': available_times})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-
-@app.route('/create_appointment', methods=['POST'])
-@login_required
-def create_appointment():
-    salon_id = request.form.get('salon_id', '').strip()
-    hairdresser_id = request.form.get('hairdresser_id', '').strip()
-    appointment_date = request.form.get('appointment_date', '').strip()
-    appointment_time = request.form.get('appointment_time', '').strip()
-    service_type = request.form.get('service_type', '').strip()
-    notes = request.form.get('notes', '').strip()
-    
-    # Validação de campos obrigatórios
-    if not salon_id or not hairdresser_id or not appointment_date or not appointment_time or not service_type:
-        flash('Todos os campos obrigatórios devem ser preenchidos!', 'error')
-        return redirect(url_for('appointments'))
-    
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o cabeleireiro pertence ao salão
-        cur.execute("SELECT id FROM hairdressers WHERE id = %s AND salon_id = %s", (hairdresser_id, salon_id))
-        if not cur.fetchone():
-            flash('Cabeleireiro não pertence ao salão selecionado!', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Verifica se já existe um agendamento para o mesmo horário
-        cur.execute("""
-            SELECT id FROM appointments 
-            WHERE hairdresser_id = %s 
-            AND appointment_date = %s 
-            AND appointment_time = %s 
-            AND status != 'cancelled'
-        """, (hairdresser_id, appointment_date, appointment_time))
-        
-        if cur.fetchone():
-            flash('Este horário já está reservado! Por favor, escolha outro horário.', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Insere o novo agendamento
-        cur.execute("""
-            INSERT INTO appointments (user_id, salon_id, hairdresser_id, appointment_date, appointment_time, service_type, notes, status) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'confirmed')
-        """, (session['user_id'], salon_id, hairdresser_id, appointment_date, appointment_time, service_type, notes if notes else None))
-        connection.commit()
-        
-        flash('Agendamento realizado com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao criar agendamento: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('appointments'))
-
-@app.route('/update_appointment/<int:appointment_id>', methods=['POST'])
-@login_required
-def update_appointment(appointment_id):
-    salon_id = request.form.get('salon_id', '').strip()
-    hairdresser_id = request.form.get('hairdresser_id', '').strip()
-    appointment_date = request.form.get('appointment_date', '').strip()
-    appointment_time = request.form.get('appointment_time', '').strip()
-    service_type = request.form.get('service_type', '').strip()
-    notes = request.form.get('notes', '').strip()
-    
-    # Validação de campos obrigatórios
-    if not salon_id or not hairdresser_id or not appointment_date or not appointment_time or not service_type:
-        flash('Todos os campos obrigatórios devem ser preenchidos!', 'error')
-        return redirect(url_for('appointments'))
-    
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o agendamento pertence ao usuário
-        cur.execute("SELECT id FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
-        if not cur.fetchone():
-            flash('Agendamento não encontrado ou você não tem permissão para editá-lo!', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Verifica se o cabeleireiro pertence ao salão
-        cur.execute("SELECT id FROM hairdressers WHERE id = %s AND salon_id = %s", (hairdresser_id, salon_id))
-        if not cur.fetchone():
-            flash('Cabeleireiro não pertence ao salão selecionado!', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Verifica se já existe um agendamento para o mesmo horário (exceto o atual)
-        cur.execute("""
-            SELECT id FROM appointments 
-            WHERE hairdresser_id = %s 
-            AND appointment_date = %s 
-            AND appointment_time = %s 
-            AND id != %s
-            AND status != 'cancelled'
-        """, (hairdresser_id, appointment_date, appointment_time, appointment_id))
-        
-        if cur.fetchone():
-            flash('Este horário já está reservado! Por favor, escolha outro horário.', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Atualiza o agendamento
-        cur.execute("""
-            UPDATE appointments 
-            SET salon_id = %s, hairdresser_id = %s, appointment_date = %s, appointment_time = %s, service_type = %s, notes = %s
-            WHERE id = %s AND user_id = %s
-        """, (salon_id, hairdresser_id, appointment_date, appointment_time, service_type, notes if notes else None, appointment_id, session['user_id']))
-        connection.commit()
-        
-        flash('Agendamento atualizado com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao atualizar agendamento: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('appointments'))
-
-@app.route('/cancel_appointment/<int:appointment_id>', methods=['POST'])
-@login_required
-def cancel_appointment(appointment_id):
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o agendamento pertence ao usuário
-        cur.execute("SELECT id, status FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
-        appointment = cur.fetchone()
-        
-        if not appointment:
-            flash('Agendamento não encontrado ou você não tem permissão para cancelá-lo!', 'error')
-            return redirect(url_for('appointments'))
-        
-        if appointment['status'] == 'cancelled':
-            flash('Este agendamento já está cancelado!', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Cancela o agendamento
-        cur.execute("UPDATE appointments SET status = 'cancelled' WHERE id = %s", (appointment_id,))
-        connection.commit()
-        
-        flash('Agendamento cancelado com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao cancelar agendamento: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('appointments'))
-
-@app.route('/delete_appointment/<int:appointment_id>', methods=['POST'])
-@login_required
-def delete_appointment(appointment_id):
-    try:
-        connection = get_db_connection()
-        cur = connection.cursor()
-        
-        # Verifica se o agendamento pertence ao usuário
-        cur.execute("SELECT id FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
-        if not cur.fetchone():
-            flash('Agendamento não encontrado ou você não tem permissão para excluí-lo!', 'error')
-            return redirect(url_for('appointments'))
-        
-        # Deleta o agendamento
-        cur.execute("DELETE FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
-        connection.commit()
-        
-        flash('Agendamento excluído com sucesso!', 'success')
-        
-    except Exception as e:
-        flash(f'Erro ao excluir agendamento: {str(e)}', 'error')
-    finally:
-        if 'connection' in locals():
-            connection.close()
-        if 'cur' in locals():
-            cur.close()
-    
-    return redirect(url_for('appointments'))
-
-@app.route('/logout')
-def logout():
-    session.clear()
-    flash('Logout realizado com sucesso!', 'success')
+from flask import Flask, jsonify, request, render_template, redirect, url_for, session, flash, g, has_request_context
+from flask import before_render_template, message_flashed, template_rendered, stream_with_context
+from flask import get_flashed_messages, stream_template
+from flask.cli import AppGroup
+from flask.json.provider import DefaultJSONProvider
+from flask_session import Session
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from flask_session.base import ServerSideSessionInterface
+from cachelib import FileSystemCache
+import click
+import msgspec
+import secrets
+import pymysql.cursors
+import pymysql
+from pymysql.constants import ER
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+import os
+import asyncio
+import base64
+import csv
+import heapq
+import io
+import itertools
+import multiprocessing
+import json
+import logging
+import random
+import signal
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from datetime import datetime, date, timedelta, timezone
+
+from passwords import bcrypt_check, bcrypt_hash
+
+# Lista fixa de especialidades disponiveis para cabeleireiros
+SPECIALTIES_LIST = [
+    'Corte Masculino',
+    'Corte Feminino',
+    'Coloracao',
+    'Hidratacao',
+    'Escova',
+    'Alisamento',
+    'Penteado',
+    'Manicure',
+    'Pedicure',
+    'Barba',
+    'Design de Sobrancelha',
+    'Maquiagem'
+]
+
+# Duracao de cada servico em minutos; pode ser alterada com SERVICE_DURATIONS="Coloracao=90,Barba=20"
+SERVICE_DURATIONS = {
+    'Corte Masculino': 30,
+    'Corte Feminino': 60,
+    'Coloracao': 120,
+    'Hidratacao': 60,
+    'Escova': 45,
+    'Alisamento': 180,
+    'Penteado': 60,
+    'Manicure': 45,
+    'Pedicure': 45,
+    'Barba': 30,
+    'Design de Sobrancelha': 30,
+    'Maquiagem': 60
+}
+for _item in filter(None, os.getenv('SERVICE_DURATIONS', '').split(',')):
+    _name, _minutes = _item.rsplit('=', 1)
+    SERVICE_DURATIONS[_name.strip()] = int(_minutes)
+
+# Duracao de servicos fora da lista (ex: agendamentos antigos)
+DEFAULT_SERVICE_MINUTES = 30
+
+def service_duration(service_type):
+    """Duracao em minutos do servico"""
+    return SERVICE_DURATIONS.get((service_type or '').strip(), DEFAULT_SERVICE_MINUTES)
+
+# Lista de dias da semana para horario de funcionamento
+WEEKDAYS = [
+    ('segunda', 'Segunda-feira'),
+    ('terca', 'Terca-feira'),
+    ('quarta', 'Quarta-feira'),
+    ('quinta', 'Quinta-feira'),
+    ('sexta', 'Sexta-feira'),
+    ('sabado', 'Sabado'),
+    ('domingo', 'Domingo')
+]
+
+# Mapeamento de dia da semana para numero (0=segunda, 6=domingo)
+WEEKDAY_TO_NUM = {
+    'segunda': 0,
+    'terca': 1,
+    'quarta': 2,
+    'quinta': 3,
+    'sexta': 4,
+    'sabado': 5,
+    'domingo': 6
+}
+
+# Mapeamento inverso (numero para dia da semana)
+NUM_TO_WEEKDAY = {v: k for k, v in WEEKDAY_TO_NUM.items()}
+
+# Configuração da aplicação Flask
+app = Flask(__name__)
+# A chave precisa ser a mesma em todos os workers e hosts: sem ela, cada processo assinaria
+# os cookies de sessao com uma chave diferente e as sessoes se perderiam ao trocar de worker
+def load_secret_key():
+    """SECRET_KEY do ambiente; uma chave aleatoria so e aceita em modo debug (um unico processo)"""
+    key = os.getenv('SECRET_KEY')
+    if key:
+        return key
+    if os.getenv('FLASK_DEBUG', '0') in ('1', 'true', 'True'):
+        logging.getLogger(__name__).warning('SECRET_KEY nao definida: usando uma chave aleatoria valida so para este processo')
+        return secrets.token_hex(16)
+    raise RuntimeError('SECRET_KEY nao definida: configure a mesma chave em todos os workers e containers')
+
+app.config['SECRET_KEY'] = load_secret_key()
+
+# Filtro Jinja2 para formatar timedelta como hora (usado tambem nas respostas da API)
+@app.template_filter('format_time')
+def format_time(value, seconds=False):
+    """Converte o horario do banco (timedelta) ou uma string HH:MM:SS para HH:MM (ou HH:MM:SS)"""
+    if isinstance(value, timedelta):
+        total_seconds = int(value.total_seconds())
+        hours = total_seconds // 3600
+        minutes = (total_seconds % 3600) // 60
+        if seconds:
+            return f"{hours:02d}:{minutes:02d}:{total_seconds % 60:02d}"
+        return f"{hours:02d}:{minutes:02d}"
+    return str(value)[:8 if seconds else 5]
+
+class MsgspecJSONProvider(DefaultJSONProvider):
+    """Serializa as respostas JSON (jsonify, app.json) com msgspec"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        # Chaves de dicionarios ordenadas como no provider padrao do Flask
+        self._encoder = msgspec.json.Encoder(enc_hook=DefaultJSONProvider.default, order='deterministic')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encoder.encode(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encoder.encode(obj) + b'\n', mimetype=self.mimetype)
+
+app.json = MsgspecJSONProvider(app)
+
+# Estruturas das respostas da API; os horarios chegam formatados por format_time
+class SalonSchedule(msgspec.Struct):
+    opening_day: str
+    closing_day: str
+    opening_time: str
+    closing_time: str
+    opening_day_num: int
+    closing_day_num: int
+
+class HairdresserOption(msgspec.Struct):
+    id: int
+    name: str
+    specialties: str | None
+
+class SalonItem(msgspec.Struct):
+    id: int
+    name: str
+    description: str | None
+    address: str
+    phone: str
+    image_url: str | None
+    opening_day: str
+    closing_day: str
+    opening_time: str
+    closing_time: str
+    created_at: datetime | None
+    updated_at: datetime | None
+
+class HairdresserItem(msgspec.Struct):
+    id: int
+    name: str
+    salon_id: int
+    specialties: str | None
+    phone: str
+    email: str
+    image_url: str | None
+    bio: str | None
+    created_at: datetime | None
+    updated_at: datetime | None
+    salon_name: str
+
+class AppointmentItem(msgspec.Struct):
+    id: int
+    salon_id: int
+    hairdresser_id: int
+    appointment_date: date
+    appointment_time: str
+    service_type: str
+    status: str
+    notes: str | None
+    salon_name: str
+    hairdresser_name: str
+    archived: bool = False
+
+class AvailableTimes(msgspec.Struct, omit_defaults=True):
+    available_times: list[str]
+    message: str | None = None
+
+class NextAvailable(msgspec.Struct):
+    date: str
+    time: str
+
+class DayAvailability(msgspec.Struct, omit_defaults=True):
+    date: str
+    available_times: list[str]
+    message: str | None = None
+
+class HairdresserAvailability(msgspec.Struct):
+    hairdresser_id: int
+    days: list[DayAvailability]
+    next_available: NextAvailable | None
+
+class SalonHairdresserAvailability(msgspec.Struct):
+    id: int
+    name: str
+    days: list[DayAvailability]
+    next_available: NextAvailable | None
+
+class SalonAvailability(msgspec.Struct):
+    salon_id: int
+    hairdressers: list[SalonHairdresserAvailability]
+
+class HairdresserBootstrap(msgspec.Struct):
+    id: int
+    name: str
+    specialties: str | None
+    # Dias do periodo para cada duracao de servico que o cabeleireiro atende
+    availability: dict[str, list[DayAvailability]]
+
+class AppointmentBootstrap(msgspec.Struct):
+    salon_id: int
+    schedule: SalonSchedule
+    service_durations: dict[str, int]
+    default_duration: int
+    date_from: str
+    date_to: str
+    hairdressers: list[HairdresserBootstrap]
+
+class HairdresserRef(msgspec.Struct):
+    id: int
+    name: str
+
+class EarliestSlot(msgspec.Struct):
+    date: str
+    time: str
+    hairdressers: list[HairdresserRef]
+
+class EarliestSlots(msgspec.Struct):
+    salon_id: int
+    service_type: str
+    slots: list[EarliestSlot]
+
+class SalonRef(msgspec.Struct):
+    id: int
+    name: str
+    address: str
+
+class HairdresserSearchResult(msgspec.Struct):
+    id: int
+    name: str
+    specialties: list[str]
+    image_url: str | None
+    salon: SalonRef
+
+def api_struct(cls, row):
+    """Monta a estrutura de resposta com os campos da linha do banco"""
+    return cls(**{
+        name: format_time(row[name]) if isinstance(row[name], timedelta) else row[name]
+        for name in cls.__struct_fields__
+    })
+
+# Instrumentação das consultas SQL por requisição
+SQL_PROFILE_CONFIG = {
+    'enabled': os.getenv('SQL_PROFILE', '1') not in ('0', 'false', 'False'),
+    'server_timing': os.getenv('SQL_PROFILE_SERVER_TIMING', '1') not in ('0', 'false', 'False'),
+    'log_requests': os.getenv('SQL_PROFILE_LOG_REQUESTS', '0') not in ('0', 'false', 'False'),
+    'slow_query_ms': float(os.getenv('SQL_SLOW_QUERY_MS', '100')),
+    'n_plus_one_threshold': int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5')),
+    'top_n': int(os.getenv('SQL_PROFILE_TOP_N', '3'))
+}
+
+# Logs estruturados (uma linha JSON por evento)
+sql_logger = logging.getLogger('vi_beauty.sql')
+if not sql_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    sql_logger.addHandler(_handler)
+    sql_logger.setLevel(logging.INFO)
+    sql_logger.propagate = False
+
+def request_sql_profile():
+    """Perfil SQL da requisição atual, criado no primeiro uso"""
+    profile = g.get('sql_profile')
+    if profile is None:
+        profile = g.sql_profile = {'queries': 0, 'db_ms': 0.0, 'pool_wait_ms': 0.0, 'statements': {}, 'slowest': []}
+    return profile
+
+def record_query(sql, seconds, rows=None):
+    """Registra uma consulta no perfil da requisição atual e avisa se for lenta"""
+    if not SQL_PROFILE_CONFIG['enabled']:
+        return
+    sql = ' '.join(sql.split())
+    elapsed_ms = seconds * 1000
+    in_request = has_request_context()
+    if in_request:
+        profile = request_sql_profile()
+        profile['queries'] += 1
+        profile['db_ms'] += elapsed_ms
+        statement = profile['statements'].setdefault(sql, [0, 0.0])
+        statement[0] += 1
+        statement[1] += elapsed_ms
+        profile['slowest'].append((elapsed_ms, sql))
+        profile['slowest'].sort(reverse=True)
+        del profile['slowest'][SQL_PROFILE_CONFIG['top_n']:]
+    
+    if elapsed_ms >= SQL_PROFILE_CONFIG['slow_query_ms']:
+        sql_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'path': request.path if in_request else None,
+            'ms': round(elapsed_ms, 2),
+            'rows': rows,
+            'sql': sql
+        }))
+
+class QueryTimingMixin:
+    """Mede cada execute/executemany do cursor e registra no perfil da requisição"""
+    _recording = True
+
+    def execute(self, query, args=None):
+        if not self._recording:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        # O executemany do PyMySQL chama execute para cada linha; conta como uma unica consulta
+        started = time.perf_counter()
+        self._recording = False
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._recording = True
+            record_query(query, time.perf_counter() - started, rows=len(args) if args else 0)
+
+class InstrumentedCursor(QueryTimingMixin, pymysql.cursors.DictCursor):
+    pass
+
+class InstrumentedSSCursor(QueryTimingMixin, pymysql.cursors.SSDictCursor):
+    """Cursor sem buffer: as linhas sao lidas do servidor conforme a iteracao avanca"""
+
+@app.after_request
+def report_sql_profile(response):
+    """Publica o perfil SQL da requisição no cabeçalho Server-Timing e nos logs"""
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    
+    if SQL_PROFILE_CONFIG['server_timing']:
+        response.headers.add('Server-Timing', f'db;dur={profile["db_ms"]:.2f};desc="{profile["queries"]} queries"')
+        if profile['pool_wait_ms']:
+            response.headers.add('Server-Timing', f'db-pool;dur={profile["pool_wait_ms"]:.2f}')
+    
+    # Mesma consulta repetida varias vezes na mesma requisição costuma ser um N+1
+    n_plus_one = [
+        {'sql': sql, 'count': count, 'ms': round(ms, 2)}
+        for sql, (count, ms) in profile['statements'].items()
+        if count >= SQL_PROFILE_CONFIG['n_plus_one_threshold']
+    ]
+    if n_plus_one or SQL_PROFILE_CONFIG['log_requests']:
+        log = sql_logger.warning if n_plus_one else sql_logger.info
+        log(json.dumps({
+            'event': 'n_plus_one' if n_plus_one else 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': profile['queries'],
+            'db_ms': round(profile['db_ms'], 2),
+            'pool_wait_ms': round(profile['pool_wait_ms'], 2),
+            'slowest': [{'sql': sql, 'ms': round(ms, 2)} for ms, sql in profile['slowest']],
+            'n_plus_one': n_plus_one
+        }))
+    return response
+
+# Configuração do banco de dados
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'user': os.getenv('DB_USER', 'vivian_user'),
+    'password': os.getenv('DB_PASSWORD', 'vivian_password'),
+    'db': os.getenv('DB_NAME', 'users'),
+    'port': int(os.getenv('DB_PORT', '3306')),
+    'cursorclass': InstrumentedCursor
+}
+
+# Configuração do pool de conexões (um pool por worker do gunicorn)
+DB_POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', '5')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    'idle_timeout': float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+    'recycle': float(os.getenv('DB_POOL_RECYCLE', '3600')),
+    'ping': os.getenv('DB_POOL_PING', '1') not in ('0', 'false', 'False')
+}
+
+class ConnectionPool:
+    """Pool limitado de conexões MySQL reutilizáveis"""
+
+    def __init__(self, db_config, size=5, max_overflow=5, timeout=10, idle_timeout=300, recycle=3600, ping=True):
+        self.db_config = db_config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.ping = ping
+        self._lock = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        # Cada processo precisa do seu proprio pool (gunicorn faz fork dos workers)
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._created_at = {}
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'evictions': 0,
+            'created': 0,
+            'timeouts': 0
+        }
+
+    def _connect(self):
+        connection = pymysql.connect(**self.db_config)
+        with self._lock:
+            self._created_at[id(connection)] = time.monotonic()
+            self._stats['created'] += 1
+        return connection
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_stale(self, connection, idle_since):
+        now = time.monotonic()
+        if self.idle_timeout and now - idle_since > self.idle_timeout:
+            return True
+        created_at = self._created_at.get(id(connection), now)
+        return bool(self.recycle) and now - created_at > self.recycle
+
+    def _is_alive(self, connection):
+        if not self.ping:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Retira uma conexão do pool, aguardando se o limite foi atingido"""
+        limit = self.size + self.max_overflow
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            self._stats['checkouts'] += 1
+            if not self._idle and self._in_use >= limit:
+                self._stats['waits'] += 1
+                wait_started = time.monotonic()
+                available = self._lock.wait_for(lambda: self._idle or self._in_use < limit, self.timeout)
+                self._stats['wait_time'] += time.monotonic() - wait_started
+                if not available:
+                    self._stats['timeouts'] += 1
+                    raise TimeoutError('Pool de conexões esgotado')
+            self._in_use += 1
+
+        # Reaproveita uma conexão ociosa, descartando as vencidas ou quebradas
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, idle_since = self._idle.pop()
+            if not self._is_stale(connection, idle_since) and self._is_alive(connection):
+                return connection
+            self._discard(connection)
+            with self._lock:
+                self._stats['evictions'] += 1
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, connection):
+        """Devolve a conexão ao pool, desfazendo qualquer transação pendente"""
+        keep = self._pid == os.getpid()
+        if keep:
+            try:
+                connection.rollback()
+            except Exception:
+                keep = False
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._lock.notify()
+        if connection is not None:
+            self._discard(connection)
+
+    def stats(self):
+        """Retorna as estatísticas do pool para monitoramento"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+            stats['size'] = self.size
+            stats['max_overflow'] = self.max_overflow
+            stats['pid'] = self._pid
+        stats['wait_time'] = round(stats['wait_time'], 6)
+        return stats
+
+db_pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+
+# Réplicas de leitura (DB_REPLICA_HOSTS="host[:porta],..."); sem réplicas tudo vai para o primário
+DB_REPLICA_CONFIG = {
+    'hosts': [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()],
+    'max_lag': float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+    'check_interval': float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5')),
+    'pin_seconds': float(os.getenv('DB_REPLICA_PIN_SECONDS', '10')),
+    # Uma réplica fora do ar precisa falhar rápido: a leitura volta para o primário
+    'connect_timeout': float(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', '1')),
+    'check_timeout': float(os.getenv('DB_REPLICA_CHECK_TIMEOUT', '2'))
+}
+
+class ReplicaRouter:
+    """Escolhe a réplica usada nas rotas de leitura, deixando de lado as
+    atrasadas (Seconds_Behind_Source acima de max_lag) ou fora do ar.
+
+    O atraso é verificado por uma thread de cada worker a cada check_interval
+    segundos; pick() só lê o último estado, sem consultar o banco na requisição.
+    """
+
+    def __init__(self, hosts, db_config, pool_config, max_lag=5, check_interval=5, connect_timeout=1, check_timeout=2):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._lock = threading.Lock()
+        self._monitor_pid = None
+        self.replicas = []
+        for address in hosts:
+            host, _, port = address.partition(':')
+            config = {**db_config, 'host': host, 'port': int(port or db_config['port']), 'connect_timeout': connect_timeout}
+            self.replicas.append({
+                'name': address,
+                'config': config,
+                'pool': ConnectionPool(config, **pool_config),
+                'healthy': False,
+                'lag': None,
+                'checked_at': None,
+                'error': None
+            })
+
+    def _check(self, replica):
+        # Conexão própria, com timeout de leitura curto, fora do pool usado pelas rotas
+        try:
+            connection = pymysql.connect(**{**replica['config'], 'read_timeout': self.check_timeout,
+                                            'cursorclass': pymysql.cursors.DictCursor})
+            try:
+                cur = connection.cursor()
+                cur.execute("SHOW REPLICA STATUS")
+                row = cur.fetchone()
+            finally:
+                connection.close()
+            # Sem linha: o servidor não é réplica; valor nulo: replicação parada
+            lag = row.get('Seconds_Behind_Source') if row else None
+            replica['lag'] = lag
+            replica['healthy'] = lag is not None and lag <= self.max_lag
+            replica['error'] = None if lag is not None else 'Replicacao parada ou nao configurada'
+        except Exception as e:
+            replica['healthy'] = False
+            replica['lag'] = None
+            replica['error'] = str(e)
+        replica['checked_at'] = time.monotonic()
+
+    def check_all(self):
+        for replica in self.replicas:
+            self._check(replica)
+
+    def _monitor(self):
+        while True:
+            self.check_all()
+            time.sleep(self.check_interval)
+
+    def _ensure_monitor(self):
+        """Inicia a thread de verificação neste processo (os workers do gunicorn nascem por fork)"""
+        if self._monitor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._monitor_pid != os.getpid():
+                self._monitor_pid = os.getpid()
+                threading.Thread(target=self._monitor, name='replica-monitor', daemon=True).start()
+
+    def pick(self):
+        """Réplica saudável sorteada entre as disponíveis, ou None para usar o primário"""
+        self._ensure_monitor()
+        healthy = [replica for replica in self.replicas if replica['healthy']]
+        return random.choice(healthy) if healthy else None
+
+    def mark_down(self, replica, error):
+        """Tira a réplica da rotação até a próxima verificação"""
+        replica['healthy'] = False
+        replica['error'] = str(error)
+
+    def stats(self):
+        return [{
+            'name': replica['name'],
+            'healthy': replica['healthy'],
+            'lag': replica['lag'],
+            'error': replica['error'],
+            'pool': replica['pool'].stats()
+        } for replica in self.replicas]
+
+replica_router = ReplicaRouter(
+    DB_REPLICA_CONFIG['hosts'], DB_CONFIG, DB_POOL_CONFIG,
+    DB_REPLICA_CONFIG['max_lag'], DB_REPLICA_CONFIG['check_interval'],
+    DB_REPLICA_CONFIG['connect_timeout'], DB_REPLICA_CONFIG['check_timeout']
+) if DB_REPLICA_CONFIG['hosts'] else None
+
+def read_replica(f):
+    """Rota somente leitura: as consultas podem ir para uma réplica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+def primary_pinned():
+    """Depois de uma escrita, o usuário lê do primário por DB_REPLICA_PIN_SECONDS (read-your-writes)"""
+    return session.get('db_primary_until', 0) > time.time()
+
+def request_replica():
+    """Réplica usada por todas as consultas da requisição atual (escolhida no primeiro uso)"""
+    if 'db_replica' not in g:
+        if primary_pinned():
+            g.db_replica = None
+            DB_READ_ROUTING.labels('primary_pinned').inc()
+        else:
+            g.db_replica = replica_router.pick()
+            DB_READ_ROUTING.labels('replica' if g.db_replica else 'primary_fallback').inc()
+    return g.db_replica
+
+def acquire_connection(replica=None):
+    """Retorna (pool, conexão): réplica nas rotas de leitura, primário nos demais casos"""
+    if replica is not False and replica_router and has_request_context() and g.get('db_read_replica'):
+        chosen = request_replica()
+        if chosen:
+            try:
+                return chosen['pool'], chosen['pool'].acquire()
+            except Exception as e:
+                # Réplica fora do ar: esta e as próximas requisições usam o primário
+                replica_router.mark_down(chosen, e)
+                g.db_replica = None
+                DB_READ_ROUTING.labels('primary_fallback').inc()
+    return db_pool, db_pool.acquire()
+
+@contextmanager
+def get_db_connection(replica=None):
+    """Empresta uma conexão do pool e a devolve ao final do bloco with.
+    Com replica=False a conexão vem sempre do primário, mesmo em rotas de leitura."""
+    started = time.perf_counter()
+    pool, connection = acquire_connection(replica)
+    if SQL_PROFILE_CONFIG['enabled'] and has_request_context():
+        request_sql_profile()['pool_wait_ms'] += (time.perf_counter() - started) * 1000
+    try:
+        yield connection
+    finally:
+        pool.release(connection)
+
+# Métricas no formato do Prometheus, expostas em /metrics
+# Com PROMETHEUS_MULTIPROC_DIR definido, os valores de todos os workers do gunicorn sao somados
+METRICS_CONFIG = {
+    'multiproc_dir': os.getenv('PROMETHEUS_MULTIPROC_DIR'),
+    'token': os.getenv('METRICS_TOKEN')
+}
+
+if METRICS_CONFIG['multiproc_dir']:
+    os.makedirs(METRICS_CONFIG['multiproc_dir'], exist_ok=True)
+
+HTTP_REQUESTS = Counter('http_requests_total', 'Requisicoes atendidas', ['method', 'endpoint', 'status'])
+HTTP_REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Duracao das requisicoes', ['method', 'endpoint'])
+HTTP_IN_PROGRESS = Gauge('http_requests_in_progress', 'Requisicoes em andamento', ['method'], multiprocess_mode='livesum')
+FLASH_MESSAGES = Counter('flash_messages_total', 'Mensagens exibidas ao usuario', ['endpoint', 'category'])
+TEMPLATE_RENDER_SECONDS = Histogram('template_render_duration_seconds', 'Tempo de renderizacao dos templates', ['template'])
+PASSWORD_HASH_SECONDS = Histogram('password_hash_duration_seconds', 'Tempo do bcrypt', ['operation'],
+                                  buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0, 10.0))
+APPOINTMENT_OUTCOMES = Counter('appointment_outcomes_total', 'Resultado das operacoes de agendamento', ['outcome'])
+DB_POOL_CONNECTIONS = Gauge('db_pool_connections', 'Conexoes do pool', ['state'], multiprocess_mode='livesum')
+DB_POOL_EVENTS = Counter('db_pool_events_total', 'Eventos do pool de conexoes', ['event'])
+DB_POOL_WAIT_SECONDS = Counter('db_pool_wait_seconds_total', 'Tempo total esperando uma conexao livre')
+DB_READ_ROUTING = Counter('db_read_routing_total', 'Destino das consultas das rotas de leitura', ['target'])
+
+_pool_metrics_seen = {}
+
+def sync_pool_metrics():
+    """Copia as estatisticas do pool deste worker para as metricas"""
+    stats = db_pool.stats()
+    DB_POOL_CONNECTIONS.labels('in_use').set(stats['in_use'])
+    DB_POOL_CONNECTIONS.labels('idle').set(stats['idle'])
+    if _pool_metrics_seen.get('pid') != stats['pid']:
+        _pool_metrics_seen.clear()
+        _pool_metrics_seen['pid'] = stats['pid']
+    # Os contadores do pool sao acumulados; as metricas recebem so a diferenca desde a ultima leitura
+    for event in ('checkouts', 'waits', 'timeouts', 'created', 'evictions', 'wait_time'):
+        delta = stats[event] - _pool_metrics_seen.get(event, 0)
+        if delta > 0:
+            if event == 'wait_time':
+                DB_POOL_WAIT_SECONDS.inc(delta)
+            else:
+                DB_POOL_EVENTS.labels(event).inc(delta)
+        _pool_metrics_seen[event] = stats[event]
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    HTTP_IN_PROGRESS.labels(request.method).inc()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' in g:
+        endpoint = request.endpoint or 'not_found'
+        HTTP_REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint).observe(time.perf_counter() - g.request_started)
+        sync_pool_metrics()
+    return response
+
+@app.after_request
+def pin_primary_after_write(response):
+    """Depois de uma escrita, as próximas leituras do usuário vão para o primário por alguns segundos"""
+    if replica_router and request.method not in ('GET', 'HEAD', 'OPTIONS') and 'user_id' in session:
+        session['db_primary_until'] = time.time() + DB_REPLICA_CONFIG['pin_seconds']
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if g.pop('request_started', None) is not None:
+        HTTP_IN_PROGRESS.labels(request.method).dec()
+
+@before_render_template.connect_via(app)
+def start_template_metrics(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def record_template_metrics(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        TEMPLATE_RENDER_SECONDS.labels(template.name or 'string').observe(time.perf_counter() - started)
+
+@message_flashed.connect_via(app)
+def record_flash_metrics(sender, message, category, **extra):
+    FLASH_MESSAGES.labels(request.endpoint or 'not_found', category).inc()
+
+@app.route('/metrics')
+def metrics():
+    """Metricas de todos os workers no formato texto do Prometheus"""
+    if METRICS_CONFIG['token'] and request.headers.get('Authorization') != f"Bearer {METRICS_CONFIG['token']}":
+        return app.response_class('Nao autorizado\n', status=401, mimetype='text/plain')
+    if METRICS_CONFIG['multiproc_dir']:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return app.response_class(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+# Configuração da sessão
+# SESSION_BACKEND: filesystem | mysql | redis | cookie (cookie assinado, sem armazenamento no servidor)
+SESSION_CONFIG = {
+    'backend': os.getenv('SESSION_BACKEND', 'filesystem'),
+    'lifetime': int(os.getenv('SESSION_LIFETIME', str(31 * 24 * 3600))),
+    'refresh_each_request': os.getenv('SESSION_REFRESH_EACH_REQUEST', '0') in ('1', 'true', 'True'),
+    'cleanup_n_requests': int(os.getenv('SESSION_CLEANUP_N_REQUESTS', '1000')),
+    'cleanup_batch_size': int(os.getenv('SESSION_CLEANUP_BATCH_SIZE', '1000')),
+    'mysql_table': os.getenv('SESSION_MYSQL_TABLE', 'flask_sessions'),
+    'redis_url': os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/1')
+}
+
+class MySQLSessionInterface(ServerSideSessionInterface):
+    """Sessões guardadas em uma tabela MySQL, compartilhadas entre workers e hosts.
+    Usam sempre o primário, já que a sessão é gravada também nas rotas de leitura.
+
+    A limpeza das sessões expiradas roda em lotes, em média a cada
+    SESSION_CLEANUP_N_REQUESTS requisições.
+    """
+
+    ttl = False
+
+    def __init__(self, app, table='flask_sessions', cleanup_batch_size=1000, **kwargs):
+        self.table = table
+        self.cleanup_batch_size = cleanup_batch_size
+        super().__init__(app, **kwargs)
+
+    def _retrieve_session_data(self, store_id):
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            cur.execute(f"SELECT data FROM {self.table} WHERE session_id = %s AND expiry > UTC_TIMESTAMP()", (store_id,))
+            row = cur.fetchone()
+        return self.serializer.decode(row['data']) if row else None
+
+    def _delete_session(self, store_id):
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            cur.execute(f"DELETE FROM {self.table} WHERE session_id = %s", (store_id,))
+            connection.commit()
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        expiry = datetime.now(timezone.utc).replace(tzinfo=None) + session_lifetime
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            cur.execute(f"""
+                INSERT INTO {self.table} (session_id, data, expiry) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE data = VALUES(data), expiry = VALUES(expiry)
+            """, (store_id, self.serializer.encode(session), expiry))
+            connection.commit()
+
+    def _delete_expired_sessions(self):
+        # Apaga em lotes para nao segurar locks da tabela por muito tempo
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            while True:
+                cur.execute(f"DELETE FROM {self.table} WHERE expiry <= UTC_TIMESTAMP() LIMIT %s", (self.cleanup_batch_size,))
+                connection.commit()
+                if cur.rowcount < self.cleanup_batch_size:
+                    break
+
+def init_session(app, config):
+    """Configura o armazenamento de sessão escolhido em SESSION_BACKEND"""
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(seconds=config['lifetime'])
+    # Sem refresh a cada requisicao, sessoes que nao mudaram nao sao regravadas
+    app.config['SESSION_REFRESH_EACH_REQUEST'] = config['refresh_each_request']
+    
+    if config['backend'] == 'cookie':
+        # Sessao padrao do Flask: cookie assinado com SECRET_KEY
+        return
+    if config['backend'] == 'mysql':
+        app.session_interface = MySQLSessionInterface(
+            app,
+            table=config['mysql_table'],
+            cleanup_batch_size=config['cleanup_batch_size'],
+            cleanup_n_requests=config['cleanup_n_requests']
+        )
+        return
+    if config['backend'] == 'redis':
+        # Requer o pacote redis (pip install redis), que nao faz parte do requirements.txt
+        import redis
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = redis.from_url(config['redis_url'])
+    else:
+        app.config['SESSION_TYPE'] = 'filesystem'
+    Session(app)
+
+init_session(app, SESSION_CONFIG)
+
+def conditional_json(etag, last_modified, build):
+    """Responde 304 se o cliente ja tem a versao atual; senao serializa o resultado de build()"""
+    return conditional_response(request, etag, last_modified, build)
+
+def timestamp_to_utc(value):
+    """Converte UNIX_TIMESTAMP() do MySQL em datetime com fuso UTC (None se ausente)"""
+    return datetime.fromtimestamp(int(value), timezone.utc) if value is not None else None
+
+def conditional_response(req, etag, last_modified, build):
+    """Mesmo que conditional_json, para uma requisicao explicita (usado tambem pelo modo ASGI)
+
+    last_modified precisa ter fuso (ver timestamp_to_utc): um datetime sem fuso
+    seria interpretado no horario local do processo.
+    """
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            raise ValueError('last_modified sem fuso horario')
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    
+    if req.if_none_match:
+        not_modified = req.if_none_match.contains(etag)
+    else:
+        not_modified = bool(last_modified and req.if_modified_since and last_modified <= req.if_modified_since)
+    
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        response = app.json.response(build())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # O navegador e o proxy podem guardar a resposta, mas precisam revalidar a cada uso
+    response.cache_control.no_cache = True
+    return response
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('login'))
+        if session['user_id'] != 1:
+            flash('Acesso negado! Apenas administradores podem acessar esta página.', 'error')
+            return redirect(url_for('profile'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Configuração do hash de senhas (bcrypt roda em processos separados)
+PASSWORD_HASH_CONFIG = {
+    'rounds': int(os.getenv('BCRYPT_ROUNDS', '12')),
+    'workers': int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+    'max_pending': int(os.getenv('PASSWORD_HASH_MAX_PENDING', '8')),
+    'timeout': float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+}
+
+class PasswordHasher:
+    """Executa o bcrypt em um pool limitado de processos, fora da thread da requisição"""
+
+    def __init__(self, workers=2, max_pending=8, timeout=10):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # O pool de processos não sobrevive ao fork dos workers do gunicorn
+        self._pid = os.getpid()
+        self._executor = None
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._executor is None:
+                # spawn: o worker tem threads (pool de conexões), fork não é seguro;
+                # os processos importam só o módulo passwords, não a aplicação
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        executor = self._get_executor()
+        pending = self._pending
+        if not pending.acquire(timeout=self.timeout):
+            raise RuntimeError('Muitas verificações de senha em andamento, tente novamente em instantes.')
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            pending.release()
+            self._discard_broken(executor, e)
+            raise
+        # A vaga só é liberada quando a tarefa termina: se a requisição desistir por tempo,
+        # o bcrypt continua ocupando o processo e precisa continuar contando no limite
+        future.add_done_callback(lambda _: pending.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Ainda na fila: ninguém vai usar o resultado, então nem chega a rodar
+            future.cancel()
+            raise
+        except BrokenProcessPool as e:
+            self._discard_broken(executor, e)
+            raise
+
+    def _discard_broken(self, executor, error):
+        # Um processo morreu: descarta o pool para recriá-lo na próxima chamada
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_CONFIG['workers'],
+    max_pending=PASSWORD_HASH_CONFIG['max_pending'],
+    timeout=PASSWORD_HASH_CONFIG['timeout']
+)
+
+def hash_password(password):
+    with PASSWORD_HASH_SECONDS.labels('hash').time():
+        hashed = password_hasher.run(bcrypt_hash, password.encode('utf-8'), PASSWORD_HASH_CONFIG['rounds'])
+    return hashed.decode('utf-8')
+
+def check_password(password, hashed):
+    """Verifica senha com compatibilidade para texto plano e bcrypt"""
+    if not hashed.startswith('$2'):
+        return secrets.compare_digest(password.encode('utf-8'), hashed.encode('utf-8'))
+    try:
+        with PASSWORD_HASH_SECONDS.labels('check').time():
+            return password_hasher.run(bcrypt_check, password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        return False
+
+def password_needs_rehash(hashed):
+    """Senhas em texto plano ou com custo diferente do configurado devem ser refeitas"""
+    try:
+        return not hashed.startswith('$2') or int(hashed.split('$')[2]) != PASSWORD_HASH_CONFIG['rounds']
+    except (IndexError, ValueError):
+        return True
+
+def time_to_minutes(value):
+    """Converte TIME do MySQL (timedelta) ou string HH:MM[:SS] para minutos do dia"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60)
+    parts = str(value).split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+def minutes_to_time(minutes):
+    """Converte minutos do dia para string de hora HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def salon_is_open(opening_day_num, closing_day_num, weekday_num):
+    """Verifica se o salao funciona no dia da semana informado (0=segunda, 6=domingo)"""
+    if closing_day_num >= opening_day_num:
+        # Intervalo normal (ex: segunda a sexta)
+        return opening_day_num <= weekday_num <= closing_day_num
+    # Intervalo que atravessa o fim de semana (ex: quinta a terca)
+    return weekday_num >= opening_day_num or weekday_num <= closing_day_num
+
+# Configuração do índice de disponibilidade em memória
+AVAILABILITY_INDEX_TTL = float(os.getenv('AVAILABILITY_INDEX_TTL', '60'))
+AVAILABILITY_INDEX_MAX_DAYS = int(os.getenv('AVAILABILITY_INDEX_MAX_DAYS', '50000'))
+AVAILABILITY_RANGE_MAX_DAYS = int(os.getenv('AVAILABILITY_RANGE_MAX_DAYS', '31'))
+# Intervalo entre os horarios de inicio oferecidos na agenda
+SLOT_MINUTES = int(os.getenv('SLOT_MINUTES', '30'))
+
+# Consultas de disponibilidade, compartilhadas com o modo ASGI (asgi.py)
+HAIRDRESSER_SCHEDULE_SQL = """
+    SELECT s.opening_day, s.closing_day, s.opening_time, s.closing_time
+    FROM hairdressers h
+    INNER JOIN salons s ON h.salon_id = s.id
+    WHERE h.id = %s
+"""
+
+BOOKED_TIMES_SQL = """
+    SELECT appointment_time, duration_minutes
+    FROM appointments
+    WHERE hairdresser_id = %s
+    AND appointment_date = %s
+    AND status != 'cancelled'
+"""
+
+class AvailabilityIndex:
+    """Índice em memória dos horários ocupados por cabeleireiro e dia.
+
+    Cada dia é um bitmap (int) onde o bit N indica que o minuto N do dia está
+    ocupado por um agendamento ativo (todos os minutos da sua duração). O índice é carregado do banco na primeira leitura e
+    atualizado pelas rotas de agendamento; o TTL limita quanto tempo um
+    worker pode ficar sem enxergar alterações feitas pelos outros workers.
+
+    Cada dia também tem uma geração, trocada por book/release/invalidate: uma
+    carga do banco só é guardada se a geração não mudou enquanto ela rodava,
+    senão um bitmap lido antes de um agendamento sobrescreveria o atualizado.
+    """
+
+    def __init__(self, ttl=60, max_days=50000):
+        self.ttl = ttl
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._schedules = {}
+        self._days = OrderedDict()
+        self._generations = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        # Geracao dos dias sem entrada propria; so cresce, entao um dia descartado
+        # nunca volta a uma geracao que uma carga em andamento ja tenha visto
+        self._generation_floor = 0
+
+    def _fresh(self, loaded_at):
+        return time.monotonic() - loaded_at < self.ttl
+
+    def _generation(self, key):
+        return self._generations.get(key, self._generation_floor)
+
+    def _bump_generation(self, key):
+        self._generations[key] = next(self._generation_counter)
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.max_days:
+            _, evicted = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, evicted)
+
+    def generation(self, hairdresser_id, day):
+        """Geracao atual do dia; passe para put_booked a lida antes de consultar o banco"""
+        with self._lock:
+            return self._generation((hairdresser_id, day))
+
+    def schedule(self, hairdresser_id):
+        """Retorna o horario de funcionamento do salao do cabeleireiro, ou None se nao existir"""
+        found, schedule = self.cached_schedule(hairdresser_id)
+        if found:
+            return schedule
+
+        # O indice vive alem da requisicao: le do primario, nunca de uma replica atrasada
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            cur.execute(HAIRDRESSER_SCHEDULE_SQL, (hairdresser_id,))
+            salon = cur.fetchone()
+
+        schedule = build_schedule(salon) if salon else None
+        self.put_schedule(hairdresser_id, schedule)
+        return schedule
+
+    def cached_schedule(self, hairdresser_id):
+        """Retorna (encontrado, horario) sem acessar o banco"""
+        with self._lock:
+            entry = self._schedules.get(hairdresser_id)
+        if entry and self._fresh(entry[1]):
+            return True, entry[0]
+        return False, None
+
+    def put_schedule(self, hairdresser_id, schedule):
+        with self._lock:
+            self._schedules[hairdresser_id] = (schedule, time.monotonic())
+
+    def booked(self, hairdresser_id, day):
+        """Retorna o bitmap de minutos ocupados do cabeleireiro no dia"""
+        bitmap = self.cached_booked(hairdresser_id, day)
+        if bitmap is not None:
+            return bitmap
+
+        generation = self.generation(hairdresser_id, day)
+        with get_db_connection(replica=False) as connection:
+            cur = connection.cursor()
+            cur.execute(BOOKED_TIMES_SQL, (hairdresser_id, day))
+            bitmap = booked_bitmap(cur.fetchall())
+
+        self.put_booked(hairdresser_id, day, bitmap, generation)
+        return bitmap
+
+    def cached_booked(self, hairdresser_id, day):
+        """Retorna o bitmap do dia se estiver carregado e dentro do TTL, senao None"""
+        key = (hairdresser_id, day)
+        with self._lock:
+            entry = self._days.get(key)
+            if entry and self._fresh(entry[1]):
+                self._days.move_to_end(key)
+                return entry[0]
+        return None
+
+    def put_booked(self, hairdresser_id, day, bitmap, generation=None):
+        """Guarda o bitmap carregado; com generation, descarta se o dia mudou desde a leitura"""
+        key = (hairdresser_id, day)
+        with self._lock:
+            if generation is not None and self._generation(key) != generation:
+                return
+            self._days[key] = [bitmap, time.monotonic()]
+            self._days.move_to_end(key)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+
+    def booked_range(self, hairdresser_ids, date_from, date_to, connection=None):
+        """Retorna {(cabeleireiro, dia): bitmap} do periodo, com uma unica consulta se faltar algum dia"""
+        days = [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+        result = {}
+        with self._lock:
+            generations = {(hairdresser_id, day): self._generation((hairdresser_id, day)) for hairdresser_id in hairdresser_ids for day in days}
+            for hairdresser_id in hairdresser_ids:
+                for day in days:
+                    entry = self._days.get((hairdresser_id, day))
+                    if not entry or not self._fresh(entry[1]):
+                        break
+                    result[(hairdresser_id, day)] = entry[0]
+        if len(result) == len(hairdresser_ids) * len(days):
+            return result
+
+        result = {(hairdresser_id, day): 0 for hairdresser_id in hairdresser_ids for day in days}
+        if hairdresser_ids:
+            with nullcontext(connection) if connection else get_db_connection(replica=False) as connection:
+                cur = connection.cursor()
+                placeholders = ', '.join(['%s'] * len(hairdresser_ids))
+                cur.execute(f"""
+                    SELECT hairdresser_id, appointment_date, appointment_time, duration_minutes
+                    FROM appointments
+                    WHERE hairdresser_id IN ({placeholders})
+                    AND appointment_date BETWEEN %s AND %s
+                    AND status != 'cancelled'
+                """, (*hairdresser_ids, date_from, date_to))
+                for apt in cur.fetchall():
+                    key = (apt['hairdresser_id'], apt['appointment_date'])
+                    if key in result:
+                        result[key] |= interval_mask(time_to_minutes(apt['appointment_time']), apt['duration_minutes'])
+
+        loaded_at = time.monotonic()
+        with self._lock:
+            for key, bitmap in result.items():
+                # Dia alterado durante a consulta: o bitmap lido pode estar velho
+                if self._generation(key) != generations[key]:
+                    continue
+                self._days[key] = [bitmap, loaded_at]
+                self._days.move_to_end(key)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return result
+
+    def _update(self, hairdresser_id, appointment_date, appointment_time, duration, occupied):
+        try:
+            key = (int(hairdresser_id), _as_date(appointment_date))
+            mask = interval_mask(time_to_minutes(appointment_time), duration)
+        except (TypeError, ValueError, IndexError):
+            return
+        with self._lock:
+            self._bump_generation(key)
+            entry = self._days.get(key)
+            # Dias ainda nao carregados serao lidos do banco na proxima consulta
+            if entry:
+                entry[0] = entry[0] | mask if occupied else entry[0] & ~mask
+
+    def book(self, hairdresser_id, appointment_date, appointment_time, duration=DEFAULT_SERVICE_MINUTES):
+        """Marca o intervalo do agendamento como ocupado"""
+        self._update(hairdresser_id, appointment_date, appointment_time, duration, True)
+
+    def release(self, hairdresser_id, appointment_date, appointment_time, duration=DEFAULT_SERVICE_MINUTES):
+        """Marca o intervalo do agendamento como livre"""
+        self._update(hairdresser_id, appointment_date, appointment_time, duration, False)
+
+    def invalidate_hairdresser(self, hairdresser_id):
+        """Descarta tudo o que foi carregado para o cabeleireiro"""
+        with self._lock:
+            self._schedules.pop(hairdresser_id, None)
+            for key in [k for k in self._days if k[0] == hairdresser_id]:
+                del self._days[key]
+            # Dias sem geracao propria leem o piso: troca-lo invalida as cargas em andamento
+            for key in [k for k in self._generations if k[0] == hairdresser_id]:
+                del self._generations[key]
+            self._generation_floor = next(self._generation_counter)
+
+    def invalidate_schedules(self):
+        """Descarta os horarios de funcionamento (ex: salao editado)"""
+        with self._lock:
+            self._schedules.clear()
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+            self._days.clear()
+            self._generations.clear()
+            self._generation_floor = next(self._generation_counter)
+
+def build_schedule(salon):
+    """Monta o horario de funcionamento com os horarios de inicio possiveis a cada SLOT_MINUTES"""
+    opening_minutes = time_to_minutes(salon['opening_time'])
+    closing_minutes = time_to_minutes(salon['closing_time'])
+    return {
+        'opening_day_num': WEEKDAY_TO_NUM.get(salon['opening_day'], 0),
+        'closing_day_num': WEEKDAY_TO_NUM.get(salon['closing_day'], 4),
+        'closing_minutes': closing_minutes,
+        'slots': tuple((m, minutes_to_time(m)) for m in range(opening_minutes, closing_minutes, SLOT_MINUTES))
+    }
+
+def interval_mask(start, duration):
+    """Bitmap com os minutos [start, start + duration) do dia"""
+    return ((1 << duration) - 1) << start
+
+def booked_bitmap(rows):
+    """Monta o bitmap de minutos ocupados a partir das linhas de BOOKED_TIMES_SQL"""
+    bitmap = 0
+    for apt in rows:
+        bitmap |= interval_mask(time_to_minutes(apt['appointment_time']), apt['duration_minutes'])
+    return bitmap
+
+def available_slots(schedule, day, booked, now=None, duration=DEFAULT_SERVICE_MINUTES):
+    """Lista os horarios de inicio em que o servico cabe inteiro antes do fechamento sem sobrepor outro agendamento"""
+    closing_minutes = schedule['closing_minutes']
+    available_times = [
+        label for minutes, label in schedule['slots']
+        if minutes + duration <= closing_minutes and not booked & interval_mask(minutes, duration)
+    ]
+    
+    # Se for hoje, remove horarios que ja passaram
+    now = now or datetime.now()
+    if day == now.date():
+        current_time_str = f"{now.hour:02d}:{now.minute:02d}"
+        available_times = [t for t in available_times if t > current_time_str]
+    return available_times
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+availability_index = AvailabilityIndex(AVAILABILITY_INDEX_TTL, AVAILABILITY_INDEX_MAX_DAYS)
+
+# Configuração do cache de dados de referência (saloes e cabeleireiros)
+# filesystem: compartilhado entre os workers | redis: compartilhado entre hosts | memory: LRU por worker
+# As rotas administrativas so conseguem invalidar todos os workers com um backend compartilhado
+REFERENCE_CACHE_CONFIG = {
+    'backend': os.getenv('REFERENCE_CACHE_BACKEND', 'filesystem'),
+    'ttl': int(os.getenv('REFERENCE_CACHE_TTL', '300')),
+    'max_entries': int(os.getenv('REFERENCE_CACHE_MAX_ENTRIES', '1024')),
+    'dir': os.getenv('REFERENCE_CACHE_DIR', '/tmp/vi_beauty_cache'),
+    'redis_url': os.getenv('REFERENCE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+}
+
+class ReferenceCache:
+    """Cache read-through com TTL para consultas que mudam pouco.
+
+    As chaves seguem o formato '<grupo>:<id>' e os contadores de acertos e
+    falhas sao agrupados pelo prefixo. As rotas administrativas apagam as
+    chaves afetadas logo apos o commit.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, shared=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {}
+
+    def _count(self, key, field):
+        group = key.split(':', 1)[0]
+        with self._lock:
+            counters = self._stats.setdefault(group, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            counters[field] += 1
+
+    def _get(self, key):
+        if self.shared is not None:
+            return self.shared.get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _set(self, key, value):
+        if self.shared is not None:
+            self.shared.set(key, value, timeout=self.ttl)
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Retorna o valor em cache ou chama loader() e guarda o resultado (None nao e guardado)"""
+        value = self._get(key)
+        if value is not None:
+            self._count(key, 'hits')
+            return value
+        self._count(key, 'misses')
+        value = loader()
+        if value is not None:
+            self._set(key, value)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """Versao de get_or_load para o modo ASGI, onde loader() e uma corrotina"""
+        # O backend compartilhado faz E/S bloqueante (arquivos, redis): roda fora do event loop,
+        # como a leitura da sessao em asgi.py; o LRU em memoria e lido direto
+        offload = self.shared is not None
+        value = await asyncio.to_thread(self._get, key) if offload else self._get(key)
+        if value is not None:
+            self._count(key, 'hits')
+            return value
+        self._count(key, 'misses')
+        value = await loader()
+        if value is not None:
+            if offload:
+                await asyncio.to_thread(self._set, key, value)
+            else:
+                self._set(key, value)
+        return value
+
+    def delete(self, *keys):
+        """Invalida as chaves informadas"""
+        for key in keys:
+            self._count(key, 'invalidations')
+            if self.shared is not None:
+                self.shared.delete(key)
+            else:
+                with self._lock:
+                    self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = {group: dict(counters) for group, counters in self._stats.items()}
+            size = len(self._entries)
+        backend = REFERENCE_CACHE_CONFIG['backend'] if self.shared is not None else 'memory'
+        return {'backend': backend, 'entries': size, 'groups': stats}
+
+def create_shared_cache(config):
+    """Cria o armazenamento compartilhado do cache conforme a configuração"""
+    if config['backend'] == 'filesystem':
+        return FileSystemCache(config['dir'], threshold=config['max_entries'], default_timeout=config['ttl'])
+    if config['backend'] == 'redis':
+        # Requer o pacote redis (pip install redis), que nao faz parte do requirements.txt
+        from cachelib import RedisCache
+        import redis
+        return RedisCache(redis.from_url(config['redis_url']), key_prefix='vi_beauty:', default_timeout=config['ttl'])
+    return None
+
+reference_cache = ReferenceCache(
+    REFERENCE_CACHE_CONFIG['ttl'],
+    REFERENCE_CACHE_CONFIG['max_entries'],
+    create_shared_cache(REFERENCE_CACHE_CONFIG)
+)
+
+# Cache de fragmentos de template (cartoes de saloes e cabeleireiros, lista de saloes do agendamento)
+# O HTML fica em memoria por worker; a chave muda sozinha quando a linha muda, sem invalidacao
+FRAGMENT_CACHE_CONFIG = {
+    'enabled': os.getenv('FRAGMENT_CACHE', '1') not in ('0', 'false', 'False'),
+    'ttl': int(os.getenv('FRAGMENT_CACHE_TTL', '3600')),
+    'max_entries': int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', '5000')),
+    'bytecode_dir': os.getenv('TEMPLATE_BYTECODE_CACHE_DIR')
+}
+
+fragment_cache = ReferenceCache(FRAGMENT_CACHE_CONFIG['ttl'], FRAGMENT_CACHE_CONFIG['max_entries'])
+
+# Templates compilados guardados em disco: os workers novos nao recompilam os templates
+if FRAGMENT_CACHE_CONFIG['bytecode_dir']:
+    os.makedirs(FRAGMENT_CACHE_CONFIG['bytecode_dir'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(FRAGMENT_CACHE_CONFIG['bytecode_dir'])
+
+@app.template_filter('fragment_version')
+def fragment_version(value):
+    """Versao do conteudo usada na chave do fragmento: id e updated_at da linha e um checksum
+    de todos os campos (updated_at tem resolucao de segundos e nao cobre colunas de JOIN)"""
+    checksum = zlib.crc32(repr(value).encode('utf-8'))
+    if isinstance(value, dict) and 'id' in value:
+        return f"{value['id']}:{value.get('updated_at')}:{checksum:08x}"
+    return f'{checksum:08x}'
+
+@app.template_global()
+def cached_fragment(template_name, version, **context):
+    """Renderiza o template parcial uma vez por versao e reaproveita o HTML nas proximas requisicoes"""
+    def render():
+        return app.jinja_env.get_template(template_name).render(**context)
+    if not FRAGMENT_CACHE_CONFIG['enabled']:
+        return Markup(render())
+    return Markup(fragment_cache.get_or_load(f'{template_name}:{version}', render))
+
+def fetch_all(sql, args=None, connection=None, replica=None):
+    """Executa uma consulta em uma conexão do pool (ou na conexão informada) e retorna todas as linhas.
+    Quem guarda o resultado em cache compartilhado passa replica=False (ver get_db_connection)."""
+    with nullcontext(connection) if connection else get_db_connection(replica) as connection:
+        cur = connection.cursor()
+        cur.execute(sql, args)
+        return cur.fetchall()
+
+# Paginação por cursor (keyset) das listagens
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '200'))
+
+def _cursor_value(value):
+    if isinstance(value, timedelta):
+        return format_time(value, seconds=True)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def encode_cursor(values):
+    """Codifica as chaves de ordenacao da ultima linha da pagina em um cursor opaco"""
+    payload = json.dumps([_cursor_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Decodifica um cursor com size chaves; retorna None se ausente ou invalido"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def page_size_arg():
+    """Tamanho de pagina pedido em ?limit=, limitado a MAX_PAGE_SIZE"""
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_page(sql, args, order_keys, limit):
+    """Busca limit + 1 linhas para saber se ha proxima pagina; retorna (linhas, proximo cursor)"""
+    rows = fetch_all(sql + " LIMIT %s", (*args, limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1][key] for key in order_keys])
+
+def salons_list_query(cursor=None):
+    """Consulta da listagem de saloes ordenada por nome, a partir do cursor se houver"""
+    where = "WHERE (name, id) > (%s, %s)" if cursor else ""
+    return f"""
+        SELECT id, name, description, address, phone, image_url, opening_day, closing_day,
+               opening_time, closing_time, created_at, updated_at
+        FROM salons
+        {where}
+        ORDER BY name ASC, id ASC
+    """, cursor or []
+
+# Listagem de cabeleireiros em ordem alfabetica de salao e de cabeleireiro (os ids desempatam).
+# O cursor leva o nome do salao: o filtro vira uma faixa em idx_salons_name e os cabeleireiros
+# de cada salao vem de idx_hairdressers_salon_name (salon_id, name, id)
+HAIRDRESSER_LIST_ORDER = "ORDER BY s.name ASC, s.id ASC, h.name ASC, h.id ASC"
+HAIRDRESSER_LIST_AFTER = "(s.name, s.id, h.name, h.id) > (%s, %s, %s, %s)"
+HAIRDRESSER_LIST_KEYS = ['salon_name', 'salon_id', 'name', 'id']
+
+def hairdressers_list_query(cursor=None):
+    """Consulta da listagem de cabeleireiros ordenada por salao e nome, a partir do cursor se houver"""
+    where = f"WHERE {HAIRDRESSER_LIST_AFTER}" if cursor else ""
+    return f"""
+        SELECT h.id, h.name, h.salon_id, h.specialties, h.phone, h.email, h.image_url, h.bio,
+               h.created_at, h.updated_at, s.name as salon_name
+        FROM hairdressers h
+        INNER JOIN salons s ON h.salon_id = s.id
+        {where}
+        {HAIRDRESSER_LIST_ORDER}
+    """, cursor or []
+
+def load_salons_page(after, limit):
+    """Pagina de saloes ordenada por nome"""
+    sql, args = salons_list_query(decode_cursor(after, 2))
+    return keyset_page(sql, args, ['name', 'id'], limit)
+
+def load_hairdressers_page(after, limit):
+    """Pagina de cabeleireiros ordenada por salao e nome"""
+    sql, args = hairdressers_list_query(decode_cursor(after, len(HAIRDRESSER_LIST_KEYS)))
+    return keyset_page(sql, args, HAIRDRESSER_LIST_KEYS, limit)
+
+# Streaming das listagens administrativas (lista inteira, sem paginacao)
+ADMIN_LIST_STREAMING = os.getenv('ADMIN_LIST_STREAMING', '0') not in ('0', 'false', 'False')
+STREAM_BUFFER_SIZE = int(os.getenv('STREAM_BUFFER_SIZE', '8192'))
+
+def streaming_requested():
+    """Lista inteira em streaming com ?stream=1, ou por padrao com ADMIN_LIST_STREAMING"""
+    value = request.args.get('stream')
+    if value is None:
+        return ADMIN_LIST_STREAMING and not request.args.get('after')
+    return value not in ('0', 'false', 'False')
+
+def peek_rows(rows):
+    """Le a primeira linha para saber se ha resultados; retorna [] ou um iterador com todas as linhas"""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return []
+    return itertools.chain([first], rows)
+
+def buffered(chunks, size=None):
+    """Agrupa os pedacos pequenos gerados pelo Jinja em blocos de ~size caracteres"""
+    size = size or STREAM_BUFFER_SIZE
+    pending, length = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(pending)
+            pending, length = [], 0
+    if pending:
+        yield ''.join(pending)
+
+def streamed_template(template_name, **context):
+    """Renderiza o template enquanto as linhas chegam do banco"""
+    # A sessao e gravada antes do corpo ser enviado: as mensagens flash precisam ser lidas agora
+    get_flashed_messages(with_categories=True)
+    return app.response_class(buffered(stream_template(template_name, **context)))
+
+def streamed_json_list(rows, item_struct):
+    """Resposta JSON no mesmo formato das paginas ({items, next_cursor}) gerada linha a linha"""
+    def generate():
+        yield '{"items":['
+        buffer, first = [], True
+        for row in rows:
+            buffer.append(('' if first else ',') + app.json.dumps(api_struct(item_struct, row)))
+            first = False
+            if len(buffer) >= 100:
+                yield ''.join(buffer)
+                buffer = []
+        yield ''.join(buffer) + '],"next_cursor":null}\n'
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def history_requested():
+    """Historico arquivado incluido na tela de agendamentos com ?history=1"""
+    return request.args.get('history') in ('1', 'true', 'True')
+
+def user_appointments_query(table, archived, cursor=None):
+    """Consulta dos agendamentos do usuario em appointments ou appointments_archive"""
+    where = "AND (a.appointment_date, a.appointment_time, a.id) < (%s, %s, %s)" if cursor else ""
+    return f"""
+        SELECT a.id, a.salon_id, a.hairdresser_id, a.appointment_date, a.appointment_time,
+               a.service_type, a.status, a.notes,
+               s.name as salon_name,
+               h.name as hairdresser_name,
+               {archived} as archived
+        FROM {table} a
+        INNER JOIN salons s ON a.salon_id = s.id
+        INNER JOIN hairdressers h ON a.hairdresser_id = h.id
+        WHERE a.user_id = %s
+        {where}
+    """
+
+def load_user_appointments_page(user_id, after, limit, include_archive=False):
+    """Pagina de agendamentos do usuario, do mais recente para o mais antigo.
+    Com include_archive, junta os agendamentos ja movidos para o arquivo."""
+    cursor = decode_cursor(after, 3)
+    args = [user_id, *(cursor or [])]
+    order_keys = ['appointment_date', 'appointment_time', 'id']
+    if not include_archive:
+        rows, next_cursor = keyset_page(
+            user_appointments_query('appointments', 0, cursor) + " ORDER BY a.appointment_date DESC, a.appointment_time DESC, a.id DESC",
+            args, order_keys, limit
+        )
+    else:
+        # Cada lado traz no maximo uma pagina, lida pelo indice (user_id, data, horario) da sua tabela
+        order = "ORDER BY appointment_date DESC, appointment_time DESC, id DESC"
+        rows, next_cursor = keyset_page(f"""
+            ({user_appointments_query('appointments', 0, cursor)} {order} LIMIT %s)
+            UNION ALL
+            ({user_appointments_query('appointments_archive', 1, cursor)} {order} LIMIT %s)
+            {order}
+        """, [*args, limit + 1, *args, limit + 1], order_keys, limit)
+    for row in rows:
+        row['archived'] = bool(row['archived'])
+    return rows, next_cursor
+
+def json_row(row):
+    """Converte datas e horarios de uma linha do banco para valores serializaveis em JSON"""
+    result = {}
+    for key, value in row.items():
+        if isinstance(value, timedelta):
+            value = format_time(value)
+        elif isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        result[key] = value
+    return result
+
+def cached_salon_options():
+    """Saloes (id, nome, endereco) ordenados por nome, para os campos de selecao"""
+    return reference_cache.get_or_load(
+        'salons:options',
+        lambda: fetch_all("SELECT id, name, address FROM salons ORDER BY name ASC", replica=False)
+    )
+
+# updated_ts (segundos desde 1970, UTC) alimenta o ETag e o Last-Modified; o TIMESTAMP
+# chegaria sem fuso, no time_zone da sessao do MySQL
+SALON_SCHEDULE_SQL = """
+    SELECT opening_day, closing_day, opening_time, closing_time, UNIX_TIMESTAMP(updated_at) AS updated_ts
+    FROM salons
+    WHERE id = %s
+"""
+
+HAIRDRESSERS_BY_SALON_SQL = """
+    SELECT id, name, specialties, UNIX_TIMESTAMP(updated_at) AS updated_ts
+    FROM hairdressers
+    WHERE salon_id = %s
+    ORDER BY name ASC
+"""
+
+# Os caches de referencia sao lidos por todos os workers e so sao invalidados nas escritas:
+# uma replica atrasada gravaria de volta a linha anterior a escrita. Os carregadores usam
+# sempre o primario (a conexao informada tambem precisa ser do primario).
+
+def cached_salon_schedule(salon_id, connection=None):
+    """Horario de funcionamento do salao, ou None se nao existir"""
+    def load():
+        rows = fetch_all(SALON_SCHEDULE_SQL, (salon_id,), connection, replica=False)
+        return rows[0] if rows else None
+    return reference_cache.get_or_load(f'salon_schedule:{salon_id}', load)
+
+def cached_hairdressers_by_salon(salon_id, connection=None):
+    """Cabeleireiros do salao (id, nome, especialidades, updated_ts) ordenados por nome"""
+    return reference_cache.get_or_load(
+        f'hairdressers:{salon_id}',
+        lambda: fetch_all(HAIRDRESSERS_BY_SALON_SQL, (salon_id,), connection, replica=False)
+    )
+
+def invalidate_salon(salon_id=None):
+    """Invalida o cache apos cadastrar, editar ou excluir um salao"""
+    keys = ['salons:options']
+    if salon_id is not None:
+        keys += [f'salon_schedule:{salon_id}', f'hairdressers:{salon_id}']
+    reference_cache.delete(*keys)
+    hairdresser_search_index.invalidate()
+
+def invalidate_hairdressers(*salon_ids):
+    """Invalida a lista de cabeleireiros dos saloes informados"""
+    reference_cache.delete(*[f'hairdressers:{salon_id}' for salon_id in salon_ids if salon_id])
+    hairdresser_search_index.invalidate()
+
+# Busca de cabeleireiros por especialidade
+# sql: filtra pelo bitmask do SET no MySQL | memory: indice invertido em memoria por worker
+HAIRDRESSER_SEARCH_CONFIG = {
+    'backend': os.getenv('HAIRDRESSER_SEARCH_BACKEND', 'memory'),
+    'ttl': float(os.getenv('HAIRDRESSER_SEARCH_TTL', '60'))
+}
+
+# O MySQL guarda o SET como um inteiro com um bit por valor, na ordem da coluna (igual a SPECIALTIES_LIST)
+SPECIALTY_BITS = {name: 1 << n for n, name in enumerate(SPECIALTIES_LIST)}
+
+HAIRDRESSER_SEARCH_SQL = """
+    SELECT h.id, h.name, h.specialties, h.image_url, s.id AS salon_id, s.name AS salon_name,
+           s.address AS salon_address, s.opening_day, s.closing_day
+    FROM hairdressers h
+    INNER JOIN salons s ON h.salon_id = s.id
+"""
+
+# Mesma ordem e chave de cursor da listagem de cabeleireiros, nos dois backends
+HAIRDRESSER_SEARCH_ORDER = HAIRDRESSER_LIST_ORDER
+HAIRDRESSER_SEARCH_KEYS = HAIRDRESSER_LIST_KEYS
+
+def specialties_mask(specialties):
+    """Soma os bits das especialidades informadas"""
+    mask = 0
+    for name in specialties:
+        mask |= SPECIALTY_BITS[name]
+    return mask
+
+def search_result(row):
+    return HairdresserSearchResult(
+        id=row['id'],
+        name=row['name'],
+        specialties=row['specialties'].split(',') if row['specialties'] else [],
+        image_url=row['image_url'],
+        salon=SalonRef(id=row['salon_id'], name=row['salon_name'], address=row['salon_address'])
+    )
+
+def search_hairdressers_sql(specialties, match_all=True, salon_id=None, open_on=None, q=None, limit=PAGE_SIZE, after=None):
+    """Busca no MySQL comparando o bitmask do SET de especialidades; retorna (resultados, proximo cursor)"""
+    mask = specialties_mask(specialties)
+    where = ["h.specialties & %s = %s" if match_all else "h.specialties & %s != 0"]
+    args = [mask, mask] if match_all else [mask]
+    if salon_id:
+        where.append("s.id = %s")
+        args.append(salon_id)
+    if q:
+        where.append("(s.name LIKE %s OR s.address LIKE %s)")
+        args += [f'%{q}%', f'%{q}%']
+    if open_on is not None:
+        # Mesma regra de salon_is_open: ENUM + 0 e a posicao do dia (1=segunda, 7=domingo)
+        # e a faixa pode atravessar o fim de semana
+        where.append("""IF(s.closing_day + 0 >= s.opening_day + 0,
+            %s BETWEEN s.opening_day + 0 AND s.closing_day + 0,
+            %s >= s.opening_day + 0 OR %s <= s.closing_day + 0)""")
+        args += [open_on + 1] * 3
+    cursor = decode_cursor(after, len(HAIRDRESSER_SEARCH_KEYS))
+    if cursor:
+        where.append(HAIRDRESSER_LIST_AFTER)
+        args += cursor
+    rows, next_cursor = keyset_page(f"""
+        {HAIRDRESSER_SEARCH_SQL}
+        WHERE {' AND '.join(where)}
+        {HAIRDRESSER_SEARCH_ORDER}
+    """, args, HAIRDRESSER_SEARCH_KEYS, limit)
+    return [search_result(row) for row in rows], next_cursor
+
+class HairdresserSearchIndex:
+    """Índice invertido em memória dos cabeleireiros.
+
+    Os cabeleireiros ficam em uma lista na ordem da listagem (salão e nome); cada
+    especialidade, salão e dia da semana aponta para um bitmap (int) das
+    posições que o atendem, então os filtros viram operações de bits. O índice
+    é carregado inteiro em uma consulta, descartado pelas rotas que alteram
+    saloes ou cabeleireiros e recarregado após o TTL. Cada worker tem a sua
+    cópia: o descarte vale só para o processo que fez a alteração, os demais
+    veem a mudança quando o TTL expira.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    def _load(self):
+        rows = fetch_all(HAIRDRESSER_SEARCH_SQL + HAIRDRESSER_SEARCH_ORDER, replica=False)
+        specialties = {name: 0 for name in SPECIALTIES_LIST}
+        salons = {}
+        weekdays = [0] * 7
+        for position, row in enumerate(rows):
+            bit = 1 << position
+            for name in (row['specialties'].split(',') if row['specialties'] else []):
+                if name in specialties:
+                    specialties[name] |= bit
+            salons[row['salon_id']] = salons.get(row['salon_id'], 0) | bit
+            opening_day, closing_day = WEEKDAY_TO_NUM[row['opening_day']], WEEKDAY_TO_NUM[row['closing_day']]
+            for weekday in range(7):
+                if salon_is_open(opening_day, closing_day, weekday):
+                    weekdays[weekday] |= bit
+        return {
+            'rows': rows,
+            'positions': {row['id']: position for position, row in enumerate(rows)},
+            'results': [search_result(row) for row in rows],
+            'all': (1 << len(rows)) - 1,
+            'specialties': specialties,
+            'salons': salons,
+            'weekdays': weekdays,
+            'loaded_at': time.monotonic()
+        }
+
+    def _current(self):
+        with self._lock:
+            data = self._data
+        if data is None or time.monotonic() - data['loaded_at'] >= self.ttl:
+            data = self._load()
+            with self._lock:
+                self._data = data
+        return data
+
+    def _after(self, data, cursor):
+        """Posicao da ultima linha da pagina anterior (-1 se o cursor esta antes de todas)"""
+        position = data['positions'].get(cursor[-1])
+        if position is not None and [data['rows'][position][key] for key in HAIRDRESSER_SEARCH_KEYS] == cursor:
+            return position
+        # Cabeleireiro removido ou alterado desde a pagina anterior: ultima linha antes do cursor
+        key = tuple(cursor)
+        position = -1
+        for n, row in enumerate(data['rows']):
+            if tuple(row[k] for k in HAIRDRESSER_SEARCH_KEYS) > key:
+                break
+            position = n
+        return position
+
+    def search(self, specialties, match_all=True, salon_id=None, open_on=None, q=None, limit=PAGE_SIZE, after=None):
+        data = self._current()
+        if match_all:
+            bits = data['all']
+            for name in specialties:
+                bits &= data['specialties'][name]
+        else:
+            bits = 0
+            for name in specialties:
+                bits |= data['specialties'][name]
+        if salon_id:
+            bits &= data['salons'].get(salon_id, 0)
+        if open_on is not None:
+            bits &= data['weekdays'][open_on]
+        cursor = decode_cursor(after, len(HAIRDRESSER_SEARCH_KEYS))
+        if cursor:
+            # Descarta as posicoes ate a ultima linha da pagina anterior
+            bits &= ~((1 << (self._after(data, cursor) + 1)) - 1)
+
+        results = []
+        q = q.lower() if q else None
+        while bits and len(results) <= limit:
+            # Percorre os bits ligados do menor para o maior, mantendo a ordem da lista
+            lowest = bits & -bits
+            bits ^= lowest
+            position = lowest.bit_length() - 1
+            row = data['rows'][position]
+            if q and q not in row['salon_name'].lower() and q not in row['salon_address'].lower():
+                continue
+            results.append(position)
+        if len(results) <= limit:
+            return [data['results'][position] for position in results], None
+        last = data['rows'][results[limit - 1]]
+        return [data['results'][position] for position in results[:limit]], encode_cursor([last[key] for key in HAIRDRESSER_SEARCH_KEYS])
+
+hairdresser_search_index = HairdresserSearchIndex(HAIRDRESSER_SEARCH_CONFIG['ttl'])
+
+def search_hairdressers(*args, **kwargs):
+    """Busca de cabeleireiros pelo backend configurado; retorna (resultados, proximo cursor)"""
+    if HAIRDRESSER_SEARCH_CONFIG['backend'] == 'memory':
+        return hairdresser_search_index.search(*args, **kwargs)
+    return search_hairdressers_sql(*args, **kwargs)
+
+def stream_query(sql, args=None):
+    """Gera as linhas da consulta uma a uma com cursor do lado do servidor, sem carregar tudo na memoria"""
+    with get_db_connection() as connection:
+        cur = connection.cursor(InstrumentedSSCursor)
+        finished = False
+        try:
+            cur.execute(sql, args)
+            yield from cur
+            finished = True
+        finally:
+            if finished:
+                cur.close()
+            else:
+                # Interrompido no meio (ex: cliente desconectou): ler o resto do resultado
+                # seria caro, entao a conexao e fechada e o pool a descarta
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+# Importação e exportação em lote (CSV ou JSONL)
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '1000'))
+BULK_MAX_REPORTED_ERRORS = 100
+
+BULK_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+def iter_records(stream, fmt):
+    """Le registros de um arquivo texto CSV (com cabecalho) ou JSONL; gera (linha, dict)"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_num, record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f'Formato nao suportado: {fmt}')
+
+def _field(record, name, max_length=None, required=False, default=None):
+    # Campo ausente e celula vazia do CSV valem o mesmo: usam o valor padrao
+    value = record.get(name)
+    value = str(value).strip() if value is not None else ''
+    value = value or default
+    if required and not value:
+        raise ValueError(f'campo obrigatorio: {name}')
+    if value and max_length and len(value) > max_length:
+        raise ValueError(f'{name} maior que {max_length} caracteres')
+    return value or None
+
+def _time_field(record, name, default):
+    value = _field(record, name, default=default)
+    try:
+        return datetime.strptime(value[:5], '%H:%M').strftime('%H:%M:%S')
+    except ValueError:
+        raise ValueError(f'{name} invalido: {value}')
+
+def validate_salon_record(record):
+    """Valida um salao do arquivo; retorna a tupla de valores do INSERT"""
+    valid_days = [d[0] for d in WEEKDAYS]
+    opening_day = _field(record, 'opening_day', default='segunda')
+    closing_day = _field(record, 'closing_day', default='sexta')
+    for name, day in (('opening_day', opening_day), ('closing_day', closing_day)):
+        if day not in valid_days:
+            raise ValueError(f'{name} invalido: {day} (use {", ".join(valid_days)})')
+    opening_time = _time_field(record, 'opening_time', '09:00')
+    closing_time = _time_field(record, 'closing_time', '18:00')
+    if closing_time <= opening_time:
+        raise ValueError('closing_time deve ser depois de opening_time')
+    return (
+        _field(record, 'name', 255, required=True),
+        _field(record, 'description', 255),
+        _field(record, 'address', 500, required=True),
+        _field(record, 'phone', 15, required=True),
+        _field(record, 'image_url', 500) or '',
+        opening_day, closing_day, opening_time, closing_time
+    )
+
+def validate_hairdresser_record(record):
+    """Valida um cabeleireiro do arquivo; o salao pode vir por salon_id ou salon_name"""
+    specialties = record.get('specialties') or []
+    if isinstance(specialties, str):
+        specialties = [s.strip() for s in specialties.replace(';', ',').split(',') if s.strip()]
+    elif not isinstance(specialties, list):
+        raise ValueError('specialties deve ser texto ou lista')
+    invalid = [s for s in specialties if s not in SPECIALTIES_LIST]
+    if invalid:
+        raise ValueError(f'especialidade invalida: {", ".join(invalid)}')
+    salon_id = _field(record, 'salon_id')
+    salon_name = _field(record, 'salon_name')
+    if not salon_id and not salon_name:
+        raise ValueError('informe salon_id ou salon_name')
+    if salon_id and not salon_id.isdigit():
+        raise ValueError(f'salon_id invalido: {salon_id}')
+    return {
+        'salon_id': int(salon_id) if salon_id else None,
+        'salon_name': salon_name,
+        'values': [
+            _field(record, 'name', 255, required=True),
+            ','.join(specialties) or None,
+            _field(record, 'phone', 15, required=True),
+            _field(record, 'email', 100, required=True),
+            _field(record, 'image_url', 500),
+            _field(record, 'bio')
+        ]
+    }
+
+def _in_clause(values):
+    return ', '.join(['%s'] * len(values))
+
+def _insert_salon_batch(cur, batch, result):
+    # Mesma regra do cadastro: nome de salao nao pode repetir
+    names = list({values[0] for _, values in batch})
+    cur.execute(f"SELECT name FROM salons WHERE name IN ({_in_clause(names)})", names)
+    existing = {row['name'] for row in cur.fetchall()}
+    rows = []
+    for line_num, values in batch:
+        if values[0] in existing:
+            result.error(line_num, f'ja existe um salao com o nome {values[0]}')
+            continue
+        existing.add(values[0])
+        rows.append(values)
+    if rows:
+        cur.executemany("""
+            INSERT INTO salons (name, description, address, phone, image_url, opening_day, closing_day, opening_time, closing_time)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    return rows
+
+def _insert_hairdresser_batch(cur, batch, result):
+    names = list({item['salon_name'] for _, item in batch if item['salon_name']})
+    ids = list({item['salon_id'] for _, item in batch if item['salon_id']})
+    by_name, known_ids = {}, set()
+    if names:
+        cur.execute(f"SELECT id, name FROM salons WHERE name IN ({_in_clause(names)})", names)
+        by_name = {row['name']: row['id'] for row in cur.fetchall()}
+    if ids:
+        cur.execute(f"SELECT id FROM salons WHERE id IN ({_in_clause(ids)})", ids)
+        known_ids = {row['id'] for row in cur.fetchall()}
+    rows = []
+    for line_num, item in batch:
+        salon_id = item['salon_id'] if item['salon_id'] in known_ids else by_name.get(item['salon_name'])
+        if not salon_id:
+            result.error(line_num, f"salao nao encontrado: {item['salon_id'] or item['salon_name']}")
+            continue
+        values = list(item['values'])
+        values.insert(1, salon_id)
+        rows.append(values)
+    if rows:
+        cur.executemany("""
+            INSERT INTO hairdressers (name, salon_id, specialties, phone, email, image_url, bio)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    return rows
+
+BULK_IMPORTERS = {
+    'salons': (validate_salon_record, _insert_salon_batch),
+    'hairdressers': (validate_hairdresser_record, _insert_hairdresser_batch)
+}
+
+class ImportResult:
+    """Totais da importacao e as primeiras linhas rejeitadas"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def error(self, line_num, message):
+        self.rejected += 1
+        if len(self.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_num, 'error': message})
+
+    def as_dict(self):
+        return {'inserted': self.inserted, 'rejected': self.rejected, 'errors': sorted(self.errors, key=lambda e: e['line'])}
+
+def bulk_import(kind, stream, fmt, batch_size=None):
+    """Valida e insere os registros do arquivo em lotes, com um commit por lote"""
+    validate, insert_batch = BULK_IMPORTERS[kind]
+    batch_size = batch_size or BULK_BATCH_SIZE
+    result = ImportResult()
+    salon_ids = set()
+
+    def flush(cur, connection, batch):
+        rows = insert_batch(cur, batch, result)
+        connection.commit()
+        result.inserted += len(rows)
+        if kind == 'hairdressers':
+            salon_ids.update(row[1] for row in rows)
+
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+            batch = []
+            for line_num, record in iter_records(stream, fmt):
+                if record is None:
+                    result.error(line_num, 'linha invalida')
+                    continue
+                try:
+                    batch.append((line_num, validate(record)))
+                except Exception as e:
+                    # Qualquer falha na validacao recusa so a linha, sem interromper a importacao
+                    result.error(line_num, str(e) if isinstance(e, ValueError) else f'registro invalido: {e}')
+                    continue
+                if len(batch) >= batch_size:
+                    flush(cur, connection, batch)
+                    batch = []
+            if batch:
+                flush(cur, connection, batch)
+    finally:
+        # Os lotes ja confirmados precisam aparecer mesmo se um lote posterior falhar
+        if kind == 'salons':
+            invalidate_salon()
+        else:
+            invalidate_hairdressers(*salon_ids)
+    return result
+
+BULK_EXPORTS = {
+    'salons': """
+        SELECT id, name, description, address, phone, image_url, opening_day, closing_day,
+               opening_time, closing_time, created_at, updated_at
+        FROM salons
+        ORDER BY id
+    """,
+    'hairdressers': """
+        SELECT h.id, h.salon_id, s.name as salon_name, h.name, h.specialties, h.phone, h.email,
+               h.image_url, h.bio, h.created_at, h.updated_at
+        FROM hairdressers h
+        INNER JOIN salons s ON h.salon_id = s.id
+        ORDER BY h.id
+    """,
+    # Exportacao completa: a leitura da tabela inteira e intencional
+    'appointments': """
+        SELECT /* full-scan */ id, user_id, salon_id, hairdresser_id, appointment_date, appointment_time,
+               duration_minutes, service_type, status, notes, created_at, updated_at
+        FROM appointments
+        ORDER BY id
+    """,
+    'appointments_archive': """
+        SELECT /* full-scan */ id, user_id, salon_id, hairdresser_id, appointment_date, appointment_time,
+               duration_minutes, service_type, status, notes, created_at, updated_at, archived_at
+        FROM appointments_archive
+        ORDER BY id
+    """
+}
+
+def bulk_export(kind, fmt):
+    """Gera o conteudo do arquivo de exportacao linha a linha"""
+    rows = (json_row(row) for row in stream_query(BULK_EXPORTS[kind]))
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        # Envia em blocos de ~64KB para nao gerar um pedaco por linha
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def bulk_format(filename, requested=None):
+    """Formato pedido explicitamente ou deduzido pela extensao do arquivo"""
+    fmt = (requested or os.path.splitext(filename or '')[1].lstrip('.')).lower()
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f'Formato nao suportado: {fmt or "?"} (use csv ou jsonl)')
+    return fmt
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(BULK_IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(sorted(BULK_FORMATS)), help='Padrao: extensao do arquivo')
+@click.option('--batch-size', type=int, default=None, help='Registros por transacao')
+def import_command(kind, path, fmt, batch_size):
+    """Importa saloes ou cabeleireiros de um arquivo CSV ou JSONL"""
+    fmt = bulk_format(path, fmt)
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = bulk_import(kind, stream, fmt, batch_size)
+    click.echo(json.dumps(result.as_dict(), ensure_ascii=False, indent=2))
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(BULK_EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(BULK_FORMATS)), default='csv')
+@click.option('--output', type=click.Path(dir_okay=False), default='-', help='Padrao: saida padrao')
+def export_command(kind, fmt, output):
+    """Exporta saloes, cabeleireiros ou agendamentos em CSV ou JSONL"""
+    with click.open_file(output, 'w', encoding='utf-8') as out:
+        for chunk in bulk_export(kind, fmt):
+            out.write(chunk)
+
+# FILA DE TAREFAS EM SEGUNDO PLANO
+# As rotas gravam a tarefa na tabela jobs dentro da propria transacao e o
+# processo "flask --app main jobs worker" executa depois, com novas tentativas
+JOB_QUEUE_CONFIG = {
+    'poll_interval': float(os.getenv('JOB_POLL_INTERVAL', '2')),
+    'maintenance_interval': float(os.getenv('JOB_MAINTENANCE_INTERVAL', '60')),
+    'batch_size': int(os.getenv('JOB_BATCH_SIZE', '10')),
+    'max_attempts': int(os.getenv('JOB_MAX_ATTEMPTS', '5')),
+    'backoff_base': float(os.getenv('JOB_BACKOFF_BASE', '10')),
+    'backoff_max': float(os.getenv('JOB_BACKOFF_MAX', '3600')),
+    'lock_timeout': int(os.getenv('JOB_LOCK_TIMEOUT', '600')),
+    'retention_days': int(os.getenv('JOB_RETENTION_DAYS', '7')),
+    'archive_after_days': int(os.getenv('ARCHIVE_APPOINTMENTS_AFTER_DAYS', '90')),
+    'maintenance_batch_size': int(os.getenv('JOB_MAINTENANCE_BATCH_SIZE', '1000'))
+}
+
+jobs_logger = logging.getLogger('vi_beauty.jobs')
+if not jobs_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    jobs_logger.addHandler(_handler)
+    jobs_logger.setLevel(logging.INFO)
+    jobs_logger.propagate = False
+
+# Funcoes executadas pelo worker, por nome da tarefa
+JOB_HANDLERS = {}
+
+def job_handler(name):
+    """Registra a funcao que executa as tarefas com este nome"""
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+def enqueue_job(cur, name, payload=None, delay=0, unique_key=None, max_attempts=None):
+    """Grava uma tarefa usando o cursor de quem chama, sem commit: a tarefa so
+    existe se a transacao da rota for confirmada. Com unique_key, uma tarefa
+    ja gravada com a mesma chave nao e duplicada."""
+    if name not in JOB_HANDLERS:
+        raise ValueError(f'Tarefa desconhecida: {name}')
+    cur.execute("""
+        INSERT INTO jobs (name, payload, max_attempts, run_at, unique_key)
+        VALUES (%s, %s, %s, UTC_TIMESTAMP() + INTERVAL %s SECOND, %s)
+        ON DUPLICATE KEY UPDATE id = id
+    """, (name, json.dumps(payload or {}, default=str), max_attempts or JOB_QUEUE_CONFIG['max_attempts'], int(delay), unique_key))
+
+def claim_jobs(connection, worker_id, limit):
+    """Reserva tarefas vencidas; SKIP LOCKED deixa varios workers dividirem a fila"""
+    cur = connection.cursor()
+    cur.execute("""
+        SELECT id, name, payload, attempts, max_attempts
+        FROM jobs
+        WHERE status = 'pending' AND run_at <= UTC_TIMESTAMP()
+        ORDER BY run_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (limit,))
+    jobs = cur.fetchall()
+    if jobs:
+        cur.execute(f"""
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, locked_by = %s, locked_at = UTC_TIMESTAMP()
+            WHERE id IN ({_in_clause(jobs)})
+        """, [worker_id] + [job['id'] for job in jobs])
+    connection.commit()
+    for job in jobs:
+        job['attempts'] += 1
+    return jobs
+
+def job_retry_delay(attempts):
+    """Espera exponencial entre tentativas, com variacao aleatoria para espalhar os workers"""
+    delay = min(JOB_QUEUE_CONFIG['backoff_base'] * 2 ** (attempts - 1), JOB_QUEUE_CONFIG['backoff_max'])
+    return int(delay * random.uniform(0.5, 1.0))
+
+def run_job(job):
+    """Executa uma tarefa reservada e grava o resultado (concluida, nova tentativa ou falha)"""
+    started = time.perf_counter()
+    error = None
+    try:
+        payload = job['payload']
+        JOB_HANDLERS[job['name']](**(json.loads(payload) if isinstance(payload, (str, bytes)) else payload or {}))
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+
+    if error is None:
+        sql, args, outcome = "UPDATE jobs SET status = 'done', locked_by = NULL, last_error = NULL WHERE id = %s", (job['id'],), 'done'
+    elif job['attempts'] < job['max_attempts']:
+        sql = """
+            UPDATE jobs
+            SET status = 'pending', locked_by = NULL, last_error = %s, run_at = UTC_TIMESTAMP() + INTERVAL %s SECOND
+            WHERE id = %s
+        """
+        args, outcome = (error, job_retry_delay(job['attempts']), job['id']), 'retry'
+    else:
+        sql, args, outcome = "UPDATE jobs SET status = 'failed', locked_by = NULL, last_error = %s WHERE id = %s", (error, job['id']), 'failed'
+
+    with get_db_connection() as connection:
+        cur = connection.cursor()
+        cur.execute(sql, args)
+        connection.commit()
+
+    log = jobs_logger.info if error is None else jobs_logger.warning
+    log(json.dumps({
+        'event': 'job',
+        'id': job['id'],
+        'name': job['name'],
+        'outcome': outcome,
+        'attempt': job['attempts'],
+        'ms': round((time.perf_counter() - started) * 1000, 2),
+        'error': error
+    }, ensure_ascii=False))
+    return outcome
+
+def requeue_stale_jobs(connection):
+    """Devolve para a fila as tarefas de workers que pararam no meio da execucao"""
+    cur = connection.cursor()
+    cur.execute("""
+        UPDATE jobs
+        SET status = IF(attempts < max_attempts, 'pending', 'failed'), locked_by = NULL,
+            last_error = 'Worker interrompido durante a execucao'
+        WHERE status = 'running' AND locked_at < UTC_TIMESTAMP() - INTERVAL %s SECOND
+    """, (JOB_QUEUE_CONFIG['lock_timeout'],))
+    connection.commit()
+    return cur.rowcount
+
+# Tarefas periodicas: nome -> intervalo em segundos
+SCHEDULED_JOBS = {
+    'complete_past_appointments': int(os.getenv('JOB_COMPLETE_APPOINTMENTS_INTERVAL', '3600')),
+    'purge_expired_sessions': int(os.getenv('JOB_PURGE_SESSIONS_INTERVAL', '3600')),
+    'purge_finished_jobs': int(os.getenv('JOB_PURGE_JOBS_INTERVAL', '86400')),
+    'archive_appointments': int(os.getenv('JOB_ARCHIVE_APPOINTMENTS_INTERVAL', '86400'))
+}
+
+def schedule_periodic_jobs(connection):
+    """Grava a execucao do intervalo atual de cada tarefa periodica. A chave unica
+    por intervalo faz com que varios workers agendem cada execucao uma so vez."""
+    now = int(time.time())
+    cur = connection.cursor()
+    for name, interval in SCHEDULED_JOBS.items():
+        if interval > 0:
+            enqueue_job(cur, name, unique_key=f'{name}:{now // interval}', max_attempts=1)
+    connection.commit()
+
+@job_handler('appointment_event')
+def appointment_event_job(appointment_id, event):
+    """Notificacao e registro de auditoria de um agendamento criado, alterado ou cancelado"""
+    with get_db_connection() as connection:
+        cur = connection.cursor()
+        cur.execute("""
+            SELECT a.id, a.user_id, a.appointment_date, a.appointment_time, a.duration_minutes, a.service_type, a.status,
+                   u.email AS user_email, s.name AS salon_name, h.name AS hairdresser_name
+            FROM appointments a
+            INNER JOIN users_data u ON a.user_id = u.id
+            INNER JOIN salons s ON a.salon_id = s.id
+            INNER JOIN hairdressers h ON a.hairdresser_id = h.id
+            WHERE a.id = %s
+        """, (appointment_id,))
+        appointment = cur.fetchone()
+    if not appointment:
+        # Excluido antes de a tarefa rodar
+        return
+    # Ainda nao ha envio de e-mail: a notificacao fica registrada no log
+    jobs_logger.info(json.dumps({
+        'event': 'appointment_notification',
+        'type': event,
+        'appointment_id': appointment['id'],
+        'to': appointment['user_email'],
+        'salon': appointment['salon_name'],
+        'hairdresser': appointment['hairdresser_name'],
+        'service_type': appointment['service_type'],
+        'date': appointment['appointment_date'].isoformat(),
+        'time': format_time(appointment['appointment_time']),
+        'duration_minutes': appointment['duration_minutes'],
+        'status': appointment['status']
+    }, ensure_ascii=False))
+
+@job_handler('complete_past_appointments')
+def complete_past_appointments_job():
+    """Marca como concluidos os agendamentos ativos de dias anteriores a hoje"""
+    batch_size = JOB_QUEUE_CONFIG['maintenance_batch_size']
+    total = 0
+    with get_db_connection() as connection:
+        cur = connection.cursor()
+        # Em lotes para nao segurar locks de muitas linhas de uma vez
+        while True:
+            cur.execute("""
+                UPDATE appointments
+                SET status = 'completed'
+                WHERE status IN ('pending', 'confirmed') AND appointment_date < CURDATE()
+                LIMIT %s
+            """, (batch_size,))
+            connection.commit()
+            total += cur.rowcount
+            if cur.rowcount < batch_size:
+                break
+    jobs_logger.info(json.dumps({'event': 'appointments_completed', 'count': total}))
+
+# Colunas copiadas para appointments_archive (o id original e mantido)
+ARCHIVED_APPOINTMENT_COLUMNS = """
+    id, user_id, salon_id, hairdresser_id, appointment_date, appointment_time,
+    duration_minutes, service_type, status, notes, created_at, updated_at
+"""
+
+@job_handler('archive_appointments')
+def archive_appointments_job():
+    """Move para appointments_archive os agendamentos concluidos ou cancelados
+    com mais de ARCHIVE_APPOINTMENTS_AFTER_DAYS dias, um lote por transacao"""
+    batch_size = JOB_QUEUE_CONFIG['maintenance_batch_size']
+    total = 0
+    with get_db_connection() as connection:
+        cur = connection.cursor()
+        while True:
+            cur.execute("""
+                SELECT id
+                FROM appointments
+                WHERE status IN ('cancelled', 'completed')
+                AND appointment_date < CURDATE() - INTERVAL %s DAY
+                LIMIT %s
+                FOR UPDATE
+            """, (JOB_QUEUE_CONFIG['archive_after_days'], batch_size))
+            ids = [row['id'] for row in cur.fetchall()]
+            if ids:
+                cur.execute(f"""
+                    INSERT INTO appointments_archive ({ARCHIVED_APPOINTMENT_COLUMNS})
+                    SELECT {ARCHIVED_APPOINTMENT_COLUMNS}
+                    FROM appointments
+                    WHERE id IN ({_in_clause(ids)})
+                """, ids)
+                cur.execute(f"DELETE FROM appointments WHERE id IN ({_in_clause(ids)})", ids)
+            connection.commit()
+            total += len(ids)
+            if len(ids) < batch_size:
+                break
+    jobs_logger.info(json.dumps({'event': 'appointments_archived', 'count': total}))
+
+@job_handler('purge_expired_sessions')
+def purge_expired_sessions_job():
+    """Remove as sessoes expiradas do backend mysql ou filesystem (redis expira sozinho)"""
+    interface = app.session_interface
+    if isinstance(interface, MySQLSessionInterface):
+        interface._delete_expired_sessions()
+    elif isinstance(getattr(interface, 'cache', None), FileSystemCache):
+        # O cachelib nao tem metodo publico que remova so os arquivos vencidos; a versao fica
+        # fixa em requirements.txt e tests/test_session_purge.py falha se o metodo mudar
+        remove_expired = getattr(interface.cache, '_remove_expired', None)
+        if remove_expired is None:
+            raise RuntimeError('cachelib sem FileSystemCache._remove_expired: revise purge_expired_sessions')
+        remove_expired(time.time())
+
+@job_handler('purge_finished_jobs')
+def purge_finished_jobs_job():
+    """Apaga as tarefas concluidas ou com falha mais antigas que JOB_RETENTION_DAYS"""
+    batch_size = JOB_QUEUE_CONFIG['maintenance_batch_size']
+    with get_db_connection() as connection:
+        cur = connection.cursor()
+        while True:
+            cur.execute("""
+                DELETE FROM jobs
+                WHERE status IN ('done', 'failed') AND updated_at < NOW() - INTERVAL %s DAY
+                LIMIT %s
+            """, (JOB_QUEUE_CONFIG['retention_days'], batch_size))
+            connection.commit()
+            if cur.rowcount < batch_size:
+                break
+
+def work_jobs(worker_id, once=False, stop=None):
+    """Loop do worker: agenda as tarefas periodicas, recupera tarefas presas e
+    executa as vencidas. Com once=True processa o que estiver vencido e termina."""
+    stop = stop or threading.Event()
+    processed = 0
+    last_maintenance = None
+    while not stop.is_set():
+        try:
+            if last_maintenance is None or time.monotonic() - last_maintenance >= JOB_QUEUE_CONFIG['maintenance_interval']:
+                with get_db_connection() as connection:
+                    requeue_stale_jobs(connection)
+                    schedule_periodic_jobs(connection)
+                last_maintenance = time.monotonic()
+            with get_db_connection() as connection:
+                jobs = claim_jobs(connection, worker_id, JOB_QUEUE_CONFIG['batch_size'])
+            for job in jobs:
+                run_job(job)
+                processed += 1
+        except Exception as e:
+            jobs = []
+            jobs_logger.error(json.dumps({'event': 'job_worker_error', 'worker': worker_id, 'error': str(e)}, ensure_ascii=False))
+        if once and not jobs:
+            break
+        if not jobs:
+            stop.wait(JOB_QUEUE_CONFIG['poll_interval'])
+    return processed
+
+jobs_cli = AppGroup('jobs', help='Fila de tarefas em segundo plano')
+
+@jobs_cli.command('worker')
+@click.option('--once', is_flag=True, help='Processa as tarefas vencidas e termina')
+def jobs_worker_command(once):
+    """Executa as tarefas da fila ate receber SIGTERM ou Ctrl+C"""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # A tarefa em andamento termina antes de o worker sair
+        signal.signal(sig, lambda *args: stop.set())
+    jobs_logger.info(json.dumps({'event': 'job_worker_started', 'worker': worker_id, 'once': once}))
+    processed = work_jobs(worker_id, once=once, stop=stop)
+    jobs_logger.info(json.dumps({'event': 'job_worker_stopped', 'worker': worker_id, 'processed': processed}))
+
+@jobs_cli.command('enqueue')
+@click.argument('name', type=click.Choice(sorted(JOB_HANDLERS)))
+@click.option('--payload', default='{}', help='Argumentos da tarefa em JSON')
+def jobs_enqueue_command(name, payload):
+    """Coloca uma tarefa na fila para execucao imediata"""
+    with get_db_connection() as connection:
+        enqueue_job(connection.cursor(), name, json.loads(payload))
+        connection.commit()
+    click.echo(f'Tarefa {name} enfileirada')
+
+app.cli.add_command(jobs_cli)
+
+# ROTAS WEB FRONTEND
+@app.route('/')
+def index():
+    if 'user_id' in session:
+        return redirect(url_for('profile'))
+    return redirect(url_for('login'))
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form['email']
+        password = request.form['password']
+        
+        try:
+            # Busca usuário por email; a conexão volta ao pool antes do bcrypt
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+                cur.execute("SELECT id, name, email, password FROM users_data WHERE email = %s", (email,))
+                user = cur.fetchone()
+            
+            if user and check_password(password, user['password']):
+                if password_needs_rehash(user['password']):
+                    # Regrava a senha com o custo atual; falhas aqui não impedem o login
+                    try:
+                        new_hash = hash_password(password)
+                        with get_db_connection() as connection:
+                            cur = connection.cursor()
+                            cur.execute(
+                                "UPDATE users_data SET password = %s WHERE id = %s AND password = %s",
+                                (new_hash, user['id'], user['password'])
+                            )
+                            connection.commit()
+                    except Exception as e:
+                        app.logger.warning('Falha ao atualizar hash da senha do usuario %s: %s', user['id'], e)
+                
+                session['user_id'] = user['id']
+                session['user_name'] = user['name']
+                session['user_email'] = user['email']
+                flash('Login realizado com sucesso!', 'success')
+                return redirect(url_for('profile'))
+            else:
+                flash('Email ou senha incorretos!', 'error')
+                
+        except Exception as e:
+            flash(f'Erro no sistema: {str(e)}', 'error')
+    
+    return render_template('login.html')
+
+@app.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        name = request.form['name']
+        email = request.form['email']
+        cpf = request.form['cpf']
+        password = request.form['password']
+        gender = request.form['gender']
+        phone = request.form['phone']
+        
+        try:
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+            
+                # Verifica se email já existe
+                cur.execute("SELECT id FROM users_data WHERE email = %s", (email,))
+                if cur.fetchone():
+                    flash('Este email já está cadastrado!', 'error')
+                    return render_template('register.html')
+            
+                # Verifica se CPF já existe
+                cur.execute("SELECT id FROM users_data WHERE cpf = %s", (cpf,))
+                if cur.fetchone():
+                    flash('Este CPF já está cadastrado!', 'error')
+                    return render_template('register.html')
+            
+            # Hash da senha sem segurar uma conexão do pool; os índices únicos de email e CPF
+            # continuam barrando um cadastro igual feito nesse intervalo
+            hashed_password = hash_password(password)
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+                cur.execute(
+                    "INSERT INTO users_data (name, email, cpf, password, gender, phone) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (name, email, cpf, hashed_password, gender, phone)
+                )
+                connection.commit()
+            
+                flash('Cadastro realizado com sucesso! Faça login para continuar.', 'success')
+                return redirect(url_for('login'))
+            
+        except pymysql.IntegrityError as e:
+            # Cadastro igual gravado enquanto o hash era calculado
+            if e.args[0] == ER.DUP_ENTRY:
+                flash('Este email ou CPF já está cadastrado!', 'error')
+            else:
+                flash(f'Erro ao cadastrar: {str(e)}', 'error')
+        except Exception as e:
+            flash(f'Erro ao cadastrar: {str(e)}', 'error')
+    
+    return render_template('register.html')
+
+@app.route('/profile')
+@login_required
+@read_replica
+def profile():
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Busca dados completos do usuário
+            cur.execute("SELECT * FROM users_data WHERE id = %s", (session['user_id'],))
+            user = cur.fetchone()
+        
+            return render_template('profile.html', user=user)
+        
+    except Exception as e:
+        flash(f'Erro ao carregar perfil: {str(e)}', 'error')
+        return redirect(url_for('login'))
+
+@app.route('/update_profile', methods=['POST'])
+@login_required
+def update_profile():
+    name = request.form['name']
+    email = request.form['email']
+    phone = request.form['phone']
+    
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o email já existe para outro usuário
+            cur.execute("SELECT id FROM users_data WHERE email = %s AND id != %s", (email, session['user_id']))
+            if cur.fetchone():
+                flash('Este email já está em uso por outro usuário!', 'error')
+                return redirect(url_for('profile'))
+        
+            # Atualiza os dados
+            cur.execute(
+                "UPDATE users_data SET name = %s, email = %s, phone = %s WHERE id = %s",
+                (name, email, phone, session['user_id'])
+            )
+            connection.commit()
+        
+            # Atualiza a sessão
+            session['user_name'] = name
+            session['user_email'] = email
+        
+            flash('Perfil atualizado com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao atualizar perfil: {str(e)}', 'error')
+    
+    return redirect(url_for('profile'))
+
+@app.route('/register_salon', methods=['GET', 'POST'])
+@admin_required
+def register_salon():
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        address = request.form.get('address', '').strip()
+        phone = request.form.get('phone', '').strip()
+        image_url = request.form.get('image_url', '').strip()
+        opening_day = request.form.get('opening_day', 'segunda').strip()
+        closing_day = request.form.get('closing_day', 'sexta').strip()
+        opening_time = request.form.get('opening_time', '09:00').strip()
+        closing_time = request.form.get('closing_time', '18:00').strip()
+        
+        # Valida os dias da semana
+        valid_days = [d[0] for d in WEEKDAYS]
+        if opening_day not in valid_days:
+            opening_day = 'segunda'
+        if closing_day not in valid_days:
+            closing_day = 'sexta'
+        
+        try:
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+            
+                # Verifica se ja existe um salao com o mesmo nome
+                cur.execute("SELECT id FROM salons WHERE name = %s", (name,))
+                if cur.fetchone():
+                    flash('Ja existe um salao cadastrado com este nome!', 'error')
+                    return render_template('register_salon.html', weekdays=WEEKDAYS)
+            
+                # Insere o novo salao
+                cur.execute(
+                    "INSERT INTO salons (name, description, address, phone, image_url, opening_day, closing_day, opening_time, closing_time) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    (name, description if description else None, address, phone, image_url, opening_day, closing_day, opening_time, closing_time)
+                )
+                connection.commit()
+                invalidate_salon()
+            
+                flash('Salao cadastrado com sucesso!', 'success')
+                return redirect(url_for('register_salon'))
+            
+        except Exception as e:
+            flash(f'Erro ao cadastrar salao: {str(e)}', 'error')
+    
+    return render_template('register_salon.html', weekdays=WEEKDAYS)
+
+@app.route('/list_salons')
+@admin_required
+@read_replica
+def list_salons():
+    try:
+        if streaming_requested():
+            # Lista inteira, lida do banco enquanto a pagina e enviada
+            salons = peek_rows(stream_query(*salons_list_query()))
+            return streamed_template('list_salons.html', salons=salons, next_cursor=None, is_first_page=True, streaming=True)
+        
+        # Busca uma pagina de salões ordenados por nome
+        salons, next_cursor = load_salons_page(request.args.get('after'), page_size_arg())
+        
+        return render_template('list_salons.html', salons=salons, next_cursor=next_cursor, is_first_page=not request.args.get('after'))
+        
+    except Exception as e:
+        flash(f'Erro ao carregar salões: {str(e)}', 'error')
+        return redirect(url_for('profile'))
+
+@app.route('/edit_salon/<int:salon_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_salon(salon_id):
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        address = request.form.get('address', '').strip()
+        phone = request.form.get('phone', '').strip()
+        image_url = request.form.get('image_url', '').strip()
+        opening_day = request.form.get('opening_day', 'segunda').strip()
+        closing_day = request.form.get('closing_day', 'sexta').strip()
+        opening_time = request.form.get('opening_time', '09:00').strip()
+        closing_time = request.form.get('closing_time', '18:00').strip()
+        
+        # Valida os dias da semana
+        valid_days = [d[0] for d in WEEKDAYS]
+        if opening_day not in valid_days:
+            opening_day = 'segunda'
+        if closing_day not in valid_days:
+            closing_day = 'sexta'
+        
+        try:
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+            
+                # Verifica se ja existe outro salao com o mesmo nome
+                cur.execute("SELECT id FROM salons WHERE name = %s AND id != %s", (name, salon_id))
+                if cur.fetchone():
+                    flash('Ja existe outro salao cadastrado com este nome!', 'error')
+                    return redirect(url_for('edit_salon', salon_id=salon_id))
+            
+                # Atualiza os dados do salao
+                cur.execute(
+                    "UPDATE salons SET name = %s, description = %s, address = %s, phone = %s, image_url = %s, opening_day = %s, closing_day = %s, opening_time = %s, closing_time = %s WHERE id = %s",
+                    (name, description if description else None, address, phone, image_url, opening_day, closing_day, opening_time, closing_time, salon_id)
+                )
+                connection.commit()
+                availability_index.invalidate_schedules()
+                invalidate_salon(salon_id)
+            
+                flash('Salao atualizado com sucesso!', 'success')
+                return redirect(url_for('list_salons'))
+            
+        except Exception as e:
+            flash(f'Erro ao atualizar salao: {str(e)}', 'error')
+    
+    # GET - Busca os dados do salao para edicao
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            cur.execute("SELECT * FROM salons WHERE id = %s", (salon_id,))
+            salon = cur.fetchone()
+        
+            if not salon:
+                flash('Salao nao encontrado!', 'error')
+                return redirect(url_for('list_salons'))
+        
+            return render_template('edit_salon.html', salon=salon, weekdays=WEEKDAYS)
+        
+    except Exception as e:
+        flash(f'Erro ao carregar dados do salao: {str(e)}', 'error')
+        return redirect(url_for('list_salons'))
+
+@app.route('/delete_salon/<int:salon_id>', methods=['POST'])
+@admin_required
+def delete_salon(salon_id):
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o salão existe
+            cur.execute("SELECT name FROM salons WHERE id = %s", (salon_id,))
+            salon = cur.fetchone()
+        
+            if not salon:
+                flash('Salão não encontrado!', 'error')
+                return redirect(url_for('list_salons'))
+        
+            # Deleta o salão
+            cur.execute("DELETE FROM salons WHERE id = %s", (salon_id,))
+            connection.commit()
+            availability_index.clear()
+            invalidate_salon(salon_id)
+        
+            flash(f'Salão "{salon["name"]}" excluído com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao excluir salão: {str(e)}', 'error')
+    
+    return redirect(url_for('list_salons'))
+
+@app.route('/register_hairdresser', methods=['GET', 'POST'])
+@admin_required
+def register_hairdresser():
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        salon_id = request.form.get('salon_id', '').strip()
+        # Pega as especialidades selecionadas como lista
+        specialties_list = request.form.getlist('specialties')
+        # Filtra apenas valores validos e junta com virgula para o SET do MySQL
+        specialties = ','.join([s for s in specialties_list if s in SPECIALTIES_LIST]) if specialties_list else None
+        phone = request.form.get('phone', '').strip()
+        email = request.form.get('email', '').strip()
+        image_url = request.form.get('image_url', '').strip()
+        bio = request.form.get('bio', '').strip()
+        
+        # Validacao de campos obrigatorios
+        if not salon_id:
+            flash('E obrigatorio selecionar um salao!', 'error')
+            try:
+                salons = cached_salon_options()
+                return render_template('register_hairdresser.html', salons=salons, specialties_list=SPECIALTIES_LIST)
+            except Exception as e:
+                flash(f'Erro ao carregar saloes: {str(e)}', 'error')
+                return redirect(url_for('list_salons'))
+        
+        try:
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+            
+                # Insere o novo cabeleireiro
+                cur.execute(
+                    "INSERT INTO hairdressers (name, salon_id, specialties, phone, email, image_url, bio) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (name, salon_id, specialties, phone, email, image_url if image_url else None, bio if bio else None)
+                )
+                connection.commit()
+                invalidate_hairdressers(salon_id)
+            
+                flash('Cabeleireiro cadastrado com sucesso!', 'success')
+                return redirect(url_for('register_hairdresser'))
+            
+        except Exception as e:
+            flash(f'Erro ao cadastrar cabeleireiro: {str(e)}', 'error')
+    
+    # GET - Busca os saloes para o formulario
+    try:
+        salons = cached_salon_options()
+        
+        if not salons:
+            flash('E necessario cadastrar pelo menos um salao antes de cadastrar cabeleireiros!', 'error')
+            return redirect(url_for('register_salon'))
+        
+        return render_template('register_hairdresser.html', salons=salons, specialties_list=SPECIALTIES_LIST)
+    except Exception as e:
+        flash(f'Erro ao carregar saloes: {str(e)}', 'error')
+        return redirect(url_for('list_salons'))
+
+@app.route('/list_hairdressers')
+@admin_required
+@read_replica
+def list_hairdressers():
+    try:
+        if streaming_requested():
+            # Lista inteira, lida do banco enquanto a pagina e enviada
+            hairdressers = peek_rows(stream_query(*hairdressers_list_query()))
+            return streamed_template('list_hairdressers.html', hairdressers=hairdressers, next_cursor=None, is_first_page=True, streaming=True)
+        
+        # Busca uma pagina de cabeleireiros com informações do salão
+        hairdressers, next_cursor = load_hairdressers_page(request.args.get('after'), page_size_arg())
+        
+        return render_template('list_hairdressers.html', hairdressers=hairdressers, next_cursor=next_cursor, is_first_page=not request.args.get('after'))
+        
+    except Exception as e:
+        flash(f'Erro ao carregar cabeleireiros: {str(e)}', 'error')
+        return redirect(url_for('profile'))
+
+@app.route('/edit_hairdresser/<int:hairdresser_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_hairdresser(hairdresser_id):
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        salon_id = request.form.get('salon_id', '').strip()
+        # Pega as especialidades selecionadas como lista
+        specialties_list = request.form.getlist('specialties')
+        # Filtra apenas valores validos e junta com virgula para o SET do MySQL
+        specialties = ','.join([s for s in specialties_list if s in SPECIALTIES_LIST]) if specialties_list else None
+        phone = request.form.get('phone', '').strip()
+        email = request.form.get('email', '').strip()
+        image_url = request.form.get('image_url', '').strip()
+        bio = request.form.get('bio', '').strip()
+        
+        # Validacao de campos obrigatorios
+        if not salon_id:
+            flash('E obrigatorio selecionar um salao!', 'error')
+            return redirect(url_for('edit_hairdresser', hairdresser_id=hairdresser_id))
+        
+        try:
+            with get_db_connection() as connection:
+                cur = connection.cursor()
+            
+                # Guarda o salao atual para invalidar a lista dele no cache
+                cur.execute("SELECT salon_id FROM hairdressers WHERE id = %s", (hairdresser_id,))
+                previous = cur.fetchone()
+            
+                # Atualiza os dados do cabeleireiro
+                cur.execute(
+                    "UPDATE hairdressers SET name = %s, salon_id = %s, specialties = %s, phone = %s, email = %s, image_url = %s, bio = %s WHERE id = %s",
+                    (name, salon_id, specialties, phone, email, image_url if image_url else None, bio if bio else None, hairdresser_id)
+                )
+                connection.commit()
+                availability_index.invalidate_hairdresser(hairdresser_id)
+                invalidate_hairdressers(salon_id, previous['salon_id'] if previous else None)
+            
+                flash('Cabeleireiro atualizado com sucesso!', 'success')
+                return redirect(url_for('list_hairdressers'))
+            
+        except Exception as e:
+            flash(f'Erro ao atualizar cabeleireiro: {str(e)}', 'error')
+    
+    # GET - Busca os dados do cabeleireiro e os saloes para edicao
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            cur.execute("SELECT * FROM hairdressers WHERE id = %s", (hairdresser_id,))
+            hairdresser = cur.fetchone()
+        
+            if not hairdresser:
+                flash('Cabeleireiro nao encontrado!', 'error')
+                return redirect(url_for('list_hairdressers'))
+        
+            # Converte as especialidades do cabeleireiro para lista para marcar os checkboxes
+            hairdresser_specialties = hairdresser['specialties'].split(',') if hairdresser['specialties'] else []
+        
+        salons = cached_salon_options()
+        
+        return render_template('edit_hairdresser.html', hairdresser=hairdresser, salons=salons, specialties_list=SPECIALTIES_LIST, hairdresser_specialties=hairdresser_specialties)
+        
+    except Exception as e:
+        flash(f'Erro ao carregar dados do cabeleireiro: {str(e)}', 'error')
+        return redirect(url_for('list_hairdressers'))
+
+@app.route('/delete_hairdresser/<int:hairdresser_id>', methods=['POST'])
+@admin_required
+def delete_hairdresser(hairdresser_id):
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o cabeleireiro existe
+            cur.execute("SELECT name, salon_id FROM hairdressers WHERE id = %s", (hairdresser_id,))
+            hairdresser = cur.fetchone()
+        
+            if not hairdresser:
+                flash('Cabeleireiro não encontrado!', 'error')
+                return redirect(url_for('list_hairdressers'))
+        
+            # Deleta o cabeleireiro
+            cur.execute("DELETE FROM hairdressers WHERE id = %s", (hairdresser_id,))
+            connection.commit()
+            availability_index.invalidate_hairdresser(hairdresser_id)
+            invalidate_hairdressers(hairdresser['salon_id'])
+        
+            flash(f'Cabeleireiro "{hairdresser["name"]}" excluído com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao excluir cabeleireiro: {str(e)}', 'error')
+    
+    return redirect(url_for('list_hairdressers'))
+
+@app.route('/appointments')
+@login_required
+@read_replica
+def appointments():
+    try:
+        # Busca uma pagina de agendamentos do usuário com informações do salão e cabeleireiro
+        include_archive = history_requested()
+        user_appointments, next_cursor = load_user_appointments_page(session['user_id'], request.args.get('after'), page_size_arg(), include_archive)
+        
+        # Busca todos os salões para o formulário
+        salons = cached_salon_options()
+        
+        # Obtém a data atual para validação no frontend
+        today = date.today().isoformat()
+        
+        return render_template('appointments.html', appointments=user_appointments, salons=salons, today=today, next_cursor=next_cursor, is_first_page=not request.args.get('after'), include_archive=include_archive)
+        
+    except Exception as e:
+        flash(f'Erro ao carregar agendamentos: {str(e)}', 'error')
+        return redirect(url_for('profile'))
+
+@app.route('/api/hairdressers_by_salon/<int:salon_id>')
+@login_required
+@read_replica
+def get_hairdressers_by_salon(salon_id):
+    try:
+        # Busca cabeleireiros do salao
+        hairdressers = cached_hairdressers_by_salon(salon_id)
+        return hairdressers_by_salon_response(request, salon_id, hairdressers)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def hairdressers_by_salon_response(req, salon_id, hairdressers):
+    """Resposta de /api/hairdressers_by_salon, compartilhada com o modo ASGI"""
+    # A versao da lista muda quando algum cabeleireiro e alterado, incluido ou removido
+    updated_ts = max((h['updated_ts'] for h in hairdressers if h.get('updated_ts') is not None), default=None)
+    last_modified = timestamp_to_utc(updated_ts)
+    etag = f"hairdressers-{salon_id}-{len(hairdressers)}-{int(updated_ts or 0)}"
+    
+    return conditional_response(req, etag, last_modified, lambda: [api_struct(HairdresserOption, h) for h in hairdressers])
+
+@app.route('/api/salon_schedule/<int:salon_id>')
+@login_required
+@read_replica
+def get_salon_schedule(salon_id):
+    """Retorna informacoes de horario de funcionamento do salao"""
+    try:
+        salon = cached_salon_schedule(salon_id)
+        
+        if not salon:
+            return jsonify({'error': 'Salao nao encontrado'}), 404
+        
+        return salon_schedule_response(request, salon_id, salon)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def salon_schedule_response(req, salon_id, salon):
+    """Resposta de /api/salon_schedule, compartilhada com o modo ASGI"""
+    # A versao do horario acompanha o updated_at do salao
+    updated_ts = salon.get('updated_ts')
+    last_modified = timestamp_to_utc(updated_ts)
+    etag = f"salon-schedule-{salon_id}-{int(updated_ts or 0)}"
+    return conditional_response(req, etag, last_modified, lambda: salon_schedule_struct(salon))
+
+def salon_schedule_struct(salon):
+    """Horario de funcionamento do salao no formato da API"""
+    return SalonSchedule(
+        opening_day=salon['opening_day'],
+        closing_day=salon['closing_day'],
+        opening_time=format_time(salon['opening_time']),
+        closing_time=format_time(salon['closing_time']),
+        opening_day_num=WEEKDAY_TO_NUM.get(salon['opening_day'], 0),
+        closing_day_num=WEEKDAY_TO_NUM.get(salon['closing_day'], 4)
+    )
+
+# Dias de disponibilidade enviados junto com os dados iniciais do modal de agendamento
+APPOINTMENT_BOOTSTRAP_DAYS = int(os.getenv('APPOINTMENT_BOOTSTRAP_DAYS', '7'))
+
+@app.route('/api/appointment_bootstrap/<int:salon_id>')
+@login_required
+@read_replica
+def get_appointment_bootstrap(salon_id):
+    """Dados do modal de agendamento em uma resposta: horario do salao, cabeleireiros e horarios livres dos proximos dias"""
+    try:
+        days = request.args.get('days', APPOINTMENT_BOOTSTRAP_DAYS, type=int) or APPOINTMENT_BOOTSTRAP_DAYS
+        start = date.today()
+        end = start + timedelta(days=max(1, min(days, AVAILABILITY_RANGE_MAX_DAYS)) - 1)
+        
+        # Uma unica conexao para o que nao estiver em cache; do primario, porque tudo o que
+        # ela le vai para os caches de referencia e para o indice de disponibilidade
+        with get_db_connection(replica=False) as connection:
+            salon = cached_salon_schedule(salon_id, connection)
+            if not salon:
+                return jsonify({'error': 'Salao nao encontrado'}), 404
+            hairdressers = cached_hairdressers_by_salon(salon_id, connection)
+            booked = availability_index.booked_range([h['id'] for h in hairdressers], start, end, connection)
+        
+        schedule = build_schedule(salon)
+        result = []
+        for hairdresser in hairdressers:
+            availability_index.put_schedule(hairdresser['id'], schedule)
+            specialties = hairdresser['specialties'].split(',') if hairdresser['specialties'] else []
+            durations = sorted({DEFAULT_SERVICE_MINUTES, *(service_duration(name) for name in specialties)})
+            result.append(HairdresserBootstrap(
+                id=hairdresser['id'],
+                name=hairdresser['name'],
+                specialties=hairdresser['specialties'],
+                availability={
+                    str(duration): availability_days(schedule, hairdresser['id'], start, end, booked, duration)[0]
+                    for duration in durations
+                }
+            ))
+        
+        return jsonify(AppointmentBootstrap(
+            salon_id=salon_id,
+            schedule=salon_schedule_struct(salon),
+            service_durations={name: service_duration(name) for name in SPECIALTIES_LIST},
+            default_duration=DEFAULT_SERVICE_MINUTES,
+            date_from=start.isoformat(),
+            date_to=end.isoformat(),
+            hairdressers=result
+        ))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/available_times/<int:hairdresser_id>/<appointment_date>')
+@login_required
+@read_replica
+def get_available_times(hairdresser_id, appointment_date):
+    """Retorna horarios disponiveis para um cabeleireiro em uma data especifica"""
+    try:
+        # Busca o horario de funcionamento do salao no indice em memoria
+        schedule = availability_index.schedule(hairdresser_id)
+        
+        if not schedule:
+            return jsonify({'error': 'Cabeleireiro nao encontrado'}), 404
+        
+        # Converte a data para verificar o dia da semana
+        try:
+            date_obj = datetime.strptime(appointment_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Data invalida'}), 400
+        
+        # Verifica se o salao funciona neste dia
+        if not salon_is_open(schedule['opening_day_num'], schedule['closing_day_num'], date_obj.weekday()):
+            return jsonify(AvailableTimes(available_times=[], message='Salao fechado neste dia'))
+        
+        # Filtra os horarios em que todos os minutos do servico (?service_type=) estao livres no bitmap do dia
+        booked = availability_index.booked(hairdresser_id, date_obj)
+        available_times = available_slots(schedule, date_obj, booked, duration=service_duration(request.args.get('service_type')))
+        
+        return jsonify(AvailableTimes(available_times=available_times))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_date_range(date_from, date_to):
+    """Valida um periodo YYYY-MM-DD..YYYY-MM-DD; retorna (inicio, fim) ou (None, mensagem de erro)"""
+    try:
+        start = datetime.strptime(date_from, '%Y-%m-%d').date()
+        end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    except ValueError:
+        return None, 'Data invalida'
+    if end < start:
+        return None, 'Data final anterior a data inicial'
+    if (end - start).days + 1 > AVAILABILITY_RANGE_MAX_DAYS:
+        return None, f'Periodo maximo de {AVAILABILITY_RANGE_MAX_DAYS} dias'
+    return start, end
+
+def availability_days(schedule, hairdresser_id, start, end, booked, duration=DEFAULT_SERVICE_MINUTES):
+    """Calcula a disponibilidade de todos os dias do periodo em uma passada"""
+    now = datetime.now()
+    days = []
+    next_available = None
+    day = start
+    while day <= end:
+        if salon_is_open(schedule['opening_day_num'], schedule['closing_day_num'], day.weekday()):
+            times = available_slots(schedule, day, booked[(hairdresser_id, day)], now, duration)
+            days.append(DayAvailability(date=day.isoformat(), available_times=times))
+            if times and next_available is None:
+                next_available = NextAvailable(date=day.isoformat(), time=times[0])
+        else:
+            days.append(DayAvailability(date=day.isoformat(), available_times=[], message='Salao fechado neste dia'))
+        day += timedelta(days=1)
+    return days, next_available
+
+@app.route('/api/available_times_range/<int:hairdresser_id>/<date_from>/<date_to>')
+@login_required
+@read_replica
+def get_available_times_range(hairdresser_id, date_from, date_to):
+    """Retorna horarios disponiveis de um cabeleireiro para cada dia de um periodo"""
+    try:
+        schedule = availability_index.schedule(hairdresser_id)
+        
+        if not schedule:
+            return jsonify({'error': 'Cabeleireiro nao encontrado'}), 404
+        
+        start, end = parse_date_range(date_from, date_to)
+        if start is None:
+            return jsonify({'error': end}), 400
+        
+        booked = availability_index.booked_range([hairdresser_id], start, end)
+        duration = service_duration(request.args.get('service_type'))
+        days, next_available = availability_days(schedule, hairdresser_id, start, end, booked, duration)
+        
+        return jsonify(HairdresserAvailability(hairdresser_id=hairdresser_id, days=days, next_available=next_available))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def load_salon_hairdressers(salon_id):
+    """Retorna (horario de funcionamento, cabeleireiros) do salao, ou (None, []) se nao existir"""
+    # Alimenta o indice de disponibilidade (put_schedule): le do primario
+    with get_db_connection(replica=False) as connection:
+        cur = connection.cursor()
+        
+        # Busca o horario de funcionamento do salao e seus cabeleireiros
+        cur.execute("""
+            SELECT s.opening_day, s.closing_day, s.opening_time, s.closing_time,
+                   h.id AS hairdresser_id, h.name, h.specialties
+            FROM salons s
+            LEFT JOIN hairdressers h ON h.salon_id = s.id
+            WHERE s.id = %s
+            ORDER BY h.name ASC
+        """, (salon_id,))
+        rows = cur.fetchall()
+    
+    if not rows:
+        return None, []
+    
+    schedule = build_schedule(rows[0])
+    hairdressers = [row for row in rows if row['hairdresser_id'] is not None]
+    for row in hairdressers:
+        availability_index.put_schedule(row['hairdresser_id'], schedule)
+    return schedule, hairdressers
+
+@app.route('/api/salon_available_times_range/<int:salon_id>/<date_from>/<date_to>')
+@login_required
+@read_replica
+def get_salon_available_times_range(salon_id, date_from, date_to):
+    """Retorna horarios disponiveis de todos os cabeleireiros do salao para cada dia de um periodo"""
+    try:
+        start, end = parse_date_range(date_from, date_to)
+        if start is None:
+            return jsonify({'error': end}), 400
+        
+        schedule, hairdressers = load_salon_hairdressers(salon_id)
+        if not schedule:
+            return jsonify({'error': 'Salao nao encontrado'}), 404
+        
+        booked = availability_index.booked_range([row['hairdresser_id'] for row in hairdressers], start, end)
+        duration = service_duration(request.args.get('service_type'))
+        
+        result = []
+        for row in hairdressers:
+            days, next_available = availability_days(schedule, row['hairdresser_id'], start, end, booked, duration)
+            result.append(SalonHairdresserAvailability(id=row['hairdresser_id'], name=row['name'], days=days, next_available=next_available))
+        
+        return jsonify(SalonAvailability(salon_id=salon_id, hairdressers=result))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Quantidade maxima de horarios retornados pela busca "qualquer cabeleireiro"
+EARLIEST_SLOTS_LIMIT = 20
+EARLIEST_SLOTS_MAX_LIMIT = 200
+
+def earliest_slots(schedule, hairdressers, start, end, booked, duration, limit):
+    """Junta os horarios livres de todos os cabeleireiros em ordem cronologica, ate o limite"""
+    names = {row['hairdresser_id']: row['name'] for row in hairdressers}
+    now = datetime.now()
+    slots = []
+    day = start
+    while day <= end and len(slots) < limit:
+        if salon_is_open(schedule['opening_day_num'], schedule['closing_day_num'], day.weekday()):
+            # Cada lista ja esta em ordem de horario: o merge percorre todas de uma vez
+            merged = heapq.merge(*(
+                [(label, hairdresser_id) for label in available_slots(schedule, day, booked[(hairdresser_id, day)], now, duration)]
+                for hairdresser_id in names
+            ))
+            for label, group in itertools.groupby(merged, key=lambda item: item[0]):
+                slots.append(EarliestSlot(
+                    date=day.isoformat(),
+                    time=label,
+                    hairdressers=[HairdresserRef(id=hairdresser_id, name=names[hairdresser_id]) for _, hairdresser_id in group]
+                ))
+                if len(slots) >= limit:
+                    break
+        day += timedelta(days=1)
+    return slots
+
+@app.route('/api/salon_earliest_slots/<int:salon_id>/<date_from>/<date_to>')
+@login_required
+@read_replica
+def get_salon_earliest_slots(salon_id, date_from, date_to):
+    """Retorna os primeiros horarios livres do salao para o servico (?service_type=) com qualquer cabeleireiro que o atenda"""
+    try:
+        service_type = request.args.get('service_type', '').strip()
+        if service_type not in SPECIALTIES_LIST:
+            return jsonify({'error': 'Servico invalido'}), 400
+        
+        start, end = parse_date_range(date_from, date_to)
+        if start is None:
+            return jsonify({'error': end}), 400
+        
+        limit = request.args.get('limit', EARLIEST_SLOTS_LIMIT, type=int)
+        limit = max(1, min(limit or EARLIEST_SLOTS_LIMIT, EARLIEST_SLOTS_MAX_LIMIT))
+        
+        schedule, hairdressers = load_salon_hairdressers(salon_id)
+        if not schedule:
+            return jsonify({'error': 'Salao nao encontrado'}), 404
+        
+        # Somente os cabeleireiros com a especialidade; os agendamentos de todos vem em uma unica consulta
+        qualified = [row for row in hairdressers if service_type in (row['specialties'] or '').split(',')]
+        booked = availability_index.booked_range([row['hairdresser_id'] for row in qualified], start, end)
+        slots = earliest_slots(schedule, qualified, start, end, booked, service_duration(service_type), limit)
+        
+        return jsonify(EarliestSlots(salon_id=salon_id, service_type=service_type, slots=slots))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/salons')
+@admin_required
+@read_replica
+def get_salons_page():
+    """Retorna uma pagina de saloes; use next_cursor em ?after= para a proxima"""
+    try:
+        if streaming_requested():
+            return streamed_json_list(stream_query(*salons_list_query()), SalonItem)
+        salons, next_cursor = load_salons_page(request.args.get('after'), page_size_arg())
+        return jsonify({'items': [api_struct(SalonItem, s) for s in salons], 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/hairdressers')
+@admin_required
+@read_replica
+def get_hairdressers_page():
+    """Retorna uma pagina de cabeleireiros; use next_cursor em ?after= para a proxima"""
+    try:
+        if streaming_requested():
+            return streamed_json_list(stream_query(*hairdressers_list_query()), HairdresserItem)
+        hairdressers, next_cursor = load_hairdressers_page(request.args.get('after'), page_size_arg())
+        return jsonify({'items': [api_struct(HairdresserItem, h) for h in hairdressers], 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/hairdressers/search')
+@login_required
+@read_replica
+def search_hairdressers_route():
+    """Busca cabeleireiros por especialidade (?specialty=, repetido ou separado por virgula) e dados do salao"""
+    specialties = [name.strip() for value in request.args.getlist('specialty') for name in value.split(',') if name.strip()]
+    if not specialties:
+        return jsonify({'error': 'Informe ao menos uma especialidade'}), 400
+    invalid = [name for name in specialties if name not in SPECIALTY_BITS]
+    if invalid:
+        return jsonify({'error': f"Especialidade invalida: {', '.join(invalid)}"}), 400
+    
+    match = request.args.get('match', 'all')
+    if match not in ('all', 'any'):
+        return jsonify({'error': 'match deve ser all ou any'}), 400
+    
+    open_on = request.args.get('open_on')
+    if open_on is not None and open_on not in WEEKDAY_TO_NUM:
+        return jsonify({'error': 'Dia da semana invalido'}), 400
+    
+    try:
+        items, next_cursor = search_hairdressers(
+            specialties,
+            match_all=match == 'all',
+            salon_id=request.args.get('salon_id', type=int),
+            open_on=WEEKDAY_TO_NUM[open_on] if open_on else None,
+            q=request.args.get('q', '').strip() or None,
+            limit=page_size_arg(),
+            after=request.args.get('after')
+        )
+        return jsonify({'items': items, 'count': len(items), 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/appointments')
+@login_required
+@read_replica
+def get_appointments_page():
+    """Retorna uma pagina dos agendamentos do usuario; use next_cursor em ?after= para a proxima"""
+    try:
+        user_appointments, next_cursor = load_user_appointments_page(session['user_id'], request.args.get('after'), page_size_arg(), history_requested())
+        return jsonify({'items': [api_struct(AppointmentItem, a) for a in user_appointments], 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/import/<kind>', methods=['POST'])
+@admin_required
+def bulk_import_route(kind):
+    """Importa saloes ou cabeleireiros do arquivo enviado no campo file (CSV ou JSONL)"""
+    if kind not in BULK_IMPORTERS:
+        return jsonify({'error': 'Tipo de importacao invalido'}), 404
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'Envie o arquivo no campo file'}), 400
+    try:
+        fmt = bulk_format(upload.filename, request.args.get('format'))
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        return jsonify(bulk_import(kind, stream, fmt, request.args.get('batch_size', type=int)).as_dict())
+    except (ValueError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/export/<kind>')
+@admin_required
+@read_replica
+def bulk_export_route(kind):
+    """Exporta a tabela inteira em streaming, sem carregar todas as linhas na memoria"""
+    if kind not in BULK_EXPORTS:
+        return jsonify({'error': 'Tipo de exportacao invalido'}), 404
+    try:
+        fmt = bulk_format(None, request.args.get('format', 'csv'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = app.response_class(stream_with_context(bulk_export(kind, fmt)), mimetype=BULK_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    return response
+
+@app.route('/api/db_pool_stats')
+@admin_required
+def get_db_pool_stats():
+    """Retorna as estatisticas do pool de conexoes deste worker (e das replicas, se houver)"""
+    stats = db_pool.stats()
+    if replica_router:
+        stats['replicas'] = replica_router.stats()
+    return jsonify(stats)
+
+@app.route('/api/cache_stats')
+@admin_required
+def get_cache_stats():
+    """Retorna os contadores de acertos e falhas do cache de dados de referencia e de fragmentos"""
+    return jsonify({**reference_cache.stats(), 'fragments': fragment_cache.stats()})
+
+# Agendamentos ativos do cabeleireiro no dia, lidos com bloqueio para a verificacao de sobreposicao
+DAY_BOOKINGS_FOR_UPDATE_SQL = """
+    SELECT id, appointment_time, duration_minutes
+    FROM appointments
+    WHERE hairdresser_id = %s
+    AND appointment_date = %s
+    AND status != 'cancelled'
+    FOR UPDATE
+"""
+
+# Insere o agendamento somente se o intervalo nao se sobrepoe a outro agendamento ativo
+# do cabeleireiro no dia; rowcount 0 indica conflito
+INSERT_APPOINTMENT_IF_FREE_SQL = """
+    INSERT INTO appointments (user_id, salon_id, hairdresser_id, appointment_date, appointment_time, duration_minutes, service_type, notes, status)
+    SELECT %s, %s, %s, %s, %s, %s, %s, %s, 'confirmed'
+    FROM DUAL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM appointments
+        WHERE hairdresser_id = %s
+        AND appointment_date = %s
+        AND status != 'cancelled'
+        AND appointment_time < ADDTIME(CAST(%s AS TIME), SEC_TO_TIME(%s * 60))
+        AND ADDTIME(appointment_time, SEC_TO_TIME(duration_minutes * 60)) > CAST(%s AS TIME)
+    )
+"""
+
+def lock_hairdresser(cur, hairdresser_id, salon_id):
+    """Bloqueia o cabeleireiro ate o fim da transacao (as reservas dele ficam em fila).
+    Retorna o horario de funcionamento do salao, ou None se o cabeleireiro nao pertence a ele"""
+    # Somente a linha do cabeleireiro fica bloqueada; a do salao e lida sem bloqueio
+    cur.execute("""
+        SELECT h.id, s.opening_day, s.closing_day, s.opening_time, s.closing_time
+        FROM hairdressers h
+        INNER JOIN salons s ON h.salon_id = s.id
+        WHERE h.id = %s AND h.salon_id = %s
+        FOR UPDATE OF h
+    """, (hairdresser_id, salon_id))
+    return cur.fetchone()
+
+def booking_window_error(salon, appointment_date, appointment_time, duration):
+    """Mensagem de erro se o servico nao cabe inteiro no funcionamento do salao no dia, senao None"""
+    try:
+        day = _as_date(appointment_date)
+        start = time_to_minutes(appointment_time)
+    except (TypeError, ValueError, IndexError):
+        return 'Data ou horário inválido!'
+    schedule = build_schedule(salon)
+    if not salon_is_open(schedule['opening_day_num'], schedule['closing_day_num'], day.weekday()):
+        return 'O salão não funciona neste dia!'
+    if start < time_to_minutes(salon['opening_time']) or start + duration > schedule['closing_minutes']:
+        return 'O serviço não termina antes do fechamento do salão! Por favor, escolha outro horário.'
+    return None
+
+def overlaps_booking(cur, hairdresser_id, appointment_date, appointment_time, duration, exclude_id=None):
+    """Verifica se o intervalo do agendamento se sobrepoe a outro agendamento ativo do cabeleireiro no dia"""
+    cur.execute(DAY_BOOKINGS_FOR_UPDATE_SQL, (hairdresser_id, appointment_date))
+    booked = booked_bitmap(row for row in cur.fetchall() if row['id'] != exclude_id)
+    return bool(booked & interval_mask(time_to_minutes(appointment_time), duration))
+
+@app.route('/create_appointment', methods=['POST'])
+@login_required
+def create_appointment():
+    salon_id = request.form.get('salon_id', '').strip()
+    hairdresser_id = request.form.get('hairdresser_id', '').strip()
+    appointment_date = request.form.get('appointment_date', '').strip()
+    appointment_time = request.form.get('appointment_time', '').strip()
+    service_type = request.form.get('service_type', '').strip()
+    notes = request.form.get('notes', '').strip()
+    
+    # Validação de campos obrigatórios
+    if not salon_id or not hairdresser_id or not appointment_date or not appointment_time or not service_type:
+        flash('Todos os campos obrigatórios devem ser preenchidos!', 'error')
+        return redirect(url_for('appointments'))
+    
+    duration = service_duration(service_type)
+    
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Bloqueia o cabeleireiro, que precisa pertencer ao salão; as reservas dele ficam em fila
+            salon = lock_hairdresser(cur, hairdresser_id, salon_id)
+            if not salon:
+                APPOINTMENT_OUTCOMES.labels('rejected').inc()
+                flash('Cabeleireiro não pertence ao salão selecionado!', 'error')
+                return redirect(url_for('appointments'))
+        
+            # O serviço inteiro precisa caber no funcionamento do salão, não só o horário de início
+            error = booking_window_error(salon, appointment_date, appointment_time, duration)
+            if error:
+                APPOINTMENT_OUTCOMES.labels('rejected').inc()
+                flash(error, 'error')
+                return redirect(url_for('appointments'))
+        
+            # Um único INSERT condicional verifica a sobreposição e grava o agendamento;
+            # o índice único de horários ativos continua impedindo reservas duplicadas
+            try:
+                cur.execute(INSERT_APPOINTMENT_IF_FREE_SQL, (
+                    session['user_id'], salon_id, hairdresser_id, appointment_date, appointment_time, duration, service_type, notes if notes else None,
+                    hairdresser_id, appointment_date, appointment_time, duration, appointment_time
+                ))
+                inserted = cur.rowcount
+            except pymysql.err.IntegrityError as e:
+                if e.args[0] != ER.DUP_ENTRY:
+                    raise
+                inserted = 0
+            if not inserted:
+                APPOINTMENT_OUTCOMES.labels('conflict').inc()
+                flash('Este horário já está reservado! Por favor, escolha outro horário.', 'error')
+                return redirect(url_for('appointments'))
+            # Notificação e auditoria ficam para o worker, gravadas na mesma transação
+            enqueue_job(cur, 'appointment_event', {'appointment_id': cur.lastrowid, 'event': 'created'})
+            connection.commit()
+            availability_index.book(hairdresser_id, appointment_date, appointment_time, duration)
+            APPOINTMENT_OUTCOMES.labels('created').inc()
+        
+            flash('Agendamento realizado com sucesso!', 'success')
+        
+    except Exception as e:
+        APPOINTMENT_OUTCOMES.labels('error').inc()
+        flash(f'Erro ao criar agendamento: {str(e)}', 'error')
+    
+    return redirect(url_for('appointments'))
+
+@app.route('/update_appointment/<int:appointment_id>', methods=['POST'])
+@login_required
+def update_appointment(appointment_id):
+    salon_id = request.form.get('salon_id', '').strip()
+    hairdresser_id = request.form.get('hairdresser_id', '').strip()
+    appointment_date = request.form.get('appointment_date', '').strip()
+    appointment_time = request.form.get('appointment_time', '').strip()
+    service_type = request.form.get('service_type', '').strip()
+    notes = request.form.get('notes', '').strip()
+    
+    # Validação de campos obrigatórios
+    if not salon_id or not hairdresser_id or not appointment_date or not appointment_time or not service_type:
+        flash('Todos os campos obrigatórios devem ser preenchidos!', 'error')
+        return redirect(url_for('appointments'))
+    
+    duration = service_duration(service_type)
+    
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o agendamento pertence ao usuário
+            cur.execute("""
+                SELECT id, hairdresser_id, appointment_date, appointment_time, duration_minutes, status
+                FROM appointments
+                WHERE id = %s AND user_id = %s
+            """, (appointment_id, session['user_id']))
+            appointment = cur.fetchone()
+            if not appointment:
+                flash('Agendamento não encontrado ou você não tem permissão para editá-lo!', 'error')
+                return redirect(url_for('appointments'))
+        
+            if appointment['status'] == 'completed':
+                flash('Agendamentos concluídos não podem ser alterados!', 'error')
+                return redirect(url_for('appointments'))
+        
+            # Bloqueia o cabeleireiro, que precisa pertencer ao salão
+            salon = lock_hairdresser(cur, hairdresser_id, salon_id)
+            if not salon:
+                flash('Cabeleireiro não pertence ao salão selecionado!', 'error')
+                return redirect(url_for('appointments'))
+        
+            error = booking_window_error(salon, appointment_date, appointment_time, duration)
+            if error:
+                APPOINTMENT_OUTCOMES.labels('rejected').inc()
+                flash(error, 'error')
+                return redirect(url_for('appointments'))
+        
+            # O novo intervalo não pode se sobrepor a outro agendamento (o próprio é ignorado)
+            if appointment['status'] != 'cancelled' and overlaps_booking(cur, hairdresser_id, appointment_date, appointment_time, duration, appointment_id):
+                APPOINTMENT_OUTCOMES.labels('conflict').inc()
+                flash('Este horário já está reservado! Por favor, escolha outro horário.', 'error')
+                return redirect(url_for('appointments'))
+        
+            # Atualiza o agendamento; o índice único de horários ativos impede reservas duplicadas
+            try:
+                cur.execute("""
+                    UPDATE appointments 
+                    SET salon_id = %s, hairdresser_id = %s, appointment_date = %s, appointment_time = %s, duration_minutes = %s, service_type = %s, notes = %s
+                    WHERE id = %s AND user_id = %s
+                """, (salon_id, hairdresser_id, appointment_date, appointment_time, duration, service_type, notes if notes else None, appointment_id, session['user_id']))
+            except pymysql.err.IntegrityError as e:
+                if e.args[0] != ER.DUP_ENTRY:
+                    raise
+                APPOINTMENT_OUTCOMES.labels('conflict').inc()
+                flash('Este horário já está reservado! Por favor, escolha outro horário.', 'error')
+                return redirect(url_for('appointments'))
+            enqueue_job(cur, 'appointment_event', {'appointment_id': appointment_id, 'event': 'updated'})
+            connection.commit()
+            if appointment['status'] != 'cancelled':
+                availability_index.release(appointment['hairdresser_id'], appointment['appointment_date'], appointment['appointment_time'], appointment['duration_minutes'])
+                availability_index.book(hairdresser_id, appointment_date, appointment_time, duration)
+            APPOINTMENT_OUTCOMES.labels('updated').inc()
+        
+            flash('Agendamento atualizado com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao atualizar agendamento: {str(e)}', 'error')
+    
+    return redirect(url_for('appointments'))
+
+@app.route('/cancel_appointment/<int:appointment_id>', methods=['POST'])
+@login_required
+def cancel_appointment(appointment_id):
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o agendamento pertence ao usuário
+            cur.execute("SELECT id, hairdresser_id, appointment_date, appointment_time, duration_minutes, status FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
+            appointment = cur.fetchone()
+        
+            if not appointment:
+                flash('Agendamento não encontrado ou você não tem permissão para cancelá-lo!', 'error')
+                return redirect(url_for('appointments'))
+        
+            if appointment['status'] == 'cancelled':
+                flash('Este agendamento já está cancelado!', 'error')
+                return redirect(url_for('appointments'))
+        
+            if appointment['status'] == 'completed':
+                flash('Agendamentos concluídos não podem ser cancelados!', 'error')
+                return redirect(url_for('appointments'))
+        
+            # Cancela o agendamento
+            cur.execute("UPDATE appointments SET status = 'cancelled' WHERE id = %s", (appointment_id,))
+            enqueue_job(cur, 'appointment_event', {'appointment_id': appointment_id, 'event': 'cancelled'})
+            connection.commit()
+            availability_index.release(appointment['hairdresser_id'], appointment['appointment_date'], appointment['appointment_time'], appointment['duration_minutes'])
+            APPOINTMENT_OUTCOMES.labels('cancelled').inc()
+        
+            flash('Agendamento cancelado com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao cancelar agendamento: {str(e)}', 'error')
+    
+    return redirect(url_for('appointments'))
+
+@app.route('/delete_appointment/<int:appointment_id>', methods=['POST'])
+@login_required
+def delete_appointment(appointment_id):
+    try:
+        with get_db_connection() as connection:
+            cur = connection.cursor()
+        
+            # Verifica se o agendamento pertence ao usuário
+            cur.execute("SELECT id, hairdresser_id, appointment_date, appointment_time, duration_minutes, status FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
+            appointment = cur.fetchone()
+            if not appointment:
+                flash('Agendamento não encontrado ou você não tem permissão para excluí-lo!', 'error')
+                return redirect(url_for('appointments'))
+        
+            # Deleta o agendamento
+            cur.execute("DELETE FROM appointments WHERE id = %s AND user_id = %s", (appointment_id, session['user_id']))
+            connection.commit()
+            if appointment['status'] != 'cancelled':
+                availability_index.release(appointment['hairdresser_id'], appointment['appointment_date'], appointment['appointment_time'], appointment['duration_minutes'])
+            APPOINTMENT_OUTCOMES.labels('deleted').inc()
+        
+            flash('Agendamento excluído com sucesso!', 'success')
+        
+    except Exception as e:
+        flash(f'Erro ao excluir agendamento: {str(e)}', 'error')
+    
+    return redirect(url_for('appointments'))
+
+@app.route('/logout')
+def logout():
+    session.clear()
+    flash('Logout realizado com sucesso!', 'success')
     return redirect(url_for('login'))
\ No newline at end of file
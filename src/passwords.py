@@ -0,0 +1,15 @@
+"""Funções do bcrypt executadas pelo pool de processos de main.PasswordHasher.
+
+Ficam em um módulo separado, que importa só o bcrypt: os processos do pool
+(iniciados com spawn) importam este arquivo em vez de main.py, sem recriar a
+aplicação Flask, os pools de conexões e as métricas em cada processo.
+"""
+import bcrypt
+
+
+def bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def bcrypt_check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
@@ -1,6 +1,7 @@
 // Armazena os dados dos cabeleireiros e saloes carregados
 let hairdressersData = {};
 let salonScheduleData = {};
+let bootstrapData = {};
 
 // Funcoes para controlar modais
 function openCreateModal() {
@@ -61,26 +62,29 @@ window.onclick = function(event) {
     }
 }
 
-// Carrega informacoes do horario de funcionamento do salao
-async function loadSalonSchedule(salonId, context) {
-    if (!salonId) return null;
+// Horarios livres ja recebidos em /api/appointment_bootstrap, ou null se precisar consultar o servidor
+function cachedAvailableTimes(context, hairdresserId, appointmentDate, serviceType) {
+    const data = bootstrapData[context];
+    if (!data || appointmentDate < data.date_from || appointmentDate > data.date_to) {
+        return null;
+    }
     
-    try {
-        const response = await fetch(`/api/salon_schedule/${salonId}`);
-        const schedule = await response.json();
-        
-        if (schedule.error) {
-            console.error('Erro ao carregar horario do salao:', schedule.error);
-            return null;
-        }
-        
-        salonScheduleData[context] = schedule;
-        return schedule;
-        
-    } catch (error) {
-        console.error('Erro ao carregar horario do salao:', error);
+    const hairdresser = data.hairdressers.find(h => h.id == hairdresserId);
+    const duration = serviceType ? data.service_durations[serviceType] : data.default_duration;
+    const days = hairdresser && hairdresser.availability[duration];
+    if (!days) {
         return null;
     }
+    
+    const day = days.find(d => d.date === appointmentDate);
+    if (!day) {
+        return null;
+    }
+    // O primeiro dia e hoje: os horarios que ja passaram mudam a cada minuto
+    if (appointmentDate === data.date_from) {
+        return null;
+    }
+    return day;
 }
 
 // Carrega cabeleireiros por salao
@@ -102,18 +106,20 @@ async function loadHairdressers(salonId, context, selectedHairdresserId = null,
         return;
     }
     
-    // Carrega horario de funcionamento do salao
-    await loadSalonSchedule(salonId, context);
-    
     try {
-        const response = await fetch(`/api/hairdressers_by_salon/${salonId}`);
-        const hairdressers = await response.json();
+        // Horario do salao, cabeleireiros e horarios livres dos proximos dias em uma unica requisicao
+        const response = await fetch(`/api/appointment_bootstrap/${salonId}`);
+        const data = await response.json();
         
-        if (hairdressers.error) {
-            alert('Erro ao carregar cabeleireiros: ' + hairdressers.error);
+        if (data.error) {
+            alert('Erro ao carregar cabeleireiros: ' + data.error);
             return;
         }
         
+        bootstrapData[context] = data;
+        salonScheduleData[context] = data.schedule;
+        const hairdressers = data.hairdressers;
+        
         // Armazena os dados para uso posterior
         hairdressersData[context] = {};
         hairdressers.forEach(h => {
@@ -278,8 +284,14 @@ async function loadAvailableTimes(context, selectedTime = null) {
     try {
         timeSelect.innerHTML = '<option value="">Carregando horarios...</option>';
         
-        const response = await fetch(`/api/available_times/${hairdresserId}/${appointmentDate}`);
-        const data = await response.json();
+        // A duracao do servico escolhido define quais horarios cabem na agenda
+        const serviceType = document.getElementById(context === 'create' ? 'service_type' : 'edit_service_type').value;
+        let data = cachedAvailableTimes(context, hairdresserId, appointmentDate, serviceType);
+        if (!data) {
+            const query = serviceType ? `?service_type=${encodeURIComponent(serviceType)}` : '';
+            const response = await fetch(`/api/available_times/${hairdresserId}/${appointmentDate}${query}`);
+            data = await response.json();
+        }
         
         if (data.error) {
             timeSelect.innerHTML = `<option value="">${data.error}</option>`;
@@ -0,0 +1,15 @@
+"""Configuracao dos testes: importa src/main.py sem precisar do MySQL.
+
+As funcoes testadas aqui sao puras; o pool de conexoes so conecta no primeiro
+uso, entao importar a aplicacao nao abre conexao com o banco.
+"""
+import os
+import sys
+
+# Sessao em cookie para nao criar o diretorio flask_session durante os testes
+os.environ.setdefault('SESSION_BACKEND', 'cookie')
+os.environ.setdefault('REFERENCE_CACHE_BACKEND', 'memory')
+os.environ.setdefault('SECRET_KEY', 'chave-dos-testes')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,132 @@
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+import main
+
+SALON = {'opening_day': 'segunda', 'closing_day': 'sexta',
+         'opening_time': timedelta(hours=9), 'closing_time': timedelta(hours=12)}
+MONDAY = date(2030, 1, 7)
+
+
+def booking(time, duration):
+    return {'appointment_time': time, 'duration_minutes': duration}
+
+
+def test_interval_mask_covers_start_to_end_exclusive():
+    mask = main.interval_mask(600, 30)
+    assert mask >> 600 == (1 << 30) - 1
+    assert not mask & main.interval_mask(630, 30)
+    assert mask & main.interval_mask(629, 1)
+    assert main.interval_mask(0, 0) == 0
+
+
+def test_booked_bitmap_accepts_timedelta_and_string_times():
+    bitmap = main.booked_bitmap([booking(timedelta(hours=9), 60), booking('10:30:00', 30)])
+    assert bitmap == main.interval_mask(540, 60) | main.interval_mask(630, 30)
+
+
+def test_build_schedule_slots():
+    schedule = main.build_schedule(SALON)
+    assert schedule['closing_minutes'] == 720
+    assert [label for _, label in schedule['slots']] == ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30']
+
+
+def test_available_slots_skip_overlaps_and_closing_time():
+    schedule = main.build_schedule(SALON)
+    booked = main.booked_bitmap([booking('10:00', 60)])
+    now = datetime(2030, 1, 1, 8, 0)
+    assert main.available_slots(schedule, MONDAY, booked, now) == ['09:00', '09:30', '11:00', '11:30']
+    # 120 minutos: nao cabe antes do agendamento das 10:00 nem depois dele, antes do fechamento
+    assert main.available_slots(schedule, MONDAY, booked, now, duration=120) == []
+    assert main.available_slots(schedule, MONDAY, 0, now, duration=120) == ['09:00', '09:30', '10:00']
+
+
+def test_available_slots_today_drops_past_times():
+    schedule = main.build_schedule(SALON)
+    now = datetime.combine(MONDAY, datetime.min.time()).replace(hour=10, minute=15)
+    assert main.available_slots(schedule, MONDAY, 0, now) == ['10:30', '11:00', '11:30']
+
+
+def test_index_book_and_release_update_loaded_days():
+    index = main.AvailabilityIndex(ttl=60)
+    index.put_booked(1, MONDAY, 0)
+    index.book(1, MONDAY.isoformat(), '09:00', 45)
+    assert index.cached_booked(1, MONDAY) == main.interval_mask(540, 45)
+    index.release(1, MONDAY, timedelta(hours=9), 45)
+    assert index.cached_booked(1, MONDAY) == 0
+    # Dia nao carregado continua fora do indice
+    index.book(1, MONDAY + timedelta(days=1), '09:00', 30)
+    assert index.cached_booked(1, MONDAY + timedelta(days=1)) is None
+
+
+def test_index_expires_after_ttl():
+    index = main.AvailabilityIndex(ttl=0)
+    index.put_booked(1, MONDAY, 5)
+    assert index.cached_booked(1, MONDAY) is None
+
+
+def test_index_drops_load_started_before_book():
+    index = main.AvailabilityIndex(ttl=60)
+    generation = index.generation(1, MONDAY)
+    # Outro worker confirma um agendamento enquanto a carga ainda esta no banco
+    index.book(1, MONDAY, '09:00', 30)
+    index.put_booked(1, MONDAY, 0, generation)
+    assert index.cached_booked(1, MONDAY) is None
+    # Carga iniciada depois do agendamento e guardada normalmente
+    index.put_booked(1, MONDAY, main.interval_mask(540, 30), index.generation(1, MONDAY))
+    assert index.cached_booked(1, MONDAY) == main.interval_mask(540, 30)
+
+
+def test_index_drops_load_started_before_invalidate_or_clear():
+    index = main.AvailabilityIndex(ttl=60)
+    generation = index.generation(1, MONDAY)
+    index.invalidate_hairdresser(1)
+    index.put_booked(1, MONDAY, 0, generation)
+    assert index.cached_booked(1, MONDAY) is None
+
+    generation = index.generation(1, MONDAY)
+    index.clear()
+    index.put_booked(1, MONDAY, 0, generation)
+    assert index.cached_booked(1, MONDAY) is None
+
+
+def test_index_generation_survives_eviction():
+    index = main.AvailabilityIndex(ttl=60, max_days=1)
+    generation = index.generation(1, MONDAY)
+    index.book(1, MONDAY, '09:00', 30)
+    # A geracao do dia sai do indice, mas nao volta ao valor lido pela carga
+    index.book(2, MONDAY, '09:00', 30)
+    index.put_booked(1, MONDAY, 0, generation)
+    assert index.cached_booked(1, MONDAY) is None
+
+
+class BookingDuringLoadConnection:
+    """Conexao falsa: um agendamento e confirmado no meio da consulta do indice"""
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, args=None):
+        self.index.book(1, MONDAY, '09:00', 30)
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_booked_and_booked_range_do_not_store_stale_loads(monkeypatch):
+    index = main.AvailabilityIndex(ttl=60)
+    connection = BookingDuringLoadConnection(index, [])
+    monkeypatch.setattr(main, 'get_db_connection', lambda replica=None: nullcontext(connection))
+
+    assert index.booked(1, MONDAY) == 0
+    assert index.cached_booked(1, MONDAY) is None
+
+    assert index.booked_range([1], MONDAY, MONDAY + timedelta(days=1)) == {
+        (1, MONDAY): 0, (1, MONDAY + timedelta(days=1)): 0}
+    assert index.cached_booked(1, MONDAY) is None
+    # O outro dia nao mudou durante a consulta e continua sendo guardado
+    assert index.cached_booked(1, MONDAY + timedelta(days=1)) == 0
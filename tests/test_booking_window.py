@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+
+import main
+
+SALON = {'id': 1, 'opening_day': 'segunda', 'closing_day': 'sexta',
+         'opening_time': timedelta(hours=9), 'closing_time': timedelta(hours=18)}
+MONDAY = '2030-01-07'
+SATURDAY = '2030-01-12'
+
+
+def test_service_that_fits_is_accepted():
+    assert main.booking_window_error(SALON, MONDAY, '15:00', 180) is None
+    assert main.booking_window_error(SALON, MONDAY, '09:00', 30) is None
+
+
+def test_service_ending_after_closing_is_rejected():
+    # Alisamento de 180 minutos comecando 30 minutos antes do fechamento
+    assert 'fechamento' in main.booking_window_error(SALON, MONDAY, '17:30', 180)
+    assert 'fechamento' in main.booking_window_error(SALON, MONDAY, '08:30', 30)
+
+
+def test_closed_day_is_rejected():
+    assert 'não funciona' in main.booking_window_error(SALON, SATURDAY, '10:00', 30)
+
+
+def test_invalid_date_or_time_is_rejected():
+    assert 'inválido' in main.booking_window_error(SALON, '2030-13-40', '10:00', 30)
+    assert 'inválido' in main.booking_window_error(SALON, MONDAY, '10h', 30)
+
+
+class BookingCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = 1
+
+    def execute(self, sql, args=None):
+        sql = ' '.join(sql.split())
+        self.log.append(sql)
+        self.rows = [{'id': 1, **SALON}] if 'FOR UPDATE OF h' in sql else []
+        self.rowcount = 1
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class BookingConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self, *args):
+        return BookingCursor(self.log)
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def booking_client(monkeypatch):
+    log = []
+    monkeypatch.setattr(main.pymysql, 'connect', lambda **config: BookingConnection(log))
+    monkeypatch.setattr(main, 'db_pool', main.ConnectionPool({}, ping=False))
+    monkeypatch.setattr(main, 'availability_index', main.AvailabilityIndex(60))
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 2
+    client.log = log
+    return client
+
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.get('_flashes', [])]
+
+
+@pytest.mark.parametrize('day, time, message', [
+    (MONDAY, '17:30', 'fechamento'),
+    (SATURDAY, '10:00', 'não funciona'),
+])
+def test_create_appointment_rejects_out_of_hours_booking(booking_client, day, time, message):
+    booking_client.post('/create_appointment', data={
+        'salon_id': '1', 'hairdresser_id': '1', 'appointment_date': day,
+        'appointment_time': time, 'service_type': 'Alisamento'
+    })
+    assert message in flashes(booking_client)[-1]
+    assert not any(sql.startswith('INSERT INTO appointments') for sql in booking_client.log)
+    assert 'COMMIT' not in booking_client.log
+
+
+def test_create_appointment_inside_hours_is_inserted(booking_client):
+    booking_client.post('/create_appointment', data={
+        'salon_id': '1', 'hairdresser_id': '1', 'appointment_date': MONDAY,
+        'appointment_time': '10:00', 'service_type': 'Alisamento'
+    })
+    assert any(sql.startswith('INSERT INTO appointments') for sql in booking_client.log)
+    assert 'COMMIT' in booking_client.log
+
+
+@pytest.mark.parametrize('day, time, message', [
+    (MONDAY, '17:30', 'fechamento'),
+    (SATURDAY, '10:00', 'não funciona'),
+])
+def test_update_appointment_rejects_out_of_hours_booking(booking_client, monkeypatch, day, time, message):
+    appointment = {'id': 5, 'hairdresser_id': 1, 'appointment_date': MONDAY,
+                   'appointment_time': timedelta(hours=10), 'duration_minutes': 30, 'status': 'confirmed'}
+    original = BookingCursor.execute
+
+    def execute(self, sql, args=None):
+        original(self, sql, args)
+        if 'FROM appointments WHERE id = %s AND user_id = %s' in self.log[-1]:
+            self.rows = [appointment]
+
+    monkeypatch.setattr(BookingCursor, 'execute', execute)
+    booking_client.post('/update_appointment/5', data={
+        'salon_id': '1', 'hairdresser_id': '1', 'appointment_date': day,
+        'appointment_time': time, 'service_type': 'Alisamento'
+    })
+    assert message in flashes(booking_client)[-1]
+    assert not any(sql.startswith('UPDATE appointments') for sql in booking_client.log)
@@ -0,0 +1,136 @@
+import io
+
+import pytest
+
+import main
+
+
+def salon(**overrides):
+    record = {'name': 'Salao Teste', 'address': 'Rua A, 1', 'phone': '(11)9999-0000'}
+    record.update(overrides)
+    return record
+
+
+def hairdresser(**overrides):
+    record = {'name': 'Ana', 'phone': '(11)9999-1111', 'email': 'ana@example.com', 'salon_id': '1'}
+    record.update(overrides)
+    return record
+
+
+def test_salon_defaults_when_fields_are_missing():
+    values = main.validate_salon_record(salon())
+    assert values[5:] == ('segunda', 'sexta', '09:00:00', '18:00:00')
+
+
+@pytest.mark.parametrize('field', ['opening_day', 'closing_day', 'opening_time', 'closing_time'])
+def test_salon_empty_cells_use_defaults(field):
+    # Celula vazia no CSV vale o mesmo que a coluna ausente
+    values = main.validate_salon_record(salon(**{field: ''}))
+    assert values[5:] == ('segunda', 'sexta', '09:00:00', '18:00:00')
+
+
+def test_salon_whitespace_only_cell_uses_default():
+    assert main.validate_salon_record(salon(opening_time='   '))[7] == '09:00:00'
+
+
+def test_salon_times_are_normalized():
+    values = main.validate_salon_record(salon(opening_time='08:30', closing_time='20:00:00'))
+    assert values[7:] == ('08:30:00', '20:00:00')
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'name': ''}, 'campo obrigatorio: name'),
+    ({'opening_day': 'feriado'}, 'opening_day invalido'),
+    ({'opening_time': '25:00'}, 'opening_time invalido'),
+    ({'opening_time': '18:00', 'closing_time': '09:00'}, 'closing_time deve ser depois'),
+    ({'phone': '1' * 16}, 'phone maior que 15'),
+])
+def test_salon_invalid_values(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        main.validate_salon_record(salon(**overrides))
+
+
+def test_hairdresser_specialties_from_text():
+    item = main.validate_hairdresser_record(hairdresser(specialties='Coloracao; Escova,'))
+    assert item['values'][1] == 'Coloracao,Escova'
+    assert item['salon_id'] == 1
+
+
+def test_hairdresser_specialties_from_list():
+    item = main.validate_hairdresser_record(hairdresser(specialties=['Coloracao', 'Escova']))
+    assert item['values'][1] == 'Coloracao,Escova'
+
+
+@pytest.mark.parametrize('specialties', [42, {'a': 1}, True])
+def test_hairdresser_specialties_of_wrong_type(specialties):
+    with pytest.raises(ValueError, match='specialties deve ser texto ou lista'):
+        main.validate_hairdresser_record(hairdresser(specialties=specialties))
+
+
+def test_hairdresser_unknown_specialty():
+    with pytest.raises(ValueError, match='especialidade invalida: Tatuagem'):
+        main.validate_hairdresser_record(hairdresser(specialties=['Tatuagem']))
+
+
+def test_hairdresser_empty_cells():
+    item = main.validate_hairdresser_record(hairdresser(specialties='', image_url='', bio='', salon_id='', salon_name='Salao X'))
+    assert item['salon_id'] is None
+    assert item['salon_name'] == 'Salao X'
+    assert item['values'][1] is None
+    assert item['values'][4:] == [None, None]
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'salon_id': '', 'salon_name': ''}, 'informe salon_id ou salon_name'),
+    ({'salon_id': 'abc'}, 'salon_id invalido'),
+    ({'email': ''}, 'campo obrigatorio: email'),
+])
+def test_hairdresser_invalid_values(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        main.validate_hairdresser_record(hairdresser(**overrides))
+
+
+def test_bulk_import_rejects_bad_rows_without_aborting(monkeypatch):
+    inserted = []
+
+    def insert_batch(cur, batch, result):
+        inserted.extend(batch)
+        return [values for _, values in batch]
+
+    def validate(record):
+        if record['name'] == 'quebra':
+            raise TypeError('falha inesperada')
+        return main.validate_salon_record(record)
+
+    class Connection:
+        def cursor(self):
+            return None
+
+        def commit(self):
+            pass
+
+    class Pool:
+        def acquire(self):
+            return Connection()
+
+        def release(self, connection):
+            pass
+
+    monkeypatch.setitem(main.BULK_IMPORTERS, 'salons', (validate, insert_batch))
+    monkeypatch.setattr(main, 'db_pool', Pool())
+    monkeypatch.setattr(main, 'invalidate_salon', lambda *args: None)
+    stream = io.StringIO(
+        'name,address,phone,opening_time\n'
+        'Salao A,Rua 1,11,\n'
+        'quebra,Rua 2,11,\n'
+        ',Rua 3,11,\n'
+        'Salao B,Rua 4,11,10:00\n'
+    )
+    result = main.bulk_import('salons', stream, 'csv').as_dict()
+    assert result['inserted'] == 2
+    assert result['rejected'] == 2
+    assert result['errors'] == [
+        {'line': 3, 'error': 'registro invalido: falha inesperada'},
+        {'line': 4, 'error': 'campo obrigatorio: name'}
+    ]
+    assert [line for line, _ in inserted] == [2, 5]
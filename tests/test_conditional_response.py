@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import main
+
+
+def test_timestamp_to_utc():
+    assert main.timestamp_to_utc(1760000000) == datetime(2025, 10, 9, 8, 53, 20, tzinfo=timezone.utc)
+    assert main.timestamp_to_utc(None) is None
+
+
+def test_last_modified_is_the_utc_instant_of_updated_ts():
+    salon = {'opening_day': 'segunda', 'closing_day': 'sexta', 'opening_time': main.timedelta(hours=9),
+             'closing_time': main.timedelta(hours=18), 'updated_ts': 1760000000}
+    with main.app.test_request_context('/'):
+        response = main.salon_schedule_response(main.request, 1, salon)
+    assert response.status_code == 200
+    assert response.headers['Last-Modified'] == 'Thu, 09 Oct 2025 08:53:20 GMT'
+    assert response.headers['ETag'] == '"salon-schedule-1-1760000000"'
+
+
+def test_if_modified_since_returns_not_modified():
+    hairdressers = [{'id': 1, 'name': 'Ana', 'specialties': None, 'updated_ts': 1760000000},
+                    {'id': 2, 'name': 'Bia', 'specialties': None, 'updated_ts': 1760000500}]
+    headers = {'If-Modified-Since': 'Thu, 09 Oct 2025 09:01:40 GMT'}
+    with main.app.test_request_context('/', headers=headers):
+        response = main.hairdressers_by_salon_response(main.request, 1, hairdressers)
+    assert response.status_code == 304
+
+
+def test_naive_last_modified_is_rejected():
+    with main.app.test_request_context('/'):
+        with pytest.raises(ValueError):
+            main.conditional_response(main.request, 'x', datetime(2025, 10, 9), lambda: {})
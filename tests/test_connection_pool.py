@@ -0,0 +1,129 @@
+import pytest
+
+import main
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError('conexao perdida')
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connects(monkeypatch):
+    created = []
+
+    def connect(**config):
+        created.append(FakeConnection(len(created)))
+        return created[-1]
+
+    monkeypatch.setattr(main.pymysql, 'connect', connect)
+    return created
+
+
+def make_pool(**kwargs):
+    options = {'size': 2, 'max_overflow': 1, 'timeout': 0.01, 'idle_timeout': 300, 'recycle': 3600, 'ping': True}
+    return main.ConnectionPool({}, **{**options, **kwargs})
+
+
+def test_released_connection_is_reused(connects):
+    pool = make_pool()
+    connection = pool.acquire()
+    pool.release(connection)
+    assert pool.acquire() is connection
+    assert connection.rollbacks == 1
+    assert len(connects) == 1
+
+
+def test_only_size_connections_stay_idle(connects):
+    pool = make_pool()
+    connections = [pool.acquire() for _ in range(3)]
+    for connection in connections:
+        pool.release(connection)
+    assert pool.stats()['idle'] == 2
+    assert connections[2].closed
+
+
+def test_exhausted_pool_times_out(connects):
+    pool = make_pool()
+    held = [pool.acquire() for _ in range(3)]
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    stats = pool.stats()
+    assert (stats['in_use'], stats['waits'], stats['timeouts']) == (3, 1, 1)
+    pool.release(held[0])
+    assert pool.acquire() is held[0]
+
+
+def test_recycled_connection_is_replaced(connects):
+    pool = make_pool()
+    connection = pool.acquire()
+    pool.release(connection)
+    pool._created_at[id(connection)] -= 3601
+    assert pool.acquire() is not connection
+    assert connection.closed
+    assert pool.stats()['evictions'] == 1
+
+
+def test_idle_timeout_evicts_connection(connects):
+    pool = make_pool(idle_timeout=10)
+    connection = pool.acquire()
+    pool.release(connection)
+    idle, idle_since = pool._idle.pop()
+    pool._idle.append((idle, idle_since - 11))
+    assert pool.acquire() is not connection
+    assert connection.closed
+
+
+def test_dead_connection_is_evicted_on_ping(connects):
+    pool = make_pool()
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.alive = False
+    assert pool.acquire() is not connection
+    assert pool.stats()['evictions'] == 1
+
+
+def test_failed_connect_frees_the_slot(monkeypatch):
+    def connect(**config):
+        raise OSError('banco fora do ar')
+
+    monkeypatch.setattr(main.pymysql, 'connect', connect)
+    pool = make_pool()
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()['in_use'] == 0
+
+
+def test_forked_process_starts_an_empty_pool(connects, monkeypatch):
+    pool = make_pool()
+    inherited = pool.acquire()
+    pool.release(inherited)
+    parent_pid = pool.stats()['pid']
+    monkeypatch.setattr(main.os, 'getpid', lambda: parent_pid + 1)
+    connection = pool.acquire()
+    assert connection is not inherited
+    assert pool.stats()['pid'] == parent_pid + 1
+    assert pool.stats()['checkouts'] == 1
+
+
+def test_connection_from_parent_is_not_returned_to_child_pool(connects, monkeypatch):
+    pool = make_pool()
+    connection = pool.acquire()
+    parent_pid = pool.stats()['pid']
+    monkeypatch.setattr(main.os, 'getpid', lambda: parent_pid + 1)
+    pool.release(connection)
+    assert connection.rollbacks == 0
+    assert pool.stats()['idle'] == 0
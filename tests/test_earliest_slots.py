@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import main
+
+SALON = {'opening_day': 'segunda', 'closing_day': 'sexta',
+         'opening_time': timedelta(hours=9), 'closing_time': timedelta(hours=11)}
+FRIDAY = date(2030, 1, 11)
+HAIRDRESSERS = [{'hairdresser_id': 1, 'name': 'Ana'}, {'hairdresser_id': 2, 'name': 'Bia'}]
+
+
+def booked(days, busy=None):
+    bitmaps = {(h['hairdresser_id'], day): 0 for h in HAIRDRESSERS for day in days}
+    bitmaps.update(busy or {})
+    return bitmaps
+
+
+def flatten(slots):
+    return [(s.date, s.time, [h.id for h in s.hairdressers]) for s in slots]
+
+
+def test_slots_are_merged_in_time_order_across_hairdressers():
+    schedule = main.build_schedule(SALON)
+    busy = {(1, FRIDAY): main.interval_mask(540, 30), (2, FRIDAY): main.interval_mask(570, 60)}
+    slots = main.earliest_slots(schedule, HAIRDRESSERS, FRIDAY, FRIDAY, booked([FRIDAY], busy), 30, 10)
+    assert flatten(slots) == [
+        ('2030-01-11', '09:00', [2]),
+        ('2030-01-11', '09:30', [1]),
+        ('2030-01-11', '10:00', [1]),
+        ('2030-01-11', '10:30', [1, 2]),
+    ]
+
+
+def test_closed_days_are_skipped_and_limit_is_respected():
+    schedule = main.build_schedule(SALON)
+    monday = FRIDAY + timedelta(days=3)
+    days = [FRIDAY + timedelta(days=n) for n in range(4)]
+    full = main.interval_mask(540, 120)
+    busy = {(1, FRIDAY): full, (2, FRIDAY): full}
+    slots = main.earliest_slots(schedule, HAIRDRESSERS, FRIDAY, monday, booked(days, busy), 60, 2)
+    assert flatten(slots) == [('2030-01-14', '09:00', [1, 2]), ('2030-01-14', '09:30', [1, 2])]
+
+
+def test_no_hairdressers_returns_no_slots():
+    schedule = main.build_schedule(SALON)
+    assert main.earliest_slots(schedule, [], FRIDAY, FRIDAY, {}, 30, 10) == []
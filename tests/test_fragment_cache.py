@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import main
+
+SALON = {'id': 7, 'name': 'Salao', 'updated_at': datetime(2030, 1, 7, 9, 0)}
+
+
+def test_fragment_version_includes_id_and_updated_at():
+    assert main.fragment_version(SALON).startswith('7:2030-01-07 09:00:00:')
+
+
+def test_fragment_version_changes_with_any_field():
+    renamed = {**SALON, 'name': 'Outro nome'}
+    assert main.fragment_version(renamed) != main.fragment_version(SALON)
+    assert main.fragment_version(dict(SALON)) == main.fragment_version(SALON)
+
+
+def test_fragment_version_of_plain_values():
+    assert main.fragment_version([1, 2]) == main.fragment_version([1, 2])
+    assert main.fragment_version([1, 2]) != main.fragment_version([2, 1])
+
+
+class CountingTemplate:
+    def __init__(self):
+        self.renders = 0
+
+    def render(self, **context):
+        self.renders += 1
+        return f"<p>{context['name']}</p>"
+
+
+def test_cached_fragment_renders_once_per_version(monkeypatch):
+    template = CountingTemplate()
+    monkeypatch.setattr(main.app.jinja_env, 'get_template', lambda name: template)
+    monkeypatch.setitem(main.FRAGMENT_CACHE_CONFIG, 'enabled', True)
+    monkeypatch.setattr(main, 'fragment_cache', main.ReferenceCache(60, 10))
+
+    first = main.cached_fragment('partials/x.html', 'v1', name='Ana')
+    second = main.cached_fragment('partials/x.html', 'v1', name='Ana')
+    third = main.cached_fragment('partials/x.html', 'v2', name='Bia')
+    assert str(first) == str(second) == '<p>Ana</p>'
+    assert str(third) == '<p>Bia</p>'
+    assert template.renders == 2
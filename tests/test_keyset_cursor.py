@@ -0,0 +1,53 @@
+import base64
+from datetime import date, timedelta
+
+import pytest
+
+import main
+
+
+def test_cursor_round_trip_serializes_dates_and_times():
+    cursor = main.encode_cursor([date(2030, 1, 7), timedelta(hours=9, minutes=30), 42])
+    assert '=' not in cursor
+    assert main.decode_cursor(cursor, 3) == ['2030-01-07', '09:30:00', 42]
+
+
+def test_cursor_round_trip_with_text_keys():
+    cursor = main.encode_cursor([3, 'Joana D\'Arc é', 7])
+    assert main.decode_cursor(cursor, 3) == [3, 'Joana D\'Arc é', 7]
+
+
+@pytest.mark.parametrize('cursor', [None, '', 'nao-e-base64!', base64.urlsafe_b64encode(b'{"a":1}').decode(),
+                                    base64.urlsafe_b64encode(b'not json').decode()])
+def test_invalid_cursor_decodes_to_none(cursor):
+    assert main.decode_cursor(cursor, 2) is None
+
+
+def test_cursor_with_wrong_number_of_keys_is_ignored():
+    # Ex: cursor da listagem de saloes enviado para a de cabeleireiros
+    assert main.decode_cursor(main.encode_cursor(['Salao', 1]), 4) is None
+
+
+def test_keyset_page_fetches_one_extra_row(monkeypatch):
+    rows = [{'name': f'n{i}', 'id': i} for i in range(3)]
+    calls = []
+
+    def fetch_all(sql, args=None, connection=None, replica=None):
+        calls.append((sql, args))
+        return rows[:args[-1]]
+
+    monkeypatch.setattr(main, 'fetch_all', fetch_all)
+    page, next_cursor = main.keyset_page('SELECT 1', ['x'], ['name', 'id'], 2)
+    assert page == rows[:2]
+    assert main.decode_cursor(next_cursor, 2) == ['n1', 1]
+    assert calls == [('SELECT 1 LIMIT %s', ('x', 3))]
+
+    page, next_cursor = main.keyset_page('SELECT 1', [], ['name', 'id'], 3)
+    assert page == rows and next_cursor is None
+
+
+def test_hairdressers_query_keeps_alphabetical_salon_order():
+    sql, args = main.hairdressers_list_query(['Salao', 1, 'Ana', 5])
+    assert '(s.name, s.id, h.name, h.id) > (%s, %s, %s, %s)' in sql
+    assert 'ORDER BY s.name ASC, s.id ASC, h.name ASC, h.id ASC' in sql
+    assert args == ['Salao', 1, 'Ana', 5]
@@ -0,0 +1,81 @@
+import concurrent.futures
+
+import pytest
+
+import passwords
+
+
+def test_bcrypt_round_trip():
+    hashed = passwords.bcrypt_hash(b'segredo', 4)
+    assert passwords.bcrypt_check(b'segredo', hashed)
+    assert not passwords.bcrypt_check(b'outra', hashed)
+
+
+def test_pool_runs_functions_from_standalone_module():
+    import main
+    # Os processos spawn importam o módulo da função, que não pode ser a aplicação
+    assert main.bcrypt_hash.__module__ == 'passwords'
+    assert main.bcrypt_check.__module__ == 'passwords'
+
+
+def test_hash_and_check_password_without_workers(monkeypatch):
+    import main
+    monkeypatch.setitem(main.PASSWORD_HASH_CONFIG, 'rounds', 4)
+    hashed = main.hash_password('segredo')
+    assert hashed.startswith('$2')
+    assert main.check_password('segredo', hashed)
+    assert not main.check_password('outra', hashed)
+    assert not main.password_needs_rehash(hashed)
+
+
+class RunningExecutor:
+    """Aceita as tarefas e as deixa rodando ate o teste concluir cada uma"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self.futures.append(future)
+        return future
+
+
+class QueuedExecutor:
+    """Deixa as tarefas na fila, sem comecar a rodar"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        self.futures.append(concurrent.futures.Future())
+        return self.futures[-1]
+
+
+def test_slot_is_held_until_a_timed_out_task_finishes(monkeypatch):
+    import main
+    hasher = main.PasswordHasher(workers=1, max_pending=1, timeout=0.01)
+    executor = RunningExecutor()
+    monkeypatch.setattr(hasher, '_get_executor', lambda: executor)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        hasher.run(passwords.bcrypt_hash, b'segredo', 4)
+    # O bcrypt continua rodando no processo: a vaga continua ocupada
+    with pytest.raises(RuntimeError, match='Muitas'):
+        hasher.run(passwords.bcrypt_hash, b'segredo', 4)
+    assert len(executor.futures) == 1
+
+    executor.futures[0].set_result(b'hash')
+    assert hasher._pending.acquire(blocking=False)
+
+
+def test_queued_task_is_cancelled_on_timeout_and_frees_the_slot(monkeypatch):
+    import main
+    hasher = main.PasswordHasher(workers=1, max_pending=1, timeout=0.01)
+    executor = QueuedExecutor()
+    monkeypatch.setattr(hasher, '_get_executor', lambda: executor)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        hasher.run(passwords.bcrypt_hash, b'segredo', 4)
+    assert executor.futures[0].cancelled()
+    assert hasher._pending.acquire(blocking=False)
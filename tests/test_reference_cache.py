@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import main
+
+
+class ThreadRecordingCache:
+    """Backend compartilhado falso que anota em qual thread cada operacao rodou"""
+
+    def __init__(self):
+        self.values = {}
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(('get', threading.get_ident()))
+        return self.values.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.threads.append(('set', threading.get_ident()))
+        self.values[key] = value
+
+
+def run_async_load(cache, key, value):
+    loop_thread = []
+
+    async def load():
+        return value
+
+    async def main_coroutine():
+        loop_thread.append(threading.get_ident())
+        return await cache.get_or_load_async(key, load)
+
+    return asyncio.run(main_coroutine()), loop_thread[0]
+
+
+def test_shared_backend_io_runs_off_the_event_loop():
+    shared = ThreadRecordingCache()
+    cache = main.ReferenceCache(60, 10, shared)
+    value, loop_thread = run_async_load(cache, 'salon_schedule:1', {'id': 1})
+    assert value == {'id': 1}
+    assert [op for op, _ in shared.threads] == ['get', 'set']
+    assert all(thread != loop_thread for _, thread in shared.threads)
+
+    value, _ = run_async_load(cache, 'salon_schedule:1', {'id': 2})
+    assert value == {'id': 1}
+    assert cache.stats()['groups']['salon_schedule'] == {'hits': 1, 'misses': 1, 'invalidations': 0}
+
+
+def test_memory_backend_async_load():
+    cache = main.ReferenceCache(60, 10)
+    assert run_async_load(cache, 'hairdressers:1', [1])[0] == [1]
+    assert run_async_load(cache, 'hairdressers:1', [2])[0] == [1]
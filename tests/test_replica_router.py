@@ -0,0 +1,172 @@
+import os
+
+import pytest
+
+import main
+
+
+class FakeConnection:
+    def __init__(self, status):
+        self.status = status
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, args=None):
+        assert sql == 'SHOW REPLICA STATUS'
+
+    def fetchone(self):
+        if isinstance(self.status, Exception):
+            raise self.status
+        return self.status
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def router(monkeypatch):
+    status = {}
+    connects = []
+
+    def connect(**config):
+        connects.append(config)
+        value = status[config['host']]
+        if isinstance(value, OSError):
+            raise value
+        return FakeConnection(value)
+
+    monkeypatch.setattr(main.pymysql, 'connect', connect)
+    router = main.ReplicaRouter(['r1', 'r2:3307'], main.DB_CONFIG, main.DB_POOL_CONFIG,
+                                max_lag=5, check_interval=5, connect_timeout=1, check_timeout=2)
+    # Sem thread de verificacao: os testes chamam check_all() diretamente
+    router._monitor_pid = os.getpid()
+    router.status = status
+    router.connects = connects
+    return router
+
+
+def test_replica_config_has_short_timeouts(router):
+    assert [r['config']['port'] for r in router.replicas] == [main.DB_CONFIG['port'], 3307]
+    assert all(r['config']['connect_timeout'] == 1 for r in router.replicas)
+    router.status.update(r1={'Seconds_Behind_Source': 0}, r2={'Seconds_Behind_Source': 0})
+    router.check_all()
+    assert all(c['read_timeout'] == 2 and c['connect_timeout'] == 1 for c in router.connects)
+
+
+def test_pick_uses_only_cached_state(router):
+    # Antes da primeira verificacao nenhuma replica e usada
+    assert router.pick() is None
+    assert router.connects == []
+
+
+def test_lagging_stopped_and_unreachable_replicas_are_skipped(router):
+    router.status.update(r1={'Seconds_Behind_Source': 50}, r2={'Seconds_Behind_Source': None})
+    router.check_all()
+    assert router.pick() is None
+    assert router.stats()[1]['error'] == 'Replicacao parada ou nao configurada'
+
+    router.status.update(r1=OSError('recusada'), r2={'Seconds_Behind_Source': 1})
+    router.check_all()
+    assert router.pick()['name'] == 'r2:3307'
+    assert router.stats()[0]['error'] == 'recusada'
+
+
+def test_not_a_replica(router):
+    router.status.update(r1=None, r2=None)
+    router.check_all()
+    assert router.pick() is None
+
+
+def test_mark_down_until_next_check(router):
+    router.status.update(r1={'Seconds_Behind_Source': 0}, r2=OSError('fora'))
+    router.check_all()
+    replica = router.pick()
+    router.mark_down(replica, 'timeout')
+    assert router.pick() is None
+    router.check_all()
+    assert router.pick() is replica
+
+
+class RowsConnection:
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def cursor(self, *args):
+        return self
+
+    def execute(self, sql, args=None):
+        pass
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class NamedPool:
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return RowsConnection(self.name, self.rows)
+
+    def release(self, connection):
+        pass
+
+
+class ReplicaOnlyRouter:
+    def __init__(self, pool):
+        self.replica = {'name': 'r1', 'pool': pool}
+
+    def pick(self):
+        return self.replica
+
+
+SCHEDULE_ROW = {'opening_day': 'segunda', 'closing_day': 'sexta', 'opening_time': main.timedelta(hours=9),
+                'closing_time': main.timedelta(hours=18), 'updated_ts': 1760000000, 'id': 1, 'name': 'Ana',
+                'specialties': None, 'address': 'Rua A', 'hairdresser_id': 1, 'image_url': None,
+                'salon_id': 1, 'salon_name': 'Salao', 'salon_address': 'Rua A',
+                'appointment_date': main.date(2030, 1, 7), 'appointment_time': main.timedelta(hours=9),
+                'duration_minutes': 30}
+
+
+@pytest.fixture
+def replica_routed(monkeypatch):
+    primary = NamedPool('primary', [SCHEDULE_ROW])
+    replica = NamedPool('replica', [SCHEDULE_ROW])
+    monkeypatch.setattr(main, 'db_pool', primary)
+    monkeypatch.setattr(main, 'replica_router', ReplicaOnlyRouter(replica))
+    monkeypatch.setattr(main, 'reference_cache', main.ReferenceCache(60, 10))
+    monkeypatch.setattr(main, 'availability_index', main.AvailabilityIndex(60))
+    with main.app.test_request_context('/'):
+        main.g.db_read_replica = True
+        yield primary, replica
+
+
+def test_plain_reads_on_read_replica_routes_use_the_replica(replica_routed):
+    primary, replica = replica_routed
+    main.fetch_all('SELECT 1')
+    assert (primary.acquired, replica.acquired) == (0, 1)
+
+
+@pytest.mark.parametrize('load', [
+    lambda: main.cached_salon_options(),
+    lambda: main.cached_salon_schedule(1),
+    lambda: main.cached_hairdressers_by_salon(1),
+    lambda: main.load_salon_hairdressers(1),
+    lambda: main.availability_index.schedule(1),
+    lambda: main.availability_index.booked(1, main.date(2030, 1, 7)),
+    lambda: main.availability_index.booked_range([1], main.date(2030, 1, 7), main.date(2030, 1, 8)),
+    lambda: main.HairdresserSearchIndex(60)._load(),
+])
+def test_cache_loaders_read_from_primary(replica_routed, load):
+    primary, replica = replica_routed
+    load()
+    assert primary.acquired == 1
+    assert replica.acquired == 0
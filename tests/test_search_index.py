@@ -0,0 +1,99 @@
+import pytest
+
+import main
+
+
+def row(id, salon_id, name, specialties, opening_day='segunda', closing_day='sexta', address='Rua A'):
+    return {'id': id, 'name': name, 'specialties': specialties, 'image_url': None, 'salon_id': salon_id,
+            'salon_name': f'Salao {salon_id}', 'salon_address': address,
+            'opening_day': opening_day, 'closing_day': closing_day}
+
+
+ROWS = [
+    row(1, 1, 'Ana', 'Escova,Coloracao'),
+    row(2, 1, 'Bia', 'Escova'),
+    row(3, 2, 'Cris', 'Coloracao', opening_day='quinta', closing_day='terca', address='Centro'),
+    row(4, 2, 'Duda', 'Escova,Coloracao', opening_day='quinta', closing_day='terca', address='Centro'),
+    row(5, 3, 'Eva', 'Manicure'),
+]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    loads = []
+
+    def fetch_all(sql, args=None, connection=None, replica=None):
+        loads.append(sql)
+        return list(ROWS)
+
+    monkeypatch.setattr(main, 'fetch_all', fetch_all)
+    index = main.HairdresserSearchIndex(ttl=60)
+    index.loads = loads
+    return index
+
+
+def ids(result):
+    items, _ = result
+    return [item.id for item in items]
+
+
+def test_match_all_and_any(index):
+    assert ids(index.search(['Escova', 'Coloracao'])) == [1, 4]
+    assert ids(index.search(['Escova', 'Manicure'], match_all=False)) == [1, 2, 4, 5]
+
+
+def test_salon_weekday_and_text_filters(index):
+    assert ids(index.search(['Escova'], salon_id=1)) == [1, 2]
+    # Salao 2 abre de quinta a terca: atravessa o fim de semana
+    assert ids(index.search(['Coloracao'], open_on=main.WEEKDAY_TO_NUM['sabado'])) == [3, 4]
+    assert ids(index.search(['Coloracao'], open_on=main.WEEKDAY_TO_NUM['quarta'])) == [1]
+    assert ids(index.search(['Coloracao'], q='centro')) == [3, 4]
+
+
+def test_pages_follow_the_cursor(index):
+    items, cursor = index.search(['Escova'], limit=2)
+    assert [item.id for item in items] == [1, 2]
+    assert main.decode_cursor(cursor, 4) == ['Salao 1', 1, 'Bia', 2]
+    items, cursor = index.search(['Escova'], limit=2, after=cursor)
+    assert [item.id for item in items] == [4]
+    assert cursor is None
+
+
+def test_cursor_of_removed_hairdresser_resumes_after_its_position(index):
+    assert ids(index.search(['Escova'], after=main.encode_cursor(['Salao 1', 1, 'Bea', 99]))) == [2, 4]
+
+
+def test_result_carries_salon_reference(index):
+    items, _ = index.search(['Manicure'])
+    assert items[0].specialties == ['Manicure']
+    assert (items[0].salon.id, items[0].salon.name) == (3, 'Salao 3')
+
+
+def test_index_is_loaded_once_until_invalidated(index):
+    index.search(['Escova'])
+    index.search(['Coloracao'])
+    assert len(index.loads) == 1
+    index.invalidate()
+    index.search(['Escova'])
+    assert len(index.loads) == 2
+
+
+def test_specialties_mask_matches_set_bits():
+    assert main.specialties_mask(['Corte Masculino', 'Coloracao']) == 0b101
+
+
+def test_sql_backend_limits_and_filters_in_the_query(monkeypatch):
+    calls = []
+
+    def fetch_all(sql, args=None, connection=None, replica=None):
+        calls.append((' '.join(sql.split()), args))
+        return [ROWS[0], ROWS[1]]
+
+    monkeypatch.setattr(main, 'fetch_all', fetch_all)
+    items, cursor = main.search_hairdressers_sql(['Escova'], open_on=5, limit=1, after=main.encode_cursor(['Salao 1', 1, 'Ana', 0]))
+    sql, args = calls[0]
+    assert sql.endswith('ORDER BY s.name ASC, s.id ASC, h.name ASC, h.id ASC LIMIT %s')
+    assert '(s.name, s.id, h.name, h.id) > (%s, %s, %s, %s)' in sql
+    assert list(args) == [main.SPECIALTY_BITS['Escova']] * 2 + [6, 6, 6] + ['Salao 1', 1, 'Ana', 0, 2]
+    assert [item.id for item in items] == [1]
+    assert main.decode_cursor(cursor, 4) == ['Salao 1', 1, 'Ana', 1]
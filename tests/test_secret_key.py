@@ -0,0 +1,22 @@
+import pytest
+
+import main
+
+
+def test_secret_key_from_environment(monkeypatch):
+    monkeypatch.setenv('SECRET_KEY', 'abc')
+    assert main.load_secret_key() == 'abc'
+
+
+def test_missing_secret_key_refuses_to_start(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    monkeypatch.delenv('FLASK_DEBUG', raising=False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY nao definida'):
+        main.load_secret_key()
+
+
+def test_missing_secret_key_in_debug_uses_random_key(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    monkeypatch.setenv('FLASK_DEBUG', '1')
+    first, second = main.load_secret_key(), main.load_secret_key()
+    assert len(first) == 32 and first != second
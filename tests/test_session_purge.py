@@ -0,0 +1,37 @@
+import types
+
+import pytest
+
+from cachelib import FileSystemCache
+
+import main
+
+
+def test_cachelib_still_exposes_remove_expired():
+    # purge_expired_sessions depende deste metodo privado; se uma atualizacao do
+    # cachelib o remover, este teste quebra antes do job parar em producao
+    assert callable(getattr(FileSystemCache, '_remove_expired', None))
+
+
+def test_purge_removes_only_expired_session_files(tmp_path, monkeypatch):
+    cache = FileSystemCache(str(tmp_path))
+    cache.set('session:old', {'user': 1}, timeout=10)
+    cache.set('session:new', {'user': 2}, timeout=3600)
+    monkeypatch.setattr(main.app, 'session_interface', types.SimpleNamespace(cache=cache))
+    now = main.time.time()
+    monkeypatch.setattr(main.time, 'time', lambda: now + 60)
+
+    main.JOB_HANDLERS['purge_expired_sessions']()
+
+    monkeypatch.undo()
+    assert not cache.has('session:old')
+    assert cache.get('session:new') == {'user': 2}
+
+
+def test_purge_fails_loudly_without_remove_expired(tmp_path, monkeypatch):
+    cache = FileSystemCache(str(tmp_path))
+    monkeypatch.delattr(FileSystemCache, '_remove_expired')
+    monkeypatch.setattr(main.app, 'session_interface', types.SimpleNamespace(cache=cache))
+
+    with pytest.raises(RuntimeError, match='_remove_expired'):
+        main.JOB_HANDLERS['purge_expired_sessions']()